@@ -1,6 +1,60 @@
-from typing import Dict, Any
+"""
+Nearby alternatives: lines leaving stops within walking radius of from_stop
+in the next window_min minutes, catchable after walking there.
+Stops come from the spatial index (stops.StopGrid), departures from the
+planner's per-stop departure boards (realtime delays included).
+"""
+import math
+import os
+from dataclasses import asdict
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.adapters.gtfs_import import WALK_SPEED_MPS
+from app.adapters.router.csa_planner import CsaRoutePlanner
+from app.adapters.stops import SQLiteStopRepository
+from app.domain.entities import Alternative
 
 class SimpleAlternativeSuggester:
+    # clock: "now" in the feed's timezone (the container passes FeedClock.now)
+    def __init__(self, stops: Optional[SQLiteStopRepository] = None,
+                 planner: Optional[CsaRoutePlanner] = None,
+                 clock: Callable[[], datetime] = datetime.now):
+        self.stops = stops
+        self.planner = planner
+        self.clock = clock
+
     def suggest(self, from_stop: str, radius_m: int, window_min: int) -> Dict[str, Any]:
-        # Placeholder for real logic
-        return {"from_stop": from_stop, "alternatives": []}
\ No newline at end of file
+        if self.stops is None or self.planner is None or not os.path.exists(self.planner._source()):
+            return {"from_stop": from_stop, "alternatives": []}
+        now = self.clock()
+        t0 = now.hour * 3600 + now.minute * 60 + now.second
+        alts = self.alternatives(from_stop, radius_m, t0, t0 + window_min * 60, now.date())
+        return {"from_stop": from_stop, "alternatives": [asdict(a) for a in alts]}
+
+    def alternatives(self, from_stop: str, radius_m: int, t0: int, t1: int,
+                     day: Optional[date] = None) -> List[Alternative]:
+        """Earliest catchable departure per route from stops near from_stop, soonest first."""
+        grid = self.stops.grid
+        tt = self.planner.timetable
+        # timetable stop -> (walk seconds, distance, grid stop)
+        near: Dict[int, Tuple[int, int, int]] = {}
+        for d, g in grid.near_stop(from_stop, radius_m):
+            s = tt.stop_index.get(grid.stop_ids[g])
+            if s is not None:
+                near[s] = (math.ceil(d / WALK_SPEED_MPS), int(round(d)), g)
+        if not near:
+            return []
+        boards = self.planner.boards()
+        c_trip, trip_route = tt.c_trip, tt.trip_route
+        best: Dict[int, Tuple[int, int, int]] = {}   # route -> (departure, distance, grid stop)
+        for s, (walk, dist, g) in near.items():
+            # departures we can still catch after walking there
+            for dep, c, _ in boards.lookup(s, t0 + walk, t1, day):
+                r = trip_route[c_trip[c]]
+                if r not in best or (dep, dist) < best[r][:2]:
+                    best[r] = (dep, dist, g)
+        out = [Alternative(route_id=tt.route_ids[r], stop_id=grid.stop_ids[g], stop_name=grid.names[g],
+                           depart_in_min=(dep - t0) // 60, distance_m=dist)
+               for r, (dep, dist, g) in best.items()]
+        out.sort(key=lambda a: (a.depart_in_min, a.distance_m, a.route_id))
+        return out
@@ -0,0 +1,59 @@
+"""
+Feed-local time. GTFS times are seconds since the service day's midnight in
+the agency's timezone (agency.txt agency_timezone), not the server's: a
+container running in UTC would otherwise pick yesterday's calendar for the
+first hours of a Central European day.
+"""
+import logging
+import os
+import sqlite3
+import time
+from datetime import date, datetime, tzinfo
+from typing import Callable, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+log = logging.getLogger(__name__)
+
+def feed_timezone(db_path: str) -> Optional[str]:
+    """agency_timezone of the first agency in the planner SQLite (None: no agency table / value)."""
+    if not os.path.exists(db_path):
+        return None
+    try:
+        db = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            row = db.execute("SELECT agency_timezone FROM agency WHERE agency_timezone != '' LIMIT 1").fetchone()
+        finally:
+            db.close()
+    except sqlite3.Error:
+        return None
+    return row[0] if row else None
+
+def zone(name: Optional[str]) -> Optional[tzinfo]:
+    """ZoneInfo for name; None (server local time) when empty or unknown."""
+    if not name:
+        return None
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        log.warning("unknown timezone %r, using server local time", name)
+        return None
+
+class FeedClock:
+    """Current date / time of day in the feed's timezone (tz=None: server local time)."""
+    def __init__(self, tz: Optional[tzinfo] = None, clock: Callable[[], float] = time.time):
+        self.tz = tz
+        self.clock = clock
+
+    def now(self) -> datetime:
+        return datetime.fromtimestamp(self.clock(), self.tz)
+
+    def today(self) -> date:
+        return self.now().date()
+
+    def resolve(self, depart_at: Optional[int], day: Optional[date]) -> Tuple[int, date]:
+        """(depart_at, service date) with missing parts taken from one reading of the clock."""
+        if depart_at is not None and day is not None:
+            return depart_at, day
+        n = self.now()
+        return (n.hour * 3600 + n.minute * 60 + n.second if depart_at is None else depart_at,
+                n.date() if day is None else day)
@@ -0,0 +1,214 @@
+"""
+GTFS static (zip) -> planner SQLite.
+
+Files are streamed row by row (zip member -> TextIOWrapper -> csv.DictReader),
+inserted with executemany in batches, one transaction per file. Times are
+stored as integer seconds since service-day midnight, so the timetable
+compiler never parses 'HH:MM:SS'. Footpaths are generated from stop
+coordinates with a uniform grid (only neighbouring cells are compared).
+"""
+import csv
+import io
+import math
+import os
+import sqlite3
+import zipfile
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from app.adapters.router.timetable import parse_gtfs_time
+
+BATCH_SIZE = 50_000
+MAX_WALK_M = 400
+WALK_SPEED_MPS = 1.2
+EARTH_M_PER_DEG = 111_320.0
+
+SCHEMA = """
+CREATE TABLE agency(agency_id TEXT, agency_name TEXT, agency_timezone TEXT);
+CREATE TABLE stops(stop_id TEXT PRIMARY KEY, stop_name TEXT, stop_lat REAL, stop_lon REAL,
+                   location_type INTEGER, parent_station TEXT);
+CREATE TABLE routes(route_id TEXT PRIMARY KEY, route_short_name TEXT, route_long_name TEXT, route_type INTEGER);
+CREATE TABLE trips(trip_id TEXT PRIMARY KEY, route_id TEXT, service_id TEXT, trip_headsign TEXT, direction_id INTEGER);
+CREATE TABLE stop_times(trip_id TEXT, stop_id TEXT, arrival_time INTEGER, departure_time INTEGER, stop_sequence INTEGER);
+CREATE TABLE calendar(service_id TEXT PRIMARY KEY,
+                      monday INTEGER, tuesday INTEGER, wednesday INTEGER, thursday INTEGER,
+                      friday INTEGER, saturday INTEGER, sunday INTEGER,
+                      start_date INTEGER, end_date INTEGER);
+CREATE TABLE calendar_dates(service_id TEXT, date INTEGER, exception_type INTEGER);
+CREATE TABLE footpaths(from_stop TEXT, to_stop TEXT, walk_sec INTEGER, distance_m INTEGER);
+"""
+
+# Created after the bulk load (cheaper than maintaining them row by row)
+INDEXES = """
+CREATE INDEX ix_stop_times_trip_seq ON stop_times(trip_id, stop_sequence);
+CREATE INDEX ix_stop_times_stop ON stop_times(stop_id);
+CREATE INDEX ix_trips_route ON trips(route_id);
+CREATE INDEX ix_trips_service ON trips(service_id);
+CREATE INDEX ix_calendar_dates_service ON calendar_dates(service_id, date);
+CREATE INDEX ix_footpaths_from ON footpaths(from_stop);
+"""
+
+BULK_PRAGMAS = (
+    "PRAGMA journal_mode=OFF",
+    "PRAGMA synchronous=OFF",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-131072",   # 128 MiB
+    "PRAGMA locking_mode=EXCLUSIVE",
+)
+
+def read_csv(zf: zipfile.ZipFile, name: str) -> Iterator[Dict[str, str]]:
+    """Stream rows of a zip member; yields nothing if the member is absent."""
+    if name not in zf.namelist():
+        return
+    with zf.open(name) as raw:
+        yield from csv.DictReader(io.TextIOWrapper(raw, encoding="utf-8-sig", newline=""))
+
+def batched(rows: Iterable[Tuple], n: int = BATCH_SIZE) -> Iterator[List[Tuple]]:
+    it = iter(rows)
+    while True:
+        chunk = list(islice(it, n))
+        if not chunk:
+            return
+        yield chunk
+
+def _int(v: Optional[str], default: Optional[int] = None) -> Optional[int]:
+    return int(v) if v not in (None, "") else default
+
+def _float(v: Optional[str]) -> Optional[float]:
+    return float(v) if v not in (None, "") else None
+
+def _sec(v: Optional[str]) -> Optional[int]:
+    return parse_gtfs_time(v.strip()) if v not in (None, "") else None
+
+def _stops(zf) -> Iterator[Tuple]:
+    for r in read_csv(zf, "stops.txt"):
+        yield (r["stop_id"], r.get("stop_name"), _float(r.get("stop_lat")), _float(r.get("stop_lon")),
+               _int(r.get("location_type"), 0), r.get("parent_station") or None)
+
+def _agency(zf) -> Iterator[Tuple]:
+    for r in read_csv(zf, "agency.txt"):
+        yield (r.get("agency_id"), r.get("agency_name"), r.get("agency_timezone"))
+
+def _routes(zf) -> Iterator[Tuple]:
+    for r in read_csv(zf, "routes.txt"):
+        yield (r["route_id"], r.get("route_short_name"), r.get("route_long_name"), _int(r.get("route_type")))
+
+def _trips(zf) -> Iterator[Tuple]:
+    for r in read_csv(zf, "trips.txt"):
+        yield (r["trip_id"], r["route_id"], r.get("service_id"), r.get("trip_headsign"), _int(r.get("direction_id")))
+
+def _calendar(zf) -> Iterator[Tuple]:
+    days = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+    for r in read_csv(zf, "calendar.txt"):
+        yield (r["service_id"], *(_int(r[d], 0) for d in days), _int(r["start_date"]), _int(r["end_date"]))
+
+def _calendar_dates(zf) -> Iterator[Tuple]:
+    for r in read_csv(zf, "calendar_dates.txt"):
+        yield (r["service_id"], _int(r["date"]), _int(r["exception_type"]))
+
+def _interpolate(calls: List[List[Any]]) -> Iterator[Tuple]:
+    """
+    calls = [[trip_id, stop_id, arr, dep, seq], ...] for one trip.
+    Fills non-timepoint stops (empty times) linearly between known times.
+    """
+    calls.sort(key=lambda c: c[4])
+    for c in calls:
+        if c[2] is None:
+            c[2] = c[3]
+        if c[3] is None:
+            c[3] = c[2]
+    known = [i for i, c in enumerate(calls) if c[2] is not None]
+    for a, b in zip(known, known[1:]):
+        if b - a > 1:
+            t0, t1 = calls[a][3], calls[b][2]
+            for i in range(a + 1, b):
+                calls[i][2] = calls[i][3] = t0 + (t1 - t0) * (i - a) // (b - a)
+    for c in calls:
+        if c[2] is not None:
+            yield tuple(c)
+
+def _stop_times(zf) -> Iterator[Tuple]:
+    """stop_times.txt is normally grouped by trip: buffer one trip at a time."""
+    trip, calls = None, []
+    for r in read_csv(zf, "stop_times.txt"):
+        if r["trip_id"] != trip:
+            if calls:
+                yield from _interpolate(calls)
+            trip, calls = r["trip_id"], []
+        calls.append([trip, r["stop_id"], _sec(r.get("arrival_time")), _sec(r.get("departure_time")),
+                      int(r["stop_sequence"])])
+    if calls:
+        yield from _interpolate(calls)
+
+def generate_footpaths(stops: Iterable[Tuple[str, float, float]],
+                       max_walk_m: int = MAX_WALK_M,
+                       walk_speed_mps: float = WALK_SPEED_MPS) -> Iterator[Tuple[str, str, int, int]]:
+    """
+    (stop_id, lat, lon) -> (from_stop, to_stop, walk_sec, distance_m) for pairs within max_walk_m.
+    Grid cells are max_walk_m wide, so candidates are only in the 3x3 neighbourhood.
+    """
+    pts = list(stops)
+    if not pts:
+        return
+    lat0 = math.radians(sum(p[1] for p in pts) / len(pts))
+    mx = EARTH_M_PER_DEG * math.cos(lat0)   # metres per degree of longitude
+    my = EARTH_M_PER_DEG
+    grid: Dict[Tuple[int, int], List[Tuple[str, float, float]]] = {}
+    proj = []
+    for sid, lat, lon in pts:
+        x, y = lon * mx, lat * my
+        proj.append((sid, x, y))
+        grid.setdefault((int(x // max_walk_m), int(y // max_walk_m)), []).append((sid, x, y))
+    for sid, x, y in proj:
+        cx, cy = int(x // max_walk_m), int(y // max_walk_m)
+        for gx in (cx - 1, cx, cx + 1):
+            for gy in (cy - 1, cy, cy + 1):
+                for oid, ox, oy in grid.get((gx, gy), ()):
+                    if oid == sid:
+                        continue
+                    d = math.hypot(ox - x, oy - y)
+                    if d <= max_walk_m:
+                        yield (sid, oid, max(1, math.ceil(d / walk_speed_mps)), int(round(d)))
+
+def _bulk(db: sqlite3.Connection, sql: str, rows: Iterable[Tuple]) -> int:
+    n = 0
+    db.execute("BEGIN")
+    for chunk in batched(rows):
+        db.executemany(sql, chunk)
+        n += len(chunk)
+    db.execute("COMMIT")
+    return n
+
+def import_gtfs(zip_path: str, db_path: str, max_walk_m: int = MAX_WALK_M) -> Dict[str, int]:
+    """
+    Import a GTFS zip into a fresh SQLite at db_path (built next to it, then renamed
+    over it, so readers never see a half-imported file). Returns row counts per table.
+    """
+    tmp = db_path + ".importing"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    counts: Dict[str, int] = {}
+    db = sqlite3.connect(tmp, isolation_level=None)
+    try:
+        for p in BULK_PRAGMAS:
+            db.execute(p)
+        db.executescript(SCHEMA)
+        with zipfile.ZipFile(zip_path) as zf:
+            counts["agency"] = _bulk(db, "INSERT INTO agency VALUES(?,?,?)", _agency(zf))
+            counts["stops"] = _bulk(db, "INSERT OR REPLACE INTO stops VALUES(?,?,?,?,?,?)", _stops(zf))
+            counts["routes"] = _bulk(db, "INSERT OR REPLACE INTO routes VALUES(?,?,?,?)", _routes(zf))
+            counts["trips"] = _bulk(db, "INSERT OR REPLACE INTO trips VALUES(?,?,?,?,?)", _trips(zf))
+            counts["calendar"] = _bulk(db, "INSERT OR REPLACE INTO calendar VALUES(?,?,?,?,?,?,?,?,?,?)", _calendar(zf))
+            counts["calendar_dates"] = _bulk(db, "INSERT INTO calendar_dates VALUES(?,?,?)", _calendar_dates(zf))
+            counts["stop_times"] = _bulk(db, "INSERT INTO stop_times VALUES(?,?,?,?,?)", _stop_times(zf))
+        located = db.execute("""
+            SELECT stop_id, stop_lat, stop_lon FROM stops
+            WHERE stop_lat IS NOT NULL AND stop_lon IS NOT NULL AND COALESCE(location_type, 0) = 0
+        """).fetchall()
+        counts["footpaths"] = _bulk(db, "INSERT INTO footpaths VALUES(?,?,?,?)",
+                                    generate_footpaths(located, max_walk_m))
+        db.executescript(INDEXES)
+        db.execute("ANALYZE")
+    finally:
+        db.close()
+    os.replace(tmp, db_path)
+    return counts
@@ -0,0 +1,65 @@
+"""
+GTFS-RT protobuf -> store deltas. Entities are walked once; only the fields
+the stores keep are read (no intermediate dicts for TripUpdates).
+"""
+from typing import Iterator, List
+from google.transit import gtfs_realtime_pb2
+from app.adapters.realtime.store import TripDelta
+
+FULL_DATASET = gtfs_realtime_pb2.FeedHeader.FULL_DATASET
+CANCELED = gtfs_realtime_pb2.TripDescriptor.CANCELED
+_SEVERITY = {1: "info", 2: "info", 3: "warning", 4: "severe"}
+
+def parse_feed(data: bytes) -> gtfs_realtime_pb2.FeedMessage:
+    msg = gtfs_realtime_pb2.FeedMessage()
+    msg.ParseFromString(data)
+    return msg
+
+def is_full(msg: gtfs_realtime_pb2.FeedMessage) -> bool:
+    return msg.header.incrementality == FULL_DATASET
+
+def trip_deltas(msg: gtfs_realtime_pb2.FeedMessage) -> Iterator[TripDelta]:
+    """
+    One TripDelta per TripUpdate. The trip delay is TripUpdate.delay when given,
+    else the first stop_time_update carrying a delay (it propagates downstream).
+    """
+    for e in msg.entity:
+        if not e.HasField("trip_update") or e.is_deleted:
+            continue
+        tu = e.trip_update
+        trip = tu.trip
+        if not trip.trip_id:
+            continue
+        delay = tu.delay if tu.HasField("delay") else 0
+        if not tu.HasField("delay"):
+            for stu in tu.stop_time_update:
+                if stu.HasField("arrival") and stu.arrival.HasField("delay"):
+                    delay = stu.arrival.delay
+                    break
+                if stu.HasField("departure") and stu.departure.HasField("delay"):
+                    delay = stu.departure.delay
+                    break
+        yield TripDelta(trip.trip_id, trip.route_id or None, delay, trip.schedule_relationship == CANCELED)
+
+def _text(ts) -> str:
+    for tr in ts.translation:
+        return tr.text
+    return ""
+
+def alerts(msg: gtfs_realtime_pb2.FeedMessage) -> List[dict]:
+    """Alerts in the /alerts shape: {id, severity, text, route_ids}."""
+    out = []
+    for e in msg.entity:
+        if not e.HasField("alert") or e.is_deleted:
+            continue
+        a = e.alert
+        routes = sorted({ie.route_id for ie in a.informed_entity if ie.route_id})
+        text = _text(a.header_text)
+        desc = _text(a.description_text)
+        out.append({
+            "id": e.id,
+            "severity": _SEVERITY.get(a.severity_level, "info"),
+            "text": f"{text}: {desc}" if text and desc else text or desc,
+            "route_ids": routes or None,
+        })
+    return out
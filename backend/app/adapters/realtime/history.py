@@ -0,0 +1,311 @@
+"""
+Historical delays: how late a route usually runs at a stop and time of day.
+
+Observations (route, stop, scheduled time of day, delay) are appended to
+columnar files partitioned by service day:
+    <path>/names.txt                   route / stop ids, line number = id
+    <path>/YYYY-MM-DD/{route,stop,tod,delay}.i32
+(without a path the day columns stay in memory). Each (route, stop,
+time-of-day bucket) key, plus a route-wide (route, -1, bucket) key, has a
+fixed-bin delay histogram covering the last `days` service days: a day's rows
+are added when written and subtracted when the day leaves the window, so the
+aggregates roll without rescanning history. After each flush the configured
+quantiles of the keys that changed are recomputed, so a lookup is one dict get.
+
+observe_feed() turns the realtime trip delays into observations: each trip
+is recorded once per stop, when it is heading to it (found on the compiled
+timetable from the trip's scheduled times and current delay). Service days
+and times of day are taken in the feed's timezone (tz; None = server local time).
+"""
+import logging
+import os
+import shutil
+import time
+from array import array
+from bisect import bisect_left
+from datetime import date, datetime, timedelta, tzinfo
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+log = logging.getLogger(__name__)
+
+COLUMNS = ("route", "stop", "tod", "delay")
+# histogram bin upper edges (s): fine around on-time, coarser for long delays; one more bin above the last
+EDGES = tuple(range(-300, 1, 60)) + tuple(range(30, 601, 30)) + tuple(range(660, 1801, 60)) \
+    + tuple(range(1920, 3601, 120))
+N_BINS = len(EDGES) + 1
+
+Key = Tuple[int, int, int]   # (route name id, stop name id or -1 for the whole route, time-of-day bucket)
+Columns = Tuple[array, array, array, array]
+
+def _columns() -> Columns:
+    return array("i"), array("i"), array("i"), array("i")
+
+class DelayHistory:
+    def __init__(self, path: Optional[str] = None, days: int = 28, bucket_min: int = 60,
+                 quantiles: Sequence[float] = (0.5, 0.9), min_samples: int = 10,
+                 clock: Callable[[], float] = time.time, tz: Optional[tzinfo] = None):
+        self.path = path
+        self.days = days
+        self.bucket_sec = bucket_min * 60
+        self.n_buckets = max(1, 86400 // self.bucket_sec)
+        self.q = tuple(sorted(quantiles))
+        self.min_samples = min_samples
+        self.clock = clock
+        self.tz = tz
+        self.names: List[str] = []
+        self._name_id: Dict[str, int] = {}
+        self._names_saved = 0
+        self._hist: Dict[Key, array] = {}
+        # key -> delay at each of self.q (s, >= 0); only keys with min_samples observations
+        self.quantiles: Dict[Key, Tuple[int, ...]] = {}
+        self._dirty: set = set()
+        self._pending: Dict[date, Columns] = {}
+        self._mem: Dict[date, Columns] = {}     # day columns when there is no path
+        self._loaded: List[date] = []           # days counted in the histograms
+        self._last: Dict[str, Tuple[int, int]] = {}   # trip -> (stop, delay) last recorded
+        self._tables: Dict[float, "SlackTable"] = {}
+        self.observations = 0
+        self.version = 0
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._load()
+
+    # --- ingest ---
+    def _nid(self, name: str) -> int:
+        i = self._name_id.get(name)
+        if i is None:
+            i = self._name_id[name] = len(self.names)
+            self.names.append(name.replace("\n", " "))
+        return i
+
+    def observe(self, route_id: str, stop_id: str, tod_sec: int, delay_sec: int, day: date):
+        """Queue one observation (tod_sec: scheduled time at the stop, seconds since the service day's midnight)."""
+        cols = self._pending.get(day)
+        if cols is None:
+            cols = self._pending[day] = _columns()
+        for col, v in zip(cols, (self._nid(route_id), self._nid(stop_id), tod_sec, delay_sec)):
+            col.append(v)
+
+    def observe_feed(self, tt, delays: Iterable[Tuple[str, int, bool]], now: Optional[float] = None) -> int:
+        """
+        Record every running trip of a realtime snapshot ((trip_id, delay_sec, cancelled), e.g.
+        DelayStore.items()) at the stop it is heading to, once per stop. Returns rows queued.
+        """
+        now = self.clock() if now is None else now
+        lt = datetime.fromtimestamp(now, self.tz)
+        today = lt.date()
+        now_tod = lt.hour * 3600 + lt.minute * 60 + lt.second
+        index = tt.trip_index
+        t_off, t_conn = tt.trip_connections()
+        c_dep, c_arr, c_from, c_to = tt.c_dep, tt.c_arr, tt.c_from, tt.c_to
+        seen = set()
+        n = 0
+        for trip_id, delay, cancelled in delays:
+            t = index.get(trip_id)
+            if t is None or cancelled:
+                continue
+            seen.add(trip_id)
+            conns = t_conn[t_off[t]:t_off[t + 1]]
+            if not conns:
+                continue
+            tod, day = now_tod, today
+            if tod + 86400 <= c_arr[conns[-1]] + delay:
+                tod, day = tod + 86400, today - timedelta(days=1)   # after midnight on yesterday's service
+            if tod < c_dep[conns[0]] + delay:
+                stop, sched = c_from[conns[0]], c_dep[conns[0]]    # not left the first stop yet
+            else:
+                # connections in ride order: arrivals are non-decreasing
+                j = bisect_left([c_arr[c] + delay for c in conns], tod)
+                if j == len(conns):
+                    continue   # already at the last stop
+                stop, sched = c_to[conns[j]], c_arr[conns[j]]
+            if self._last.get(trip_id) == (stop, delay):
+                continue
+            self._last[trip_id] = (stop, delay)
+            self.observe(tt.route_ids[tt.trip_route[t]], tt.stop_ids[stop], sched, delay, day)
+            n += 1
+        for trip_id in [tr for tr in self._last if tr not in seen]:
+            del self._last[trip_id]
+        return n
+
+    def flush(self) -> int:
+        """Write queued rows, count them, drop days out of the window, refresh changed quantiles."""
+        pending, self._pending = self._pending, {}
+        rows = 0
+        if pending and self.path:
+            self._save_names()
+        for day, cols in sorted(pending.items()):
+            if self.path:
+                self._append(day, cols)
+            else:
+                mem = self._mem.setdefault(day, _columns())
+                for a, b in zip(mem, cols):
+                    a.extend(b)
+            if day not in self._loaded:
+                self._loaded.append(day)
+                self._loaded.sort()
+            self._count(cols, 1)
+            rows += len(cols[0])
+        self._roll()
+        if self._dirty:
+            self._refresh()
+        self.observations += rows
+        return rows
+
+    # --- storage ---
+    def _day_dir(self, day: date) -> str:
+        return os.path.join(self.path, day.isoformat())
+
+    def _save_names(self):
+        if self._names_saved < len(self.names):
+            with open(os.path.join(self.path, "names.txt"), "a", encoding="utf-8") as f:
+                f.write("".join(n + "\n" for n in self.names[self._names_saved:]))
+            self._names_saved = len(self.names)
+
+    def _append(self, day: date, cols: Columns):
+        d = self._day_dir(day)
+        os.makedirs(d, exist_ok=True)
+        for name, col in zip(COLUMNS, cols):
+            with open(os.path.join(d, name + ".i32"), "ab") as f:
+                col.tofile(f)
+
+    def _read(self, day: date) -> Columns:
+        if not self.path:
+            return self._mem.get(day) or _columns()
+        cols = _columns()
+        d = self._day_dir(day)
+        for name, col in zip(COLUMNS, cols):
+            p = os.path.join(d, name + ".i32")
+            if os.path.exists(p):
+                with open(p, "rb") as f:
+                    col.frombytes(f.read())
+        n = min(len(c) for c in cols)   # a crash mid-append can leave one column longer
+        return tuple(c[:n] for c in cols)
+
+    def _load(self):
+        p = os.path.join(self.path, "names.txt")
+        if os.path.exists(p):
+            with open(p, encoding="utf-8") as f:
+                for line in f:
+                    self._nid(line.rstrip("\n"))
+        self._names_saved = len(self.names)
+        first = self._today() - timedelta(days=self.days - 1)
+        for entry in sorted(os.listdir(self.path)):
+            try:
+                day = date.fromisoformat(entry)
+            except ValueError:
+                continue
+            if day < first:
+                shutil.rmtree(self._day_dir(day), ignore_errors=True)
+                continue
+            cols = self._read(day)
+            # rows whose names were lost in a crash cannot be attributed
+            known = len(self.names)
+            if any(v >= known for v in cols[0]) or any(v >= known for v in cols[1]):
+                keep = [i for i in range(len(cols[0])) if cols[0][i] < known and cols[1][i] < known]
+                cols = tuple(array("i", (c[i] for i in keep)) for c in cols)
+            self._loaded.append(day)
+            self._count(cols, 1)
+            self.observations += len(cols[0])
+        self._refresh()
+
+    def _roll(self):
+        first = self._today() - timedelta(days=self.days - 1)
+        while self._loaded and self._loaded[0] < first:
+            day = self._loaded.pop(0)
+            self._count(self._read(day), -1)
+            self._mem.pop(day, None)
+            if self.path:
+                shutil.rmtree(self._day_dir(day), ignore_errors=True)
+
+    def _today(self) -> date:
+        return datetime.fromtimestamp(self.clock(), self.tz).date()
+
+    # --- aggregates ---
+    def _count(self, cols: Columns, sign: int):
+        hist, dirty, nb, bs = self._hist, self._dirty, self.n_buckets, self.bucket_sec
+        for r, s, tod, delay in zip(*cols):
+            b = tod // bs % nb
+            i = bisect_left(EDGES, delay)
+            for key in ((r, s, b), (r, -1, b)):
+                h = hist.get(key)
+                if h is None:
+                    h = hist[key] = array("i", bytes(4 * N_BINS))
+                h[i] += sign
+                dirty.add(key)
+
+    def _refresh(self):
+        for key in self._dirty:
+            h = self._hist.get(key)
+            total = sum(h) if h is not None else 0
+            if total < self.min_samples:
+                self.quantiles.pop(key, None)
+                if not total:
+                    self._hist.pop(key, None)
+                continue
+            out, acc, j = [], 0, 0
+            for i, n in enumerate(h):
+                acc += n
+                # a bin's upper edge, so never below the delay, except in the overflow bin
+                # (delays over EDGES[-1] are reported as EDGES[-1])
+                while j < len(self.q) and acc >= self.q[j] * total:
+                    out.append(max(0, EDGES[i]) if i < len(EDGES) else EDGES[-1])
+                    j += 1
+            self.quantiles[key] = tuple(out)
+        self._dirty.clear()
+        self.version += 1
+
+    # --- reads ---
+    def quantile_index(self, q: float) -> int:
+        try:
+            return self.q.index(q)
+        except ValueError:
+            raise ValueError(f"quantile {q} is not tracked, expected one of {list(self.q)}") from None
+
+    def lookup(self, route_id: str, stop_id: Optional[str], tod_sec: int) -> Optional[Dict[str, int]]:
+        """{"p50": s, "p90": s, ...} for the route at the stop (route-wide when the stop has too few samples)."""
+        r = self._name_id.get(route_id)
+        if r is None:
+            return None
+        b = tod_sec // self.bucket_sec % self.n_buckets
+        s = self._name_id.get(stop_id, -2) if stop_id else -1
+        qs = self.quantiles.get((r, s, b)) or self.quantiles.get((r, -1, b))
+        if qs is None:
+            return None
+        return {f"p{round(q * 100):d}": v for q, v in zip(self.q, qs)}
+
+    def slack_table(self, tt, q: float) -> "SlackTable":
+        """Per-timetable lookup of the q delay quantile, rebuilt only when new routes / stops were seen."""
+        qi = self.quantile_index(q)
+        table = self._tables.get(q)
+        if table is None or table.tt is not tt or table.n_names != len(self.names):
+            table = self._tables[q] = SlackTable(self, tt, qi)
+        return table
+
+    def stats(self) -> Dict[str, object]:
+        return {"days": len(self._loaded), "observations": self.observations,
+                "keys": len(self.quantiles), "version": self.version}
+
+class SlackTable:
+    """Transfer slack for the planner: a route's usual delay (one quantile) arriving at a stop."""
+    __slots__ = ("tt", "n_names", "route_nid", "stop_nid", "quantiles", "qi", "bucket_sec", "n_buckets")
+
+    def __init__(self, history: DelayHistory, tt, qi: int):
+        self.tt = tt
+        self.n_names = len(history.names)
+        ids = history._name_id
+        self.route_nid = array("i", (ids.get(r, -1) for r in tt.route_ids))
+        self.stop_nid = array("i", (ids.get(s, -2) for s in tt.stop_ids))
+        self.quantiles = history.quantiles   # shared: refreshed in place after each flush
+        self.qi = qi
+        self.bucket_sec = history.bucket_sec
+        self.n_buckets = history.n_buckets
+
+    def __call__(self, trip: int, stop: int, t: int) -> int:
+        """Seconds to add to an arrival of `trip` at `stop` scheduled at t (0 without history)."""
+        r = self.route_nid[self.tt.trip_route[trip]]
+        if r < 0:
+            return 0
+        b = t // self.bucket_sec % self.n_buckets
+        qs = self.quantiles.get((r, self.stop_nid[stop], b)) or self.quantiles.get((r, -1, b))
+        return qs[self.qi] if qs else 0
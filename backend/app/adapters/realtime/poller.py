@@ -0,0 +1,161 @@
+"""
+Background GTFS-RT poller (asyncio + httpx).
+
+Each feed URL is fetched with conditional headers (If-None-Match /
+If-Modified-Since from the previous response); 304 or an unchanged header
+timestamp costs no decoding. Decoded feeds are applied to the stores as
+deltas and listeners get the changed trip ids (cache invalidation,
+timetable overlay, ...). Request handlers only read the stores' snapshots.
+"""
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Set
+import httpx
+from app.adapters.realtime import gtfs_rt
+from app.adapters.realtime.store import AlertStore, DelayStore
+from app.domain.ports import RealtimeProvider
+
+log = logging.getLogger(__name__)
+
+class FeedSource:
+    """One polled URL and its validators."""
+    def __init__(self, url: str):
+        self.url = url
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.feed_timestamp = 0
+        self.fetches = self.not_modified = self.errors = 0
+        self.last_ok: Optional[float] = None
+
+    def headers(self) -> Dict[str, str]:
+        h = {}
+        if self.etag:
+            h["If-None-Match"] = self.etag
+        if self.last_modified:
+            h["If-Modified-Since"] = self.last_modified
+        return h
+
+    async def fetch(self, client: httpx.AsyncClient) -> Optional[bytes]:
+        """Feed body, or None when the server says (or the header shows) nothing changed."""
+        self.fetches += 1
+        r = await client.get(self.url, headers=self.headers())
+        if r.status_code == 304:
+            self.not_modified += 1
+            self.last_ok = time.time()
+            return None
+        r.raise_for_status()
+        self.etag = r.headers.get("etag", self.etag)
+        self.last_modified = r.headers.get("last-modified", self.last_modified)
+        self.last_ok = time.time()
+        return r.content
+
+class GtfsRtPoller(RealtimeProvider):
+    def __init__(self, trip_updates_url: Optional[str] = None, alerts_url: Optional[str] = None,
+                 interval_sec: float = 15.0, delays: Optional[DelayStore] = None,
+                 alert_store: Optional[AlertStore] = None, timeout_sec: float = 10.0):
+        self.trip_updates = FeedSource(trip_updates_url) if trip_updates_url else None
+        self.alerts_feed = FeedSource(alerts_url) if alerts_url else None
+        self.interval_sec = interval_sec
+        self.timeout_sec = timeout_sec
+        self.delays = delays or DelayStore()
+        self.alerts = alert_store or AlertStore()
+        # called with the trip ids whose delay / cancellation changed
+        self.listeners: List[Callable[[Set[str]], None]] = []
+        # called with the alert ids that changed
+        self.alert_listeners: List[Callable[[Set[str]], None]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._client: Optional[httpx.AsyncClient] = None
+
+    # --- RealtimeProvider: snapshots only, no I/O ---
+    async def fetch_status(self):
+        return self.delays.snapshot
+
+    async def fetch_alerts(self):
+        return self.alerts.snapshot
+
+    # --- polling ---
+    async def poll_once(self, client: Optional[httpx.AsyncClient] = None) -> Set[str]:
+        """Fetch both feeds once; returns the changed trip ids."""
+        client = client or self._client
+        tasks = []
+        if self.trip_updates:
+            tasks.append(self._poll_trip_updates(client))
+        if self.alerts_feed:
+            tasks.append(self._poll_alerts(client))
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        changed: Set[str] = set()
+        for res, src in zip(results, [s for s in (self.trip_updates, self.alerts_feed) if s]):
+            if isinstance(res, Exception):
+                src.errors += 1
+                log.warning("GTFS-RT fetch %s failed: %s", src.url, res)
+            elif src is self.trip_updates:
+                changed = res
+        return changed
+
+    async def _poll_trip_updates(self, client: httpx.AsyncClient) -> Set[str]:
+        src = self.trip_updates
+        data = await src.fetch(client)
+        if data is None:
+            return set()
+        msg = gtfs_rt.parse_feed(data)
+        if msg.header.timestamp and msg.header.timestamp == src.feed_timestamp:
+            return set()   # same feed served again without validators
+        src.feed_timestamp = msg.header.timestamp
+        changed = self.delays.apply(gtfs_rt.trip_deltas(msg), full=gtfs_rt.is_full(msg))
+        if changed:
+            for fn in self.listeners:
+                try:
+                    fn(changed)
+                except Exception:
+                    log.exception("realtime listener failed")
+        return changed
+
+    async def _poll_alerts(self, client: httpx.AsyncClient) -> Set[str]:
+        src = self.alerts_feed
+        data = await src.fetch(client)
+        if data is None:
+            return set()
+        msg = gtfs_rt.parse_feed(data)
+        if msg.header.timestamp and msg.header.timestamp == src.feed_timestamp:
+            return set()
+        src.feed_timestamp = msg.header.timestamp
+        changed = self.alerts.apply(gtfs_rt.alerts(msg), full=gtfs_rt.is_full(msg))
+        if changed:
+            for fn in self.alert_listeners:
+                try:
+                    fn(changed)
+                except Exception:
+                    log.exception("alert listener failed")
+        return set()
+
+    async def _run(self):
+        while True:
+            started = time.monotonic()
+            try:
+                await self.poll_once()
+            except Exception:
+                log.exception("GTFS-RT poll failed")
+            await asyncio.sleep(max(0.0, self.interval_sec - (time.monotonic() - started)))
+
+    def start(self):
+        if self._task is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout_sec)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> Dict[str, object]:
+        return {src.url: {"fetches": src.fetches, "not_modified": src.not_modified, "errors": src.errors,
+                          "feed_timestamp": src.feed_timestamp, "last_ok": src.last_ok}
+                for src in (self.trip_updates, self.alerts_feed) if src}
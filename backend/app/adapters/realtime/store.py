@@ -0,0 +1,163 @@
+"""
+In-memory realtime state, updated by deltas and read without locks.
+
+DelayStore keeps one slot per trip in parallel arrays (delay seconds, flags,
+route) with a trip_id -> slot dict and a free list. Applying a feed touches
+only trips whose (delay, cancelled) changed and re-aggregates only their
+routes; the /status body is rebuilt from the per-route lines after each
+refresh, so readers get a ready dict in O(1).
+"""
+import time
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+PRESENT, CANCELLED = 1, 2
+# delay at or above this counts as "delayed" on /status
+DELAYED_MIN = 3
+
+class TripDelta:
+    __slots__ = ("trip_id", "route_id", "delay_sec", "cancelled")
+
+    def __init__(self, trip_id: str, route_id: Optional[str], delay_sec: int, cancelled: bool = False):
+        self.trip_id = trip_id
+        self.route_id = route_id
+        self.delay_sec = delay_sec
+        self.cancelled = cancelled
+
+class DelayStore:
+    def __init__(self, route_of: Optional[Callable[[str], Optional[str]]] = None):
+        # route_of: trip_id -> route_id for feeds that omit TripDescriptor.route_id
+        self.route_of = route_of
+        self._slot: Dict[str, int] = {}
+        self._trip: List[Optional[str]] = []
+        self._delay = array("i")
+        self._flags = bytearray()
+        self._route = array("i")
+        self._free: List[int] = []
+        self._route_index: Dict[str, int] = {}
+        self._route_ids: List[str] = []
+        self._route_slots: Dict[int, Set[int]] = {}
+        self._lines: Dict[int, dict] = {}
+        self.version = 0
+        self.updated_at: Optional[float] = None
+        self.snapshot: Dict[str, object] = {"lines": [], "updated_at": None}
+
+    def __len__(self) -> int:
+        return len(self._slot)
+
+    def get(self, trip_id: str) -> Optional[Tuple[int, bool]]:
+        """(delay_sec, cancelled) for a trip, None if the feed says nothing about it."""
+        k = self._slot.get(trip_id)
+        if k is None:
+            return None
+        return self._delay[k], bool(self._flags[k] & CANCELLED)
+
+    def items(self) -> Iterable[Tuple[str, int, bool]]:
+        for trip_id, k in self._slot.items():
+            yield trip_id, self._delay[k], bool(self._flags[k] & CANCELLED)
+
+    def apply(self, updates: Iterable[TripDelta], full: bool = True) -> Set[str]:
+        """
+        Apply one decoded feed. full=True (FULL_DATASET): trips absent from it are
+        dropped; full=False (DIFFERENTIAL): only the given trips change.
+        Returns the trip ids whose state changed.
+        """
+        changed: Set[str] = set()
+        routes: Set[int] = set()
+        seen: Set[str] = set()
+        for u in updates:
+            seen.add(u.trip_id)
+            flags = PRESENT | (CANCELLED if u.cancelled else 0)
+            k = self._slot.get(u.trip_id)
+            if k is not None and self._delay[k] == u.delay_sec and self._flags[k] == flags:
+                continue
+            if k is None:
+                k = self._alloc(u.trip_id, self._route_for(u))
+            self._delay[k] = u.delay_sec
+            self._flags[k] = flags
+            changed.add(u.trip_id)
+            routes.add(self._route[k])
+        if full:
+            for trip_id in [t for t in self._slot if t not in seen]:
+                routes.add(self._release(trip_id))
+                changed.add(trip_id)
+        if changed:
+            self._refresh_lines(routes)
+        self.updated_at = time.time()
+        lines = list(self._lines.values()) if changed else self.snapshot["lines"]
+        self.snapshot = {"lines": lines, "updated_at": self.updated_at}
+        return changed
+
+    def _route_for(self, u: TripDelta) -> int:
+        route_id = u.route_id or (self.route_of(u.trip_id) if self.route_of else None) or ""
+        r = self._route_index.get(route_id)
+        if r is None:
+            r = self._route_index[route_id] = len(self._route_ids)
+            self._route_ids.append(route_id)
+        return r
+
+    def _alloc(self, trip_id: str, route: int) -> int:
+        if self._free:
+            k = self._free.pop()
+            self._trip[k] = trip_id
+            self._route[k] = route
+        else:
+            k = len(self._trip)
+            self._trip.append(trip_id)
+            self._delay.append(0)
+            self._flags.append(0)
+            self._route.append(route)
+        self._slot[trip_id] = k
+        self._route_slots.setdefault(route, set()).add(k)
+        return k
+
+    def _release(self, trip_id: str) -> int:
+        k = self._slot.pop(trip_id)
+        route = self._route[k]
+        self._route_slots[route].discard(k)
+        self._trip[k] = None
+        self._flags[k] = 0
+        self._delay[k] = 0
+        self._free.append(k)
+        return route
+
+    def _refresh_lines(self, routes: Iterable[int]):
+        for r in routes:
+            slots = self._route_slots.get(r)
+            route_id = self._route_ids[r]
+            if not slots or not route_id:
+                self._lines.pop(r, None)
+                continue
+            cancelled = sum(1 for k in slots if self._flags[k] & CANCELLED)
+            delay_min = max((self._delay[k] for k in slots if not self._flags[k] & CANCELLED), default=0) // 60
+            status = "alert" if cancelled else "delayed" if delay_min >= DELAYED_MIN else "on_time"
+            self._lines[r] = {"route_id": route_id, "status": status, "delay_min": max(0, delay_min),
+                              "trips": len(slots), "cancelled": cancelled}
+        self.version += 1
+
+class AlertStore:
+    """Current service alerts by id; the /alerts body is rebuilt only when one changes."""
+    def __init__(self):
+        self._alerts: Dict[str, dict] = {}
+        self.version = 0
+        self.updated_at: Optional[float] = None
+        self.snapshot: Dict[str, object] = {"alerts": [], "updated_at": None}
+
+    def apply(self, alerts: Iterable[dict], full: bool = True) -> Set[str]:
+        changed: Set[str] = set()
+        seen: Set[str] = set()
+        for a in alerts:
+            seen.add(a["id"])
+            if self._alerts.get(a["id"]) != a:
+                self._alerts[a["id"]] = a
+                changed.add(a["id"])
+        if full:
+            for aid in [a for a in self._alerts if a not in seen]:
+                del self._alerts[aid]
+                changed.add(aid)
+        self.updated_at = time.time()
+        if changed:
+            self.version += 1
+        self.snapshot = {"alerts": list(self._alerts.values()) if changed else self.snapshot["alerts"],
+                         "updated_at": self.updated_at}
+        return changed
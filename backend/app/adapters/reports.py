@@ -0,0 +1,213 @@
+"""
+Rider crowd reports: append-only SQLite (WAL) with batched writes and
+sliding-window counters.
+
+add() only queues the report; a writer thread inserts the queue in one
+transaction every `flush_sec` (or as soon as `batch_max` are waiting), so a
+burst costs one commit per batch, not one per report. The same thread then
+reads the table's tail (rows with id > last seen): counters follow every
+worker writing to the file, not just this one. Counters are kept per
+dimension (stop, line, type) over each window in `windows_min` (minute
+buckets: add and lookup are O(1), expiry drops whole buckets) plus all-time
+totals; they are rebuilt from the table at start-up.
+Admin pages are keyset-paginated on (dimension, id) indexes, newest first.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+from app.domain.entities import CrowdReport
+from app.domain.ports import ReportRepository
+
+log = logging.getLogger(__name__)
+DIMENSIONS = {"stop": "stop_id", "line": "line", "type": "type"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports(
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    type TEXT NOT NULL,
+    line TEXT NOT NULL DEFAULT '',
+    stop_id TEXT NOT NULL DEFAULT '',
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_reports_created ON reports(created_at);
+CREATE INDEX IF NOT EXISTS ix_reports_stop ON reports(stop_id, id);
+CREATE INDEX IF NOT EXISTS ix_reports_line ON reports(line, id);
+CREATE INDEX IF NOT EXISTS ix_reports_type ON reports(type, id);
+"""
+
+Keys = List[Tuple[str, str]]   # (dimension, key) pairs of one report
+
+def _keys(stop: str, line: str, typ: str) -> Keys:
+    return [(d, k) for d, k in (("stop", stop), ("line", line), ("type", typ)) if k]
+
+class SlidingCounts:
+    """Counts per (dimension, key) over the last window_sec, to the bucket."""
+    def __init__(self, window_sec: int, bucket_sec: int = 60):
+        self.window_sec = window_sec
+        self.bucket_sec = bucket_sec
+        self.totals: Dict[str, Dict[str, int]] = {d: {} for d in DIMENSIONS}
+        self._buckets: Deque[Tuple[int, Dict[Tuple[str, str], int]]] = deque()
+
+    def add(self, t: float, keys: Keys):
+        b = int(t // self.bucket_sec)
+        if not self._buckets or self._buckets[-1][0] < b:
+            self._buckets.append((b, {}))
+        bucket = self._buckets[-1][1]   # late rows count in the newest bucket
+        for dk in keys:
+            bucket[dk] = bucket.get(dk, 0) + 1
+            tot = self.totals[dk[0]]
+            tot[dk[1]] = tot.get(dk[1], 0) + 1
+
+    def expire(self, now: float):
+        # bucket b covers [b, b + 1) * bucket_sec: gone once it ends before the window starts
+        while self._buckets and (self._buckets[0][0] + 1) * self.bucket_sec <= now - self.window_sec:
+            for (dim, key), n in self._buckets.popleft()[1].items():
+                tot = self.totals[dim]
+                left = tot[key] - n
+                if left:
+                    tot[key] = left
+                else:
+                    del tot[key]
+
+class SQLiteReportStore(ReportRepository):
+    def __init__(self, path: str, windows_min: Sequence[int] = (15, 60, 1440), flush_sec: float = 0.5,
+                 batch_max: int = 500, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.flush_sec = flush_sec
+        self.batch_max = batch_max
+        self.clock = clock
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._db_lock = threading.Lock()
+        self._pending: List[CrowdReport] = []
+        self._cond = threading.Condition()
+        self._lock = threading.Lock()   # counters
+        self.windows: Dict[int, SlidingCounts] = {w: SlidingCounts(w * 60) for w in windows_min}
+        self.all_time: Dict[str, Dict[str, int]] = {d: {} for d in DIMENSIONS}
+        self._last_id = 0
+        self._load()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="reports-writer", daemon=True)
+        self._thread.start()
+
+    # --- ingest ---
+    def add(self, report: CrowdReport) -> CrowdReport:
+        """Queue a report (stored within flush_sec); created_at defaults to now."""
+        if not report.created_at:
+            report.created_at = self.clock()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("report store is closed")
+            self._pending.append(report)
+            if len(self._pending) >= self.batch_max:
+                self._cond.notify()
+        return report
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closed and len(self._pending) < self.batch_max:
+                    self._cond.wait(self.flush_sec)
+                closed = self._closed
+            try:
+                self.sync()
+            except sqlite3.Error:
+                log.exception("report flush failed")
+            if closed:
+                return
+
+    def sync(self):
+        """Write queued reports, then count every row not counted yet (ours and other workers')."""
+        with self._cond:
+            batch, self._pending = self._pending, []
+        with self._db_lock:
+            if batch:
+                with self._db:   # one transaction per batch
+                    self._db.executemany(
+                        "INSERT INTO reports(created_at, type, line, stop_id, text) VALUES (?,?,?,?,?)",
+                        [(r.created_at, r.type, r.line, r.stop_id, r.text) for r in batch])
+            # still under the write lock: two syncs must not count the same tail
+            rows = self._db.execute("SELECT id, created_at, stop_id, line, type FROM reports WHERE id > ? "
+                                    "ORDER BY id", (self._last_id,)).fetchall()
+            if not rows:
+                return
+            with self._lock:
+                for _, t, stop, line, typ in rows:
+                    keys = _keys(stop, line, typ)
+                    for d, k in keys:
+                        tot = self.all_time[d]
+                        tot[k] = tot.get(k, 0) + 1
+                    for w in self.windows.values():
+                        w.add(t, keys)
+                self._last_id = rows[-1][0]
+
+    def _load(self):
+        """All-time totals by GROUP BY, window counters from the rows inside the longest window."""
+        db = self._db
+        for dim, col in DIMENSIONS.items():
+            for key, n in db.execute(f"SELECT {col}, COUNT(*) FROM reports WHERE {col} != '' GROUP BY {col}"):
+                self.all_time[dim][key] = n
+        self._last_id = db.execute("SELECT COALESCE(MAX(id), 0) FROM reports").fetchone()[0]
+        if self.windows:
+            since = self.clock() - max(self.windows) * 60
+            for t, stop, line, typ in db.execute(
+                    "SELECT created_at, stop_id, line, type FROM reports WHERE created_at >= ? AND id <= ? "
+                    "ORDER BY created_at", (since, self._last_id)):
+                keys = _keys(stop, line, typ)
+                for w in self.windows.values():
+                    w.add(t, keys)
+
+    # --- reads ---
+    def _window(self, by: str, window_min: int) -> Dict[str, int]:
+        if by not in DIMENSIONS:
+            raise ValueError(f"unknown dimension {by!r}, expected one of {sorted(DIMENSIONS)}")
+        if not window_min:
+            return self.all_time[by]
+        w = self.windows.get(window_min)
+        if w is None:
+            raise ValueError(f"window_min must be 0 or one of {sorted(self.windows)}")
+        w.expire(self.clock())
+        return w.totals[by]
+
+    def count(self, by: str, key: str, window_min: int = 0) -> int:
+        with self._lock:
+            return self._window(by, window_min).get(key, 0)
+
+    def counts(self, by: str, window_min: int = 0) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._window(by, window_min))
+
+    def page(self, limit: int = 50, before: Optional[int] = None, **filters: str) -> Dict[str, Any]:
+        """Newest first; pass next_before back as `before` for the next page. Filters: stop, line, type."""
+        self.sync()   # an admin sees what was just submitted
+        where, args = [], []
+        for dim, value in filters.items():
+            if dim not in DIMENSIONS:
+                raise ValueError(f"unknown filter {dim!r}")
+            if value:
+                where.append(f"{DIMENSIONS[dim]} = ?")
+                args.append(value)
+        if before is not None:
+            where.append("id < ?")
+            args.append(before)
+        sql = ("SELECT id, created_at, type, line, stop_id, text FROM reports"
+               + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY id DESC LIMIT ?")
+        with self._db_lock:
+            rows = self._db.execute(sql, args + [limit + 1]).fetchall()
+        items = [{"id": i, "created_at": t, "type": typ, "line": line, "stop_id": stop, "text": text}
+                 for i, t, typ, line, stop, text in rows[:limit]]
+        return {"reports": items, "next_before": items[-1]["id"] if len(rows) > limit else None}
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=10)
+        with self._db_lock:
+            self._db.close()
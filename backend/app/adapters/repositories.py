@@ -1,17 +1,25 @@
 import json, os
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 
 FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "..", "fixtures")
 
 class FixtureRepository:
+    """Fixture JSON, parsed once per file version (mtime). Returned dicts are shared: do not mutate them."""
+    def __init__(self):
+        self._parsed: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
     def load_fixture(self, filename: str) -> Dict[str, Any]:
         path = os.path.join(FIXTURE_DIR, filename)
+        mtime = os.stat(path).st_mtime
+        hit = self._parsed.get(filename)
+        if hit is not None and hit[0] == mtime:
+            return hit[1]
         with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+            data = json.load(f)
+        self._parsed[filename] = (mtime, data)
+        return data
 
     def load_fixture_if_exists(self, filename: str) -> Optional[Dict[str, Any]]:
-        path = os.path.join(FIXTURE_DIR, filename)
-        if os.path.exists(path):
-            with open(path, "r", encoding="utf-8") as f:
-                return json.load(f)
+        if os.path.exists(os.path.join(FIXTURE_DIR, filename)):
+            return self.load_fixture(filename)
         return None
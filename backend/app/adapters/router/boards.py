@@ -0,0 +1,104 @@
+"""
+Per-stop departure boards over a compiled Timetable.
+
+Connections are bucketed by departure stop (CSR, one pass: the timetable is
+already sorted by departure, so every bucket is too):
+  stop s   b_dep / b_conn[b_off[s]:b_off[s+1]]   scheduled departure, connection
+A lookup is a bisect plus a slice per service day. Realtime delays are merged
+at read time: with an overlay, the slice is widened by its delay range and
+delayed trips are re-timed (cancelled ones dropped), so boards are never rebuilt
+for realtime updates.
+"""
+import sqlite3
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from app.adapters.router.timetable import Timetable
+from app.domain.entities import Departure
+
+class DepartureBoards:
+    def __init__(self, tt: Timetable, headsigns: Optional[Sequence[Optional[str]]] = None):
+        """headsigns: per timetable trip id (trip_headsign), None if the feed has none."""
+        self.tt = tt
+        self.headsigns = headsigns
+        n, c_from = tt.n_stops, tt.c_from
+        off = array("i", bytes(4 * (n + 1)))
+        for i in range(len(tt)):
+            off[c_from[i] + 1] += 1
+        for s in range(n):
+            off[s + 1] += off[s]
+        fill = array("i", off[:n])
+        self.b_off = off
+        self.b_dep = array("i", bytes(4 * len(tt)))
+        self.b_conn = array("i", bytes(4 * len(tt)))
+        c_dep = tt.c_dep
+        for i in range(len(tt)):
+            s = c_from[i]
+            k = fill[s]
+            self.b_dep[k] = c_dep[i]
+            self.b_conn[k] = i
+            fill[s] = k + 1
+
+    def lookup(self, s: int, t0: int, t1: int, day: Optional[date] = None) -> List[Tuple[int, int, int]]:
+        """(departure, connection, delay) leaving stop index s in [t0, t1] (predicted times), earliest first."""
+        tt = self.tt
+        b_dep, b_conn, c_trip = self.b_dep, self.b_conn, tt.c_trip
+        lo_s, hi_s = self.b_off[s], self.b_off[s + 1]
+        ov = tt.overlay
+        if ov is not None and not ov.active:
+            ov = None
+        y_min, y_max = ov.delay_range if ov is not None else (0, 0)
+        out: List[Tuple[int, int, int]] = []
+        for shift, bits in tt.service_days(t1, day):
+            lo = bisect_left(b_dep, t0 - shift - max(y_max, 0), lo_s, hi_s)
+            hi = bisect_right(b_dep, t1 - shift - min(y_min, 0), lo_s, hi_s)
+            for k in range(lo, hi):
+                c = b_conn[k]
+                t = c_trip[c]
+                if bits is not None and not bits[t >> 3] >> (t & 7) & 1:
+                    continue
+                y = 0
+                if ov is not None and ov.mask[t >> 3] >> (t & 7) & 1:
+                    y = ov.delays.get(t)
+                    if y is None:
+                        continue   # cancelled
+                d = b_dep[k] + shift + y
+                if t0 <= d <= t1:
+                    out.append((d, c, y))
+        if len(out) > 1 and (ov is not None or day is not None):   # several days / re-timed trips
+            out.sort()
+        return out
+
+    def departures(self, stop_id: str, t0: int, t1: int, day: Optional[date] = None,
+                   limit: Optional[int] = None) -> List[Departure]:
+        s = self.tt.stop_index.get(stop_id)
+        if s is None:
+            return []
+        rows = self.lookup(s, t0, t1, day)
+        return [self._departure(stop_id, d, c, y) for d, c, y in rows[:limit]]
+
+    def departures_many(self, stop_ids: Iterable[str], t0: int, t1: int, day: Optional[date] = None,
+                        limit: Optional[int] = None) -> Dict[str, List[Departure]]:
+        """Boards of several stops (map markers) in one call; unknown stops get an empty board."""
+        return {s: self.departures(s, t0, t1, day, limit) for s in dict.fromkeys(stop_ids)}
+
+    def _departure(self, stop_id: str, dep: int, c: int, delay: int) -> Departure:
+        tt = self.tt
+        t = tt.c_trip[c]
+        return Departure(stop_id=stop_id, route_id=tt.route_ids[tt.trip_route[t]], trip_id=tt.trip_ids[t],
+                         dep_time=dep, headsign=self.headsigns[t] if self.headsigns else None, delay_sec=delay)
+
+def load_headsigns(db_path: str, trip_ids: Sequence[str]) -> Optional[List[Optional[str]]]:
+    """trip_headsign per timetable trip from the GTFS SQLite; None if unavailable."""
+    try:
+        db = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    except sqlite3.Error:
+        return None
+    try:
+        by_trip = dict(db.execute("SELECT trip_id, trip_headsign FROM trips"))
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        db.close()
+    return [by_trip.get(t) or None for t in trip_ids]
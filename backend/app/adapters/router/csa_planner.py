@@ -1,203 +1,435 @@
 import os
-import sqlite3
-from typing import Dict, List, Tuple, Optional
-from app.domain.entities import JourneyRequest, Itinerary, Leg, Connection
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+from app.domain.entities import JourneyRequest, Itinerary, Leg, ReachableStop
 from app.domain.ports import RoutePlannerPort
+from app.metrics import REGISTRY, record, stage
 from app.settings import settings
+from app.adapters.router.timetable import Timetable, load_timetable, parse_gtfs_time  # noqa: F401 (re-export)
+from app.adapters.router.csa_profile import INF, TRANSIT, WALK, profile_plan, trip_key
+from app.adapters.router.boards import DepartureBoards, load_headsigns
 
-def parse_gtfs_time(t: str) -> int:
-    """
-    'HH:MM:SS' -> seconds since midnight. Supports HH >= 24 (post-midnight trips).
-    """
-    if t is None:
-        return 0
-    h, m, s = t.split(":")
-    return int(h) * 3600 + int(m) * 60 + int(s)
+STAGE_SECONDS = REGISTRY.histogram("spooroute_planner_stage_seconds", "Planner time per stage.", ("engine", "stage"))
+SCAN_COUNTERS = {
+    "connections_scanned": REGISTRY.counter(
+        "spooroute_planner_connections_scanned_total", "Connections read by forward scans.", ("engine",)),
+    "footpath_relaxations": REGISTRY.counter(
+        "spooroute_planner_footpath_relaxations_total", "Footpaths tried after an arrival.", ("engine",)),
+    "labels_improved": REGISTRY.counter(
+        "spooroute_planner_labels_improved_total", "Arrival labels improved.", ("engine",)),
+}
+TIMETABLE_CONNECTIONS = REGISTRY.gauge("spooroute_timetable_connections", "Connections in the loaded timetable.")
 
 class CsaRoutePlanner(RoutePlannerPort):
     """
-    Minimal Connection Scan Algorithm over a GTFS SQLite:
-    - connections = consecutive stop_times of the same trip (sequence +1)
-    - earliest-arrival labels; relax footpaths after each improvement
-    - optional footpaths table(from_stop,to_stop,walk_sec,distance_m)
+    Minimal Connection Scan Algorithm over a compiled GTFS timetable:
+    - connections = consecutive stop_times of the same trip, pre-sorted by departure
+    - earliest-arrival labels in flat per-stop lists; relax footpaths after each improvement
+    - trip-reached flags, early exit once the target label can no longer improve
+    - plan() returns the arrival x transfers Pareto set (bounded by max_transfers),
+      or a profile over a departure range (csa_profile)
+    - the timetable is compiled once per feed (see timetable.load_timetable);
+      a query only bisects the departure window and scans that slice
+    - stage timings and scan counters go to app.metrics (/metrics, X-Profile)
+    - req.reliability: transfers get the arriving route's usual delay at that stop and
+      hour as slack (a DelayHistory quantile, set as delay_history)
     """
-    def __init__(self, db_path: Optional[str] = None):
+    engine = "csa"
+    counters = SCAN_COUNTERS
+
+    def __init__(self, db_path: Optional[str] = None, timetable: Optional[Timetable] = None,
+                 timetable_path: Optional[str] = None):
         self.db_path = db_path or settings.gtfs_sqlite_path
+        self.timetable_path = timetable_path if timetable_path is not None else settings.timetable_path
+        self._timetable = timetable
+        self._boards: Optional[DepartureBoards] = None
+        self.delay_history = None   # realtime.history.DelayHistory, for req.reliability
 
-    def _db(self):
-        return sqlite3.connect(self.db_path)
+    def _source(self) -> str:
+        # prebuilt binary (shared mmap) wins over compiling the SQLite in-process
+        if self.timetable_path and os.path.exists(self.timetable_path):
+            return self.timetable_path
+        return self.db_path
 
-    def _load_connections(self, t0: int, t1: int) -> List[Connection]:
-        """
-        Load ALL trip hops (stops pairs) and filter by departure window [t0, t1].
-        Schema expected:
-          - stop_times(trip_id, stop_id, arrival_time, departure_time, stop_sequence)
-          - trips(trip_id, route_id)
-        """
-        conns: List[Connection] = []
-        with self._db() as db:
-            cur = db.cursor()
-            # Pull consecutive stop pairs within trips
-            cur.execute("""
-                SELECT st1.trip_id, t.route_id,
-                       st1.stop_id, st1.departure_time,
-                       st2.stop_id, st2.arrival_time
-                FROM stop_times st1
-                JOIN stop_times st2
-                  ON st2.trip_id = st1.trip_id
-                 AND st2.stop_sequence = st1.stop_sequence + 1
-                JOIN trips t ON t.trip_id = st1.trip_id
-            """)
-            for trip_id, route_id, from_stop, dep_txt, to_stop, arr_txt in cur.fetchall():
-                dep = parse_gtfs_time(dep_txt)
-                arr = parse_gtfs_time(arr_txt)
-                if dep < t0 or dep > t1:
-                    continue
-                # Skip bad rows
-                if arr < dep:
-                    continue
-                conns.append(Connection(dep, arr, from_stop, to_stop, trip_id, route_id))
-        # Sort by departure time (CSA requirement)
-        conns.sort(key=lambda c: c.dep_time)
-        return conns
+    @property
+    def timetable(self) -> Timetable:
+        if self._timetable is None:
+            with self._stage("load"):
+                tt = load_timetable(self._source())
+            TIMETABLE_CONNECTIONS.set(len(tt))
+            self._timetable = tt
+        return self._timetable
 
-    def _load_footpaths(self) -> Dict[str, List[Tuple[str, int, Optional[int]]]]:
-        """
-        Returns {from_stop: [(to_stop, walk_sec, distance_m), ...]}
-        If table doesn't exist, returns {}.
-        """
-        mapping: Dict[str, List[Tuple[str, int, Optional[int]]]] = {}
-        try:
-            with self._db() as db:
-                cur = db.cursor()
-                cur.execute("""
-                    SELECT from_stop, to_stop, walk_sec,
-                           CASE WHEN instr(sql, 'distance_m') > 0 THEN distance_m ELSE NULL END
-                    FROM footpaths
-                """)
-        except sqlite3.Error:
-            return mapping
-
-        # If the SELECT above fails due to the CASE hack, re-run a simpler one.
-        try:
-            with self._db() as db:
-                cur = db.cursor()
-                cur.execute("SELECT from_stop, to_stop, walk_sec, COALESCE(distance_m, NULL) FROM footpaths")
-                rows = cur.fetchall()
-        except sqlite3.Error:
-            return mapping
-
-        for from_stop, to_stop, walk_sec, dist_m in rows:
-            mapping.setdefault(from_stop, []).append((to_stop, int(walk_sec), int(dist_m) if dist_m is not None else None))
-        return mapping
-
-    def _reconstruct(self, req: JourneyRequest, prev: Dict[str, Tuple[str, Optional[Connection], Optional[Tuple[str,int,int]]]]) -> Optional[Itinerary]:
+    @property
+    def version(self) -> str:
+        if self._timetable is None and not os.path.exists(self._source()):
+            return "demo"
+        return self.timetable.version
+
+    def boards(self) -> DepartureBoards:
+        """Per-stop departure boards of the current timetable (built on first use and after a reload)."""
+        tt = self.timetable
+        if self._boards is None or self._boards.tt is not tt:
+            self._boards = DepartureBoards(tt, load_headsigns(self.db_path, tt.trip_ids))
+        return self._boards
+
+    def reload(self) -> Timetable:
+        """Reload after a feed update."""
+        with self._stage("load"):
+            self._timetable = load_timetable(self._source(), reload=True)
+        TIMETABLE_CONNECTIONS.set(len(self._timetable))
+        return self._timetable
+
+    def _slack(self, tt: Timetable, req: JourneyRequest):
+        """Transfer slack lookup (trip, stop, scheduled arrival) -> seconds, or None."""
+        if req.reliability is None or self.delay_history is None:
+            return None
+        return self.delay_history.slack_table(tt, req.reliability)
+
+    def _stage(self, name: str):
+        return stage(STAGE_SECONDS, name, "planner.", engine=self.engine)
+
+    def _record(self, **counts: int):
+        record(self.counters, {"engine": self.engine}, "planner.", **counts)
+
+    def _reconstruct(self, tt: Timetable, src: int, dst: int, E: List[List[int]],
+                     labels: List[List[Optional[tuple]]], k: int = 0) -> Optional[Itinerary]:
         """
-        prev[stop] = (prev_stop, used_connection, used_footpath)
-         - used_connection: Connection or None (if last step was walk)
-         - used_footpath: (to_stop, walk_sec, dist_m) if the hop is a footpath
+        Journey pointers per level (trips used) and stop (integer ids), next to the
+        arrival labels E they were set with:
+         - (TRANSIT, enter_conn, exit_conn, shift, k_board): rode one trip from c_from[enter]
+           to c_to[exit]; the boarding stop's pointer is on level k_board - 1
+         - (WALK, from_stop, footpath_index): walked from from_stop (same level),
+           arriving at E[k][stop] after fp_walk[footpath_index] seconds
+        Single-criterion scans pass one level (E=[earliest], labels=[prev], k_board=1).
         """
-        target = req.to_stop
-        if target not in prev:
+        if labels[k][dst] is None:
             return None
         legs: List[Leg] = []
-        cur = target
-        while True:
-            entry = prev.get(cur)
-            if not entry:
+        cur = dst
+        # pointers only ever point to strictly earlier labels; bound the walk anyway
+        for _ in range(tt.n_stops * len(labels)):
+            entry = labels[k][cur]
+            if entry is None:
                 break
-            pstop, used_conn, used_fp = entry
-            if used_conn is not None:
+            if entry[0] == TRANSIT:
+                _, enter, exit_, shift, kb = entry
+                c = tt.connection(exit_, shift)
                 legs.append(Leg(
                     mode="transit",
-                    from_stop=used_conn.from_stop,
-                    to_stop=used_conn.to_stop,
-                    dep_time=used_conn.dep_time,
-                    arr_time=used_conn.arr_time,
-                    route_id=used_conn.route_id,
-                    trip_id=used_conn.trip_id
+                    from_stop=tt.stop_ids[tt.c_from[enter]],
+                    to_stop=c.to_stop,
+                    dep_time=tt.c_dep[enter] + shift,
+                    arr_time=c.arr_time,
+                    route_id=c.route_id,
+                    trip_id=c.trip_id
                 ))
-                cur = used_conn.from_stop
-            elif used_fp is not None:
-                to_stop, walk_sec, dist_m = used_fp
-                # walk reversed: so from pstop -> cur with walk_sec
+                cur = tt.c_from[enter]
+                k = kb - 1
+            else:
+                _, pstop, fk = entry
+                arr = E[k][cur]
                 legs.append(Leg(
                     mode="walk",
-                    from_stop=pstop,
-                    to_stop=cur,
-                    dep_time=0,  # unknown absolute time (we'll fill on merge)
-                    arr_time=0,
-                    distance_m=dist_m
+                    from_stop=tt.stop_ids[pstop],
+                    to_stop=tt.stop_ids[cur],
+                    dep_time=arr - tt.fp_walk[fk],
+                    arr_time=arr,
+                    distance_m=tt.fp_dist[fk] if tt.fp_dist[fk] >= 0 else None
                 ))
                 cur = pstop
-            else:
-                break
-            if cur == req.from_stop:
+            if cur == src:
                 break
         legs.reverse()
-
-        # Fill walk absolute times where possible (between transit legs)
-        # Approx: walk dep = previous leg arr_time; arr = dep + walk_sec
-        i = 0
-        while i < len(legs):
-            if legs[i].mode == "walk":
-                # pick neighbor times if exist
-                prev_arr = legs[i-1].arr_time if i > 0 else None
-                next_dep = legs[i+1].dep_time if i+1 < len(legs) else None
-                walk_sec = 0
-                # try to infer from footpaths map later if needed
-                if prev_arr is not None:
-                    legs[i].dep_time = prev_arr
-                    # best-effort set to 5 min if unknown
-                    legs[i].arr_time = prev_arr + (5 * 60)
-            i += 1
-
         return Itinerary(legs=legs)
 
     def plan(self, req: JourneyRequest) -> List[Itinerary]:
-        # If no DB file → try demo fallback
-        if not self.db_path or not os.path.exists(self.db_path):
+        """
+        Pareto set over (arrival, transfers) with at most max_transfers changes,
+        fastest first; with depart_until, over (departure, arrival, transfers)
+        for every departure in [depart_at, depart_until] (profile query).
+        """
+        # no timetable/DB file at all: demo world. A feed that fails to load raises.
+        if self._timetable is None and not os.path.exists(self._source()):
             return self._demo_plan(req)
+        tt = self.timetable
 
-        t0 = req.depart_at
-        t1 = req.depart_at + req.window_sec
-        try:
-            conns = self._load_connections(t0, t1)
-        except Exception:
-            # corrupted DB or schema mismatch
-            return self._demo_plan(req)
+        src = tt.stop_index.get(req.from_stop)
+        dst = tt.stop_index.get(req.to_stop)
+        if src is None or dst is None or src == dst:
+            return []
+
+        max_trips = max(1, req.max_transfers + 1)
+        if req.depart_until is not None and req.depart_until > req.depart_at:
+            t1 = req.depart_until + req.window_sec
+            # the latest departure's options bound everything leaving earlier,
+            # and nothing can board before the earliest departure can get there
+            # profiles plan on the timetable alone (no transfer slack)
+            with self._stage("scan"):
+                E, _ = self._scan_pareto(tt, src, dst, req.depart_until, t1, max_trips, req, slack=False)
+                reach, _ = self._scan(tt, src, None, req.depart_at, t1, req)
+            with self._stage("profile"):
+                return profile_plan(tt, src, dst, req.depart_at, req.depart_until, t1, max_trips,
+                                    req.service_date, bounds=[E[k][dst] for k in range(max_trips + 1)],
+                                    reach=reach)
+
+        t0, t1 = req.depart_at, req.depart_at + req.window_sec
+        with self._stage("scan"):
+            E, P = self._scan_pareto(tt, src, dst, t0, t1, max_trips, req)
+        with self._stage("reconstruct"):
+            return self._pareto_itineraries(tt, src, dst, E, P)
+
+    def plan_many(self, reqs: List[JourneyRequest]) -> List[List[Itinerary]]:
+        """
+        plan() for many requests, in order. Requests sharing origin, departure, window,
+        day and transfer limit are answered from one all-destinations scan.
+        """
+        out: List[List[Itinerary]] = [[] for _ in reqs]
+        groups: Dict[tuple, List[int]] = {}
+        for i, req in enumerate(reqs):
+            if req.depart_until is not None and req.depart_until > req.depart_at:
+                out[i] = self.plan(req)   # profile queries are per destination
+                continue
+            if req.reliability is not None:
+                out[i] = self.plan(req)   # slack is not added at the destination: per destination too
+                continue
+            key = (req.from_stop, req.depart_at, req.window_sec, req.service_date, req.max_transfers)
+            groups.setdefault(key, []).append(i)
+        for idx in groups.values():
+            if len(idx) == 1 or self._timetable is None and not os.path.exists(self._source()):
+                for i in idx:
+                    out[i] = self.plan(reqs[i])
+                continue
+            req = reqs[idx[0]]
+            tt = self.timetable
+            src = tt.stop_index.get(req.from_stop)
+            if src is None:
+                continue
+            max_trips = max(1, req.max_transfers + 1)
+            with self._stage("scan"):
+                E, P = self._scan_pareto(tt, src, None, req.depart_at, req.depart_at + req.window_sec,
+                                         max_trips, req)
+            with self._stage("reconstruct"):
+                for i in idx:
+                    dst = tt.stop_index.get(reqs[i].to_stop)
+                    if dst is not None and dst != src:
+                        out[i] = self._pareto_itineraries(tt, src, dst, E, P)
+        return out
+
+    def _pareto_itineraries(self, tt: Timetable, src: int, dst: int, E: List[List[int]],
+                            P: List[List[Optional[tuple]]]) -> List[Itinerary]:
+        """One itinerary per transfer level that beats all levels with fewer trips, fastest first."""
+        out: List[Itinerary] = []
+        best = INF
+        # more trips only pay off when they arrive strictly earlier
+        for k in range(len(E)):
+            if E[k][dst] < best:
+                best = E[k][dst]
+                it = self._reconstruct(tt, src, dst, E, P, k)
+                if it and it.legs:
+                    out.append(it)
+        out.reverse()
+        return out
+
+    def reachable(self, from_stop: str, depart_at: int, budget_sec: int,
+                  service_date: Optional[date] = None) -> List[ReachableStop]:
+        """
+        One-to-all: every stop reachable from from_stop within budget_sec of depart_at,
+        earliest first, from a single scan (no transfer limit).
+        """
+        if self._timetable is None and not os.path.exists(self._source()):
+            return []
+        tt = self.timetable
+        src = tt.stop_index.get(from_stop)
+        if src is None:
+            return []
+        t1 = depart_at + budget_sec
+        req = JourneyRequest(from_stop=from_stop, to_stop=from_stop, depart_at=depart_at,
+                             window_sec=budget_sec, service_date=service_date)
+        with self._stage("scan"):
+            earliest, prev = self._scan(tt, src, None, depart_at, t1, req)
+        with self._stage("reconstruct"):
+            trips = self._trips_used(tt, src, prev)
+        out = [ReachableStop(tt.stop_ids[s], arr, arr - depart_at, max(0, trips[s] - 1))
+               for s, arr in enumerate(earliest) if arr <= t1 and s != src]
+        out.sort(key=lambda r: (r.arr_time, r.stop_id))
+        return out
 
-        foot = self._load_footpaths()
+    @staticmethod
+    def _trips_used(tt: Timetable, src: int, prev: List[Optional[tuple]]) -> List[int]:
+        """Trips ridden on the way to each stop, following the single-level journey pointers."""
+        n = tt.n_stops
+        trips = [-1] * n
+        trips[src] = 0
+        for s in range(n):
+            chain = []
+            cur = s
+            # pointers form a tree rooted at src; bound the walk anyway
+            while trips[cur] < 0 and prev[cur] is not None and len(chain) <= n:
+                chain.append(cur)
+                entry = prev[cur]
+                cur = tt.c_from[entry[1]] if entry[0] == TRANSIT else entry[1]
+            base = max(trips[cur], 0)
+            for c in reversed(chain):
+                entry = prev[c]
+                base += entry[0] == TRANSIT
+                trips[c] = base
+        return trips
 
-        # Labels and backpointers
-        INF = 10**12
-        stops = set([c.from_stop for c in conns] + [c.to_stop for c in conns] + [req.from_stop, req.to_stop])
-        earliest: Dict[str, int] = {s: INF for s in stops}
-        prev: Dict[str, Tuple[str, Optional[Connection], Optional[Tuple[str,int,int]]]] = {}
+    def _scan(self, tt: Timetable, src: int, dst: Optional[int], t0: int, t1: int,
+              req: JourneyRequest) -> Tuple[List[int], List[Optional[tuple]]]:
+        """
+        Earliest-arrival CSA over integer-indexed labels.
+        - a trip, once reached, stays boarded (trip-reached flags): later connections
+          of the same trip are usable regardless of the stop label
+        - stops as soon as connections depart after the best known arrival at dst
+          (dst=None: one-to-all, scans the whole window)
+        Returns (earliest arrival per stop, journey pointers for _reconstruct).
+        """
+        c_dep, c_arr, c_from, c_to, c_trip = tt.c_dep, tt.c_arr, tt.c_from, tt.c_to, tt.c_trip
+        fp_off, fp_to, fp_walk = tt.fp_off, tt.fp_to, tt.fp_walk
 
-        earliest[req.from_stop] = t0
+        earliest = [INF] * tt.n_stops
+        prev: List[Optional[tuple]] = [None] * tt.n_stops
+        # best arrival by a ride: footpaths are walked from these only (one hop of the closure)
+        ride = [INF] * tt.n_stops
+        # trip-reached flags: trip key -> connection where it was boarded.
+        # The key includes the service-day shift: the same trip may run on two days in one scan.
+        boarded: Dict[int, int] = {}
 
+        earliest[src] = t0
         # initial footpaths from origin
-        for (to_s, wsec, dist) in foot.get(req.from_stop, []):
-            if earliest[to_s] > t0 + wsec:
-                earliest[to_s] = t0 + wsec
-                prev[to_s] = (req.from_stop, None, (to_s, wsec, dist))
-
-        # Scan connections
-        for c in conns:
-            if earliest.get(c.from_stop, INF) <= c.dep_time:
+        for k in range(fp_off[src], fp_off[src + 1]):
+            to_s, arr = fp_to[k], t0 + fp_walk[k]
+            if earliest[to_s] > arr:
+                earliest[to_s] = arr
+                prev[to_s] = (WALK, src, k)
+
+        # Scan connections (only trips running on the service day)
+        target = dst if dst is not None else len(earliest)
+        earliest.append(INF)   # sentinel label for one-to-all scans
+        scanned = relaxed = improved = 0
+        for i, shift in tt.scan(t0, t1, req.service_date):
+            scanned += 1
+            dep = c_dep[i] + shift
+            if dep >= earliest[target]:
+                break   # nothing departing from now on can improve the target
+            tk = trip_key(c_trip[i], shift)
+            enter = boarded.get(tk)
+            if enter is None:
+                if earliest[c_from[i]] > dep:
+                    continue
                 # can catch it
-                if earliest.get(c.to_stop, INF) > c.arr_time:
-                    earliest[c.to_stop] = c.arr_time
-                    prev[c.to_stop] = (c.from_stop, c, None)
-                    # relax footpaths after arrival
-                    for (to_s, wsec, dist) in foot.get(c.to_stop, []):
-                        if earliest.get(to_s, INF) > c.arr_time + wsec:
-                            earliest[to_s] = c.arr_time + wsec
-                            prev[to_s] = (c.to_stop, None, (to_s, wsec, dist))
-
-        it = self._reconstruct(req, prev)
-        return [it] if it and it.legs else []
+                enter = boarded[tk] = i
+            to_stop, arr = c_to[i], c_arr[i] + shift
+            if ride[to_stop] > arr:
+                ride[to_stop] = arr
+                if earliest[to_stop] > arr:
+                    earliest[to_stop] = arr
+                    prev[to_stop] = (TRANSIT, enter, i, shift, 1)
+                    improved += 1
+                # relax footpaths after arrival (shortest first: stop once the target is out of reach)
+                for k in range(fp_off[to_stop], fp_off[to_stop + 1]):
+                    to_s, walk_arr = fp_to[k], arr + fp_walk[k]
+                    if walk_arr >= earliest[target]:
+                        break
+                    relaxed += 1
+                    if earliest[to_s] > walk_arr:
+                        earliest[to_s] = walk_arr
+                        prev[to_s] = (WALK, to_stop, k)
+                        improved += 1
+        earliest.pop()
+        self._record(connections_scanned=scanned, footpath_relaxations=relaxed, labels_improved=improved)
+        return earliest, prev
+
+    def _scan_pareto(self, tt: Timetable, src: int, dst: Optional[int], t0: int, t1: int, max_trips: int,
+                     req: JourneyRequest, slack: bool = True) -> Tuple[List[List[int]], List[List[Optional[tuple]]]]:
+        """
+        Bounded-transfer CSA in one scan: E[k][s] = earliest arrival at s using at most
+        k trips (k = 0 is walking only), kept non-increasing in k. A trip remembers the
+        fewest trips it was reached with; connections that cannot beat E[k][dst] are
+        not relaxed, and the scan stops once nothing can beat E[1][dst].
+        Footpaths are walked from every improved ride arrival, even one a walk already
+        beat: the closure is capped (close_footpaths), so walk + walk is not one hop.
+        dst=None: labels for every stop (one scan shared by many destinations).
+        With transfer slack (req.reliability), a ride arrival is labelled at arrival + slack
+        (when the next trip can be boarded), except at dst and on the walk to dst, and
+        not for trips with a live delay: their arrivals are already predicted.
+        """
+        slack_of = self._slack(tt, req) if slack else None
+        live = tt.overlay.delays if tt.overlay is not None else {}
+        c_dep, c_arr, c_from, c_to, c_trip = tt.c_dep, tt.c_arr, tt.c_from, tt.c_to, tt.c_trip
+        fp_off, fp_to, fp_walk = tt.fp_off, tt.fp_to, tt.fp_walk
+        K = max_trips
+        n = tt.n_stops
+        if dst is None:
+            dst = n   # sentinel label that never improves: no pruning
+        E = [[INF] * (n + 1) for _ in range(K + 1)]
+        P: List[List[Optional[tuple]]] = [[None] * (n + 1) for _ in range(K + 1)]
+        # R[k][s] = best arrival at s by a ride with <= k trips: footpaths are walked from these only
+        R = [[INF] * (n + 1) for _ in range(K + 1)]
+        boarded: Dict[int, Tuple[int, int]] = {}   # trip key -> (trips used, boarding connection)
+
+        def improve(k: int, s: int, t: int, ptr: tuple) -> bool:
+            # a journey with k trips is also one with k+1, k+2, ... trips
+            if E[k][s] <= t:
+                return False
+            while k <= K and E[k][s] > t:
+                E[k][s] = t
+                P[k][s] = ptr
+                k += 1
+            return True
+
+        E0 = E[0]
+        E0[src] = t0
+        for k in range(fp_off[src], fp_off[src + 1]):
+            improve(0, fp_to[k], t0 + fp_walk[k], (WALK, src, k))
+        for k in range(1, K + 1):
+            E[k][src] = t0
+
+        E1, Ed = E[1], [E[k] for k in range(K)]
+        scanned = relaxed = improved = 0
+        for i, shift in tt.scan(t0, t1, req.service_date):
+            scanned += 1
+            dep = c_dep[i] + shift
+            if dep >= E1[dst]:
+                break
+            tk = trip_key(c_trip[i], shift)
+            reached = boarded.get(tk)
+            frm = c_from[i]
+            kb = K + 1
+            for j in range(K if reached is None else reached[0] - 1):
+                if Ed[j][frm] <= dep:
+                    kb = j + 1
+                    break
+            if kb <= K:
+                reached = boarded[tk] = (kb, i)
+            elif reached is None:
+                continue
+            k, enter = reached
+            to_stop, arr = c_to[i], c_arr[i] + shift
+            if arr >= E[k][dst]:
+                continue   # target pruning: cannot improve any label that matters
+            if R[k][to_stop] <= arr:
+                continue
+            ready = arr
+            if slack_of is not None and to_stop != dst and c_trip[i] not in live:
+                ready += slack_of(c_trip[i], to_stop, c_arr[i])
+            if R[k][to_stop] > ready:
+                j = k
+                while j <= K and R[j][to_stop] > ready:
+                    R[j][to_stop] = ready
+                    j += 1
+                improved += improve(k, to_stop, ready, (TRANSIT, enter, i, shift, k))
+                bound = E[k][dst]
+                for fk in range(fp_off[to_stop], fp_off[to_stop + 1]):
+                    if arr + fp_walk[fk] >= bound:
+                        break   # shortest walks first: the rest cannot beat the target either
+                    relaxed += 1
+                    to_s = fp_to[fk]
+                    improved += improve(k, to_s, (arr if to_s == dst else ready) + fp_walk[fk], (WALK, to_stop, fk))
+        self._record(connections_scanned=scanned, footpath_relaxations=relaxed, labels_improved=improved)
+        return E, P
 
     # --- DEMO fallback: 3-stop world (STOP_A/B/C) ---
     def _demo_plan(self, req: JourneyRequest) -> List[Itinerary]:
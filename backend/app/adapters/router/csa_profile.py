@@ -0,0 +1,192 @@
+"""
+Profile CSA with a transfer bound: one backward scan over the connections
+answers "every good way from src to dst leaving in [t0, t_last]", i.e. the
+Pareto set over (later departure, earlier arrival, fewer trips).
+
+  T[trip][k]  best arrival at dst when sitting in `trip` with <= k trips in total left
+  S[(s, k)]   profile of stop s: Pareto list of (departure, arrival at dst) entries
+              that need exactly k trips; a query takes the min over levels 1..k
+Entries carry their own journey pointer (boarding + exit of the trip, and how the
+journey continues), so the itinerary is rebuilt after the scan with exact times.
+"""
+from bisect import bisect_left, bisect_right
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+from app.adapters.router.timetable import DAY_SEC, Timetable
+from app.domain.entities import Itinerary, Leg
+
+INF = 10**12
+# journey pointer kinds (forward scans)
+TRANSIT, WALK = 0, 1
+# how a ridden trip ends (profile pointers)
+EXIT_TARGET, EXIT_TRANSFER = 0, 1
+
+def trip_key(trip: int, shift: int) -> int:
+    """
+    Trip id + service-day shift (-1/0/+1 day): the same trip may run twice in one scan.
+    The shift may include a realtime delay (< 12 h), hence the rounding.
+    """
+    return trip * 3 + (shift + DAY_SEC // 2) // DAY_SEC + 1
+
+class _Profiles:
+    """S[(s, k)] as parallel lists sorted by departure, latest first (arrivals decrease too)."""
+    def __init__(self, n_levels: int):
+        self.n = n_levels + 1
+        self.lists: Dict[int, Tuple[List[int], List[int], List[tuple]]] = {}
+
+    def insert(self, s: int, k: int, dep: int, arr: int, ptr: tuple) -> bool:
+        """False if (dep, arr) is dominated by an entry already in the profile."""
+        prof = self.lists.get(s * self.n + k)
+        if prof is None:
+            self.lists[s * self.n + k] = ([-dep], [arr], [ptr])
+            return True
+        negd, arrs, ptrs = prof
+        lo = bisect_left(negd, -dep)    # [0, lo): departs later
+        hi = bisect_right(negd, -dep)   # [lo, hi): same departure
+        if hi > 0 and arrs[hi - 1] <= arr:
+            return False  # dominated: leaving no earlier is no worse
+        e = lo
+        while e < len(arrs) and arrs[e] >= arr:
+            e += 1   # same or earlier departure, no better arrival: dominated by the new entry
+        negd[lo:e] = [-dep]
+        arrs[lo:e] = [arr]
+        ptrs[lo:e] = [ptr]
+        return True
+
+    def query(self, s: int, k_max: int, t: int) -> Tuple[int, Optional[tuple], int]:
+        """Best (arrival, pointer, level) leaving s at or after t with <= k_max trips."""
+        best, best_ptr, best_k = INF, None, 0
+        for k in range(1, k_max + 1):
+            prof = self.lists.get(s * self.n + k)
+            if prof is None:
+                continue
+            j = bisect_right(prof[0], -t) - 1   # latest-first: entry with the smallest dep >= t
+            if j >= 0 and prof[1][j] < best:
+                best, best_ptr, best_k = prof[1][j], prof[2][j], k
+        return best, best_ptr, best_k
+
+    def entries(self, s: int, k: int) -> List[Tuple[int, int, tuple]]:
+        prof = self.lists.get(s * self.n + k)
+        if prof is None:
+            return []
+        return [(-d, a, p) for d, a, p in zip(*prof)]
+
+def profile_plan(tt: Timetable, src: int, dst: int, t0: int, t_last: int, t1: int,
+                 max_trips: int, day: Optional[date] = None,
+                 bounds: Optional[List[int]] = None,
+                 reach: Optional[List[int]] = None) -> List[Itinerary]:
+    """
+    Itineraries leaving src in [t0, t_last], scanning connections departing up to t1.
+    Optional pruning from forward scans:
+    - bounds[k] = best arrival leaving at t_last with <= k trips: any partial journey
+      needing k trips and arriving later is dominated by it and is not stored
+    - reach[s] = earliest arrival at s leaving at t0: connections departing s before
+      that cannot be part of any journey from src
+    """
+    c_dep, c_arr, c_from, c_to, c_trip = tt.c_dep, tt.c_arr, tt.c_from, tt.c_to, tt.c_trip
+    fp_walk = tt.fp_walk
+    in_off, in_k, in_from = tt.incoming_footpaths()
+    K = max_trips
+
+    # walk to dst: {stop: (walk_sec, footpath index or -1)}
+    to_dst: Dict[int, Tuple[int, int]] = {dst: (0, -1)}
+    for j in range(in_off[dst], in_off[dst + 1]):
+        fk = in_k[j]
+        if in_from[j] not in to_dst or fp_walk[fk] < to_dst[in_from[j]][0]:
+            to_dst[in_from[j]] = (fp_walk[fk], fk)
+
+    bound = bounds if bounds is not None else [INF] * (K + 1)
+    if bound[1] < t1:
+        t1 = bound[1]   # nothing departing after the slowest useful arrival matters
+    S = _Profiles(K)
+    T: Dict[int, Tuple[List[int], List[Optional[tuple]]]] = {}
+
+    for i, shift in tt.scan(t0, t1, day, reverse=True):
+        if c_from[i] == dst:
+            continue   # never worth leaving the destination again
+        if reach is not None and c_dep[i] + shift < reach[c_from[i]]:
+            continue
+        dep, arr = c_dep[i] + shift, c_arr[i] + shift
+        to_stop = c_to[i]
+        tk = trip_key(c_trip[i], shift)
+        trip = T.get(tk)
+        if trip is None:
+            trip = T[tk] = ([INF] * (K + 1), [None] * (K + 1))
+        t_arr, t_exit = trip
+
+        w = to_dst.get(to_stop)
+        walk_arr = arr + w[0] if w else INF
+        best, best_exit = INF, None
+        transfer = INF
+        for k in range(1, K + 1):
+            cand, cexit = t_arr[k], t_exit[k]              # stay seated
+            if walk_arr < cand:
+                cand, cexit = walk_arr, (i, EXIT_TARGET, w[1])
+            if k >= 2:
+                a, _, _ = S.query(to_stop, k - 1, arr)     # change at to_stop (or walk on from it)
+                transfer = min(transfer, a)
+                if transfer < cand:
+                    cand, cexit = transfer, (i, EXIT_TRANSFER, -1)
+            if cand >= best:
+                # k trips are no better than k-1: nothing new to store on this level
+                t_arr[k], t_exit[k] = best, best_exit
+                continue
+            best, best_exit = cand, cexit
+            t_arr[k], t_exit[k] = cand, cexit
+            if cand > bound[k]:
+                continue
+            if not S.insert(c_from[i], k, dep, cand, (i, shift, -1, cexit)):
+                continue   # dominated at the boarding stop: walking there first is no better
+            for j in range(in_off[c_from[i]], in_off[c_from[i] + 1]):
+                fk = in_k[j]
+                S.insert(in_from[j], k, dep - fp_walk[fk], cand, (i, shift, fk, cexit))
+
+    # Pareto filter over (departure later, arrival earlier, fewer trips). Departures
+    # after t_last are not returned but still dominate: waiting for them is an option.
+    cands: List[Tuple[int, int, int, tuple]] = []
+    for k in range(1, K + 1):
+        for d, a, p in S.entries(src, k):
+            if d >= t0:
+                cands.append((d, a, k, p))
+    cands.sort(key=lambda x: (-x[0], x[1], x[2]))
+    front: List[Tuple[int, int, int, tuple]] = []
+    for c in cands:
+        if not any(o[0] >= c[0] and o[1] <= c[1] and o[2] <= c[2] for o in front):
+            front.append(c)
+    kept = [c for c in front if c[0] <= t_last]
+
+    out: List[Itinerary] = []
+    if src in to_dst:
+        # walking works at any time: rides arriving no earlier than walking off at once are pointless
+        w_sec, fk = to_dst[src]
+        kept = [c for c in kept if c[1] < c[0] + w_sec]
+        out.append(Itinerary([_walk_leg(tt, src, dst, t0, t0 + w_sec, fk)]))
+    for d, _, k, ptr in sorted(kept, key=lambda x: (x[0], x[1])):
+        out.append(_reconstruct(tt, S, src, dst, ptr, k))
+    return out
+
+def _walk_leg(tt: Timetable, a: int, b: int, dep: int, arr: int, fk: int) -> Leg:
+    return Leg(mode="walk", from_stop=tt.stop_ids[a], to_stop=tt.stop_ids[b], dep_time=dep, arr_time=arr,
+               distance_m=tt.fp_dist[fk] if fk >= 0 and tt.fp_dist[fk] >= 0 else None)
+
+def _reconstruct(tt: Timetable, S: _Profiles, src: int, dst: int, ptr: tuple, k: int) -> Itinerary:
+    legs: List[Leg] = []
+    cur = src
+    for _ in range(k + 1):
+        enter, shift, walk_k, (exit_, kind, fk) = ptr
+        board = tt.c_from[enter]
+        dep = tt.c_dep[enter] + shift
+        if walk_k >= 0:
+            legs.append(_walk_leg(tt, cur, board, dep - tt.fp_walk[walk_k], dep, walk_k))
+        c = tt.connection(exit_, shift)
+        legs.append(Leg(mode="transit", from_stop=tt.stop_ids[board], to_stop=c.to_stop,
+                        dep_time=dep, arr_time=c.arr_time, route_id=c.route_id, trip_id=c.trip_id))
+        cur = tt.c_to[exit_]
+        if kind == EXIT_TARGET:
+            if fk >= 0:
+                legs.append(_walk_leg(tt, cur, dst, c.arr_time, c.arr_time + tt.fp_walk[fk], fk))
+            break
+        _, ptr, k = S.query(cur, k - 1, c.arr_time)
+        if ptr is None:
+            break
+    return Itinerary(legs=legs)
@@ -0,0 +1,112 @@
+"""
+Realtime overlay for a compiled Timetable: predicted times without recompiling.
+
+- `mask`: bitset over trips left out of the base scan (delayed or cancelled)
+- delta list: the connections of delayed trips as (predicted dep, connection
+  index, delay) tuples sorted by predicted departure; the scan merges
+  it with the base slices and yields (connection, shift + delay), so every
+  scan / reconstruction computes predicted times with the usual c_dep[i] + shift
+- cancelled trips are only masked
+
+update() touches the changed trips only: their mask bits and their entries in
+the delta list (bisect delete / insort on a copy). The list is replaced, not
+edited in place, so a concurrent scan keeps a consistent view; during a refresh a
+trip may be seen at both its old and new times, never at neither.
+"""
+from bisect import bisect_left, bisect_right, insort
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+INF = 2**62
+
+class RealtimeOverlay:
+    def __init__(self, tt):
+        self.tt = tt
+        self.mask = bytearray((tt.n_trips + 7) >> 3)
+        self.delays: Dict[int, int] = {}     # trip -> delay (s), delayed trips only
+        self.cancelled: Set[int] = set()
+        # delayed connections as (predicted dep, connection, delay), sorted
+        self._delta: List[Tuple[int, int, int]] = []
+        # (min, max) delay over delayed trips: how far per-stop readers widen their window
+        self.delay_range: Tuple[int, int] = (0, 0)
+        self.version = 0
+
+    @property
+    def active(self) -> bool:
+        return bool(self.delays or self.cancelled)
+
+    def __len__(self) -> int:
+        return len(self._delta)
+
+    def update(self, trip_ids: Iterable[str], lookup: Callable[[str], Optional[Tuple[int, bool]]]) -> int:
+        """
+        Re-read the realtime state of `trip_ids` (lookup: trip_id -> (delay_sec, cancelled)
+        or None = back to schedule). Trips unknown to the timetable are ignored.
+        Returns the number of timetable trips that changed.
+        """
+        index = self.tt.trip_index
+        t_off, t_conn = self.tt.trip_connections()
+        c_dep = self.tt.c_dep
+        changed: Set[int] = set()
+        old_delays: Dict[int, int] = {}
+        mask_on: List[int] = []
+        mask_off: List[int] = []
+        for trip_id in trip_ids:
+            t = index.get(trip_id)
+            if t is None:
+                continue
+            state = lookup(trip_id)
+            delay, cancelled = state if state is not None else (0, False)
+            old = (self.delays.get(t, 0), t in self.cancelled)
+            if old == (delay if not cancelled else 0, cancelled):
+                continue
+            changed.add(t)
+            if t in self.delays:
+                old_delays[t] = self.delays.pop(t)
+            self.cancelled.discard(t)
+            if cancelled:
+                self.cancelled.add(t)
+            elif delay:
+                self.delays[t] = delay
+            (mask_on if cancelled or delay else mask_off).append(t)
+        if not changed:
+            return 0
+
+        for t in mask_off:        # back on schedule: visible in the base scan again first
+            self.mask[t >> 3] &= ~(1 << (t & 7)) & 0xFF
+        # copy (C speed), then edit only the changed trips' entries
+        delta = self._delta.copy()
+        for t in changed:
+            y = old_delays.get(t)
+            if y is not None:
+                for c in t_conn[t_off[t]:t_off[t + 1]]:
+                    del delta[bisect_left(delta, (c_dep[c] + y, c))]
+            y = self.delays.get(t)
+            if y is not None:
+                for c in t_conn[t_off[t]:t_off[t + 1]]:
+                    insort(delta, (c_dep[c] + y, c, y))
+        self._delta = delta
+        self.delay_range = (min(self.delays.values()), max(self.delays.values())) if self.delays else (0, 0)
+        for t in mask_on:         # delayed / cancelled: hidden from the base scan last
+            self.mask[t >> 3] |= 1 << (t & 7)
+        self.version += 1
+        return len(changed)
+
+    def window(self, t0: int, t1: int) -> Tuple[int, int]:
+        """Delta-list range [lo, hi) of delayed connections departing in [t0, t1] (predicted, base-day times)."""
+        delta = self._delta
+        return bisect_left(delta, (t0,)), bisect_right(delta, (t1, INF))
+
+    def scan(self, t0: int, t1: int, shift: int, bits: Optional[bytearray],
+             reverse: bool = False) -> Iterator[Tuple[int, int]]:
+        """Delayed connections departing in [t0, t1] for one service-day shift, as (connection, shift + delay)."""
+        delta = self._delta
+        lo, hi = self.window(t0, t1)
+        c_trip = self.tt.c_trip
+        rng = range(hi - 1, lo - 1, -1) if reverse else range(lo, hi)
+        for j in rng:
+            _, c, y = delta[j]
+            if bits is not None:
+                t = c_trip[c]
+                if not bits[t >> 3] >> (t & 7) & 1:
+                    continue
+            yield c, shift + y
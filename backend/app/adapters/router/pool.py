@@ -0,0 +1,80 @@
+"""
+Process pool for CPU-bound planning. Each worker builds one planner at start-up
+and opens the timetable once: a binary timetable file is mmap'ed, so all workers
+share the same page-cache pages instead of holding a copy each.
+Requests with the same origin / departure / window go to the same task, where
+plan_many answers them from one scan.
+"""
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Type
+from app.adapters.router.csa_planner import CsaRoutePlanner
+from app.domain.entities import Itinerary, JourneyRequest
+
+# per-process planner (set by _init_worker)
+_PLANNER: Optional[CsaRoutePlanner] = None
+
+def _init_worker(planner_cls: Type[CsaRoutePlanner], db_path: str, timetable_path: Optional[str]):
+    global _PLANNER
+    _PLANNER = planner_cls(db_path, timetable_path=timetable_path)
+    if os.path.exists(_PLANNER._source()):
+        _PLANNER.timetable   # open / compile now, not on the first request
+
+def _plan_task(reqs: List[JourneyRequest]) -> List[List[Itinerary]]:
+    return _PLANNER.plan_many(reqs)
+
+class PlannerPool:
+    def __init__(self, planner_cls: Type[CsaRoutePlanner], db_path: str,
+                 timetable_path: Optional[str] = None, workers: int = 0, task_size: int = 64):
+        self.planner_cls = planner_cls
+        self.db_path = db_path
+        self.timetable_path = timetable_path
+        self.workers = workers or os.cpu_count() or 1
+        self.task_size = task_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker,
+                initargs=(self.planner_cls, self.db_path, self.timetable_path))
+        return self._executor
+
+    def tasks(self, reqs: List[JourneyRequest]) -> List[List[int]]:
+        """Request indices per task: same-origin groups are never split, tasks hold ~task_size requests."""
+        groups: Dict[tuple, List[int]] = {}
+        for i, r in enumerate(reqs):
+            groups.setdefault((r.from_stop, r.depart_at, r.window_sec, r.service_date, r.max_transfers), []).append(i)
+        out: List[List[int]] = []
+        cur: List[int] = []
+        for idx in groups.values():
+            if cur and len(cur) + len(idx) > self.task_size:
+                out.append(cur)
+                cur = []
+            cur.extend(idx)
+        if cur:
+            out.append(cur)
+        return out
+
+    async def plan_stream(self, reqs: List[JourneyRequest]
+                          ) -> AsyncIterator[Tuple[int, Optional[List[Itinerary]], Optional[str]]]:
+        """Yields (request index, itineraries, error) as tasks finish (not in request order)."""
+        loop = asyncio.get_running_loop()
+
+        async def run(idx: List[int]):
+            try:
+                return idx, await loop.run_in_executor(self.executor, _plan_task, [reqs[i] for i in idx]), None
+            except Exception as e:
+                return idx, None, f"{type(e).__name__}: {e}"
+
+        for done in asyncio.as_completed([run(idx) for idx in self.tasks(reqs)]):
+            idx, results, error = await done
+            for n, i in enumerate(idx):
+                yield i, results[n] if results is not None else None, error
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
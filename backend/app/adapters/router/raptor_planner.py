@@ -0,0 +1,243 @@
+"""
+RAPTOR over the compiled timetable: trips are grouped into route patterns
+(same stop sequence, no overtaking), so a round scans each touched pattern
+once instead of every connection in the window.
+
+Index (built once per timetable, see RaptorIndex):
+  pattern p        stops[p_off[p]:p_off[p+1]], trips p_trips[t_off[p]:t_off[p+1]]
+                   sorted by departure; stop-major time tables
+                   dep/arr/conn[base[p] + pos * n_trips(p) + t]
+                   (conn = connection leaving pos, for journey pointers; -1 at the last stop)
+  stop s           (pattern, position) pairs sp_pat/sp_pos[sp_off[s]:sp_off[s+1]]
+"""
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+from app.adapters.router.csa_planner import SCAN_COUNTERS, CsaRoutePlanner
+from app.adapters.router.csa_profile import INF, TRANSIT, WALK
+from app.adapters.router.timetable import Timetable
+from app.domain.entities import JourneyRequest
+from app.metrics import REGISTRY
+
+# departure "time" at a pattern's last stop: never boardable
+INF_DEP = 2**31 - 1
+
+RAPTOR_COUNTERS = dict(SCAN_COUNTERS, patterns_scanned=REGISTRY.counter(
+    "spooroute_planner_patterns_scanned_total", "Route patterns scanned by RAPTOR rounds.", ("engine",)))
+
+class RaptorIndex:
+    """Route patterns and per-stop pattern lists derived from a Timetable's connections."""
+    def __init__(self, tt: Timetable):
+        c_dep, c_arr, c_from, c_to, c_trip = tt.c_dep, tt.c_arr, tt.c_from, tt.c_to, tt.c_trip
+        # connections of each trip in ride order (stable sort by departure keeps it)
+        rides: Dict[int, List[int]] = {}
+        for i in range(len(c_dep)):
+            rides.setdefault(c_trip[i], []).append(i)
+
+        # a trip is split where its connections do not chain (rows dropped at compile time)
+        runs: List[Tuple[Tuple[int, ...], int, List[int]]] = []   # (stops, trip, connections)
+        for trip, conns in rides.items():
+            start = 0
+            for j in range(1, len(conns) + 1):
+                if j == len(conns) or c_to[conns[j - 1]] != c_from[conns[j]]:
+                    seg = conns[start:j]
+                    stops = (c_from[seg[0]],) + tuple(c_to[i] for i in seg)
+                    runs.append((stops, trip, seg))
+                    start = j
+
+        # same stop sequence -> one pattern, split further where trips overtake
+        by_stops: Dict[Tuple[int, ...], List[Tuple[int, List[int]]]] = {}
+        for stops, trip, seg in runs:
+            by_stops.setdefault(stops, []).append((trip, seg))
+
+        self.p_off = array("i", [0])
+        self.p_stops = array("i")
+        self.t_off = array("i", [0])
+        self.p_trips = array("i")
+        self.base = array("i")
+        self.dep = array("i")
+        self.arr = array("i")
+        self.conn = array("i")
+        for stops, trips in by_stops.items():
+            trips.sort(key=lambda x: [c_dep[i] for i in x[1]])
+            groups: List[List[Tuple[int, List[int]]]] = []
+            for tr in trips:
+                for g in groups:
+                    last = g[-1][1]
+                    if all(c_dep[a] <= c_dep[b] and c_arr[a] <= c_arr[b] for a, b in zip(last, tr[1])):
+                        g.append(tr)
+                        break
+                else:
+                    groups.append([tr])
+            for g in groups:
+                self._add_pattern(tt, stops, g)
+
+        n_pat = len(self.base)
+        per_stop: List[List[Tuple[int, int]]] = [[] for _ in range(tt.n_stops)]
+        for p in range(n_pat):
+            for pos in range(self.p_off[p], self.p_off[p + 1]):
+                per_stop[self.p_stops[pos]].append((p, pos - self.p_off[p]))
+        self.sp_off = array("i", [0])
+        self.sp_pat = array("i")
+        self.sp_pos = array("i")
+        for lst in per_stop:
+            for p, pos in lst:
+                self.sp_pat.append(p)
+                self.sp_pos.append(pos)
+            self.sp_off.append(len(self.sp_pat))
+
+    def _add_pattern(self, tt: Timetable, stops: Tuple[int, ...], trips: List[Tuple[int, List[int]]]):
+        self.base.append(len(self.dep))
+        self.p_stops.extend(stops)
+        self.p_off.append(len(self.p_stops))
+        for trip, _ in trips:
+            self.p_trips.append(trip)
+        self.t_off.append(len(self.p_trips))
+        last = len(stops) - 1
+        for pos in range(len(stops)):
+            for _, seg in trips:
+                self.dep.append(tt.c_dep[seg[pos]] if pos < last else INF_DEP)
+                self.arr.append(tt.c_arr[seg[pos - 1]] if pos > 0 else tt.c_dep[seg[0]])
+                self.conn.append(seg[pos] if pos < last else -1)
+
+    @property
+    def n_patterns(self) -> int:
+        return len(self.base)
+
+class RaptorRoutePlanner(CsaRoutePlanner):
+    """
+    Round-based planner (RAPTOR): round k extends the journeys of round k-1 by one
+    trip, scanning only patterns serving stops improved in the previous round.
+    Same labels and journey pointers as the CSA forward scan (_scan_pareto), so
+    plan(), the Pareto output and itinerary reconstruction are shared; profile
+    queries (depart_until) still run the backward connection scan.
+    """
+    engine = "raptor"
+    counters = RAPTOR_COUNTERS
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._index: Optional[RaptorIndex] = None
+        self._index_tt: Optional[Timetable] = None
+
+    def index(self, tt: Timetable) -> RaptorIndex:
+        if self._index_tt is not tt:
+            with self._stage("index"):
+                self._index, self._index_tt = RaptorIndex(tt), tt
+        return self._index
+
+    def _scan_pareto(self, tt: Timetable, src: int, dst: Optional[int], t0: int, t1: int, max_trips: int,
+                     req: JourneyRequest, slack: bool = True) -> Tuple[List[List[int]], List[List[Optional[tuple]]]]:
+        """E[k][s] = earliest arrival at s with at most k trips, P = journey pointers (see _scan_pareto)."""
+        if tt.overlay is not None and tt.overlay.active or slack and self._slack(tt, req) is not None:
+            # pattern tables hold scheduled times; predicted times / transfer slack need the connection scan
+            return super()._scan_pareto(tt, src, dst, t0, t1, max_trips, req, slack)
+        ix = self.index(tt)
+        fp_off, fp_to, fp_walk = tt.fp_off, tt.fp_to, tt.fp_walk
+        p_off, p_stops, t_off, p_trips, base = ix.p_off, ix.p_stops, ix.t_off, ix.p_trips, ix.base
+        dep_t, arr_t, conn_t = ix.dep, ix.arr, ix.conn
+        sp_off, sp_pat, sp_pos = ix.sp_off, ix.sp_pat, ix.sp_pos
+        days = tt.service_days(t1, req.service_date)
+
+        n = tt.n_stops
+        K = max_trips
+        if dst is None:
+            dst = n   # sentinel: labels for every stop, no target pruning
+        E = [[INF] * (n + 1)]
+        P: List[List[Optional[tuple]]] = [[None] * (n + 1)]
+        ride = [INF] * (n + 1)   # best arrival by a ride so far: footpaths are walked from these only
+        walk = E[0]   # round 0: walking from the origin
+        walk[src] = t0
+        marked = {src}
+        patterns = relaxed = n_improved = 0
+        for fk in range(fp_off[src], fp_off[src + 1]):
+            to_s = fp_to[fk]
+            if t0 + fp_walk[fk] < walk[to_s]:
+                walk[to_s] = t0 + fp_walk[fk]
+                P[0][to_s] = (WALK, src, fk)
+                marked.add(to_s)
+
+        for k in range(1, K + 1):
+            prev = E[k - 1]
+            cur = list(prev)
+            ptr = list(P[k - 1])
+            E.append(cur)
+            P.append(ptr)
+            # earliest marked position per pattern
+            queue: Dict[int, int] = {}
+            for s in marked:
+                for j in range(sp_off[s], sp_off[s + 1]):
+                    p = sp_pat[j]
+                    if sp_pos[j] < queue.get(p, INF):
+                        queue[p] = sp_pos[j]
+            improved: List[int] = []
+            arrived: List[int] = []
+            patterns += len(queue)
+            for p, start in queue.items():
+                first = p_off[p]
+                nt = t_off[p + 1] - t_off[p]
+                b = base[p]
+                trips = p_trips[t_off[p]:t_off[p + 1]]
+                t = -1          # trip column ridden, -1 = none yet
+                shift = 0
+                board = 0
+                for pos in range(start, p_off[p + 1] - first):
+                    s = p_stops[first + pos]
+                    row = b + pos * nt
+                    if t >= 0 and dep_t[row - nt + t] + shift > t1:
+                        t = -1      # the scan window ends (same cut-off as the connection scan)
+                    if t >= 0:
+                        a = arr_t[row + t] + shift
+                        if a < ride[s] and a < cur[dst]:
+                            ride[s] = a
+                            arrived.append(s)
+                            if a < cur[s]:
+                                cur[s] = a
+                                ptr[s] = (TRANSIT, conn_t[b + board * nt + t], conn_t[row - nt + t], shift, k)
+                                improved.append(s)
+                    # a label from the previous round may catch an earlier trip here
+                    ready = prev[s]
+                    if ready < INF and (t < 0 or ready <= dep_t[row + t] + shift):
+                        found = self._earliest_trip(dep_t, row, nt, trips, ready, t1, days)
+                        if found is not None and (t < 0 or dep_t[row + found[0]] + found[1]
+                                                  < dep_t[row + t] + shift):
+                            t, shift = found
+                            board = pos
+            n_improved += len(improved)
+            marked = set(improved)
+            # walk on from the ride arrivals only (one footpath hop, as in the connection scan)
+            for s in set(arrived):
+                a = ride[s]
+                for fk in range(fp_off[s], fp_off[s + 1]):
+                    to_s, wa = fp_to[fk], a + fp_walk[fk]
+                    if wa >= cur[dst]:
+                        break   # shortest walks first
+                    relaxed += 1
+                    if wa < cur[to_s]:
+                        cur[to_s] = wa
+                        ptr[to_s] = (WALK, s, fk)
+                        marked.add(to_s)
+                        n_improved += 1
+            if not marked:
+                # nothing changed: later rounds would repeat this one
+                for _ in range(k + 1, K + 1):
+                    E.append(list(cur))
+                    P.append(list(ptr))
+                break
+        self._record(patterns_scanned=patterns, footpath_relaxations=relaxed, labels_improved=n_improved)
+        return E, P
+
+    @staticmethod
+    def _earliest_trip(dep_t: array, row: int, nt: int, trips: array, ready: int, t1: int,
+                       days: List[Tuple[int, Optional[bytearray]]]) -> Optional[Tuple[int, int]]:
+        """(trip column, shift) of the first running trip departing in [ready, t1] at this stop."""
+        found, found_dep = None, INF
+        for shift, bits in days:
+            j = bisect_left(dep_t, ready - shift, row, row + nt)
+            while j < row + nt and dep_t[j] + shift <= t1 and dep_t[j] + shift < found_dep:
+                t = trips[j - row]
+                if bits is None or bits[t >> 3] >> (t & 7) & 1:
+                    found, found_dep = (j - row, shift), dep_t[j] + shift
+                    break
+                j += 1
+        return found
@@ -0,0 +1,497 @@
+import heapq
+import os
+import sqlite3
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, Tuple, Optional, Sequence
+from app.domain.entities import Connection
+
+DAY_SEC = 24 * 3600
+# per-date active-trip bitsets kept per timetable (today, tomorrow, yesterday, ...)
+ACTIVE_CACHE_SIZE = 8
+
+def parse_gtfs_time(t: str) -> int:
+    """
+    'HH:MM:SS' -> seconds since midnight. Supports HH >= 24 (post-midnight trips).
+    """
+    if t is None:
+        return 0
+    h, m, s = t.split(":")
+    return int(h) * 3600 + int(m) * 60 + int(s)
+
+def to_seconds(v) -> int:
+    """stop_times value -> seconds: integers (imported feeds) pass through, text is parsed."""
+    return v if isinstance(v, int) else parse_gtfs_time(v)
+
+class Timetable:
+    """
+    Compiled, read-only timetable for CSA:
+    - stops/trips/routes interned to dense integer ids
+    - connections stored as parallel int arrays, sorted by departure time
+    - footpaths as CSR adjacency: fp_to/fp_walk/fp_dist[fp_off[s]:fp_off[s+1]]
+      (fp_dist = -1 when unknown), shortest walk first per stop, transitively
+      closed at compile time (close_footpaths): scans relax one footpath hop per arrival
+    - optional service calendar: trip_service, per-service weekday mask (bit0=Monday)
+      and date range (YYYYMMDD ints), calendar_dates exceptions as CSR sorted by date;
+      turned into a per-date active-trip bitset on first use
+    Built once per feed; the request path only does bisect + slice scans.
+    Int columns may be array('i') (compiled in-process) or memoryviews over an
+    mmap'ed timetable file (see timetable_file), the code reading them is the same.
+    """
+    def __init__(self,
+                 stop_ids: Sequence[str],
+                 trip_ids: Sequence[str],
+                 route_ids: Sequence[str],
+                 trip_route: Sequence[int],
+                 c_dep: Sequence[int], c_arr: Sequence[int],
+                 c_from: Sequence[int], c_to: Sequence[int], c_trip: Sequence[int],
+                 fp_off: Sequence[int], fp_to: Sequence[int],
+                 fp_walk: Sequence[int], fp_dist: Sequence[int],
+                 service_ids: Sequence[str] = (),
+                 trip_service: Sequence[int] = (),
+                 cal_days: Sequence[int] = (), cal_start: Sequence[int] = (), cal_end: Sequence[int] = (),
+                 cx_off: Sequence[int] = (0,), cx_date: Sequence[int] = (), cx_type: Sequence[int] = ()):
+        self.stop_ids = stop_ids
+        self.trip_ids = trip_ids
+        self.route_ids = route_ids
+        self.trip_route = trip_route
+        self.c_dep = c_dep
+        self.c_arr = c_arr
+        self.c_from = c_from
+        self.c_to = c_to
+        self.c_trip = c_trip
+        self.fp_off = fp_off
+        self.fp_to = fp_to
+        self.fp_walk = fp_walk
+        self.fp_dist = fp_dist
+        self.service_ids = service_ids
+        self.trip_service = trip_service
+        self.cal_days = cal_days
+        self.cal_start = cal_start
+        self.cal_end = cal_end
+        self.cx_off = cx_off
+        self.cx_date = cx_date
+        self.cx_type = cx_type
+        self._active: Dict[int, bytearray] = {}
+        self._fp_in: Optional[Tuple[array, array, array]] = None
+        self._trip_index: Optional[Dict[str, int]] = None
+        self._trip_conns: Optional[Tuple[array, array]] = None
+        # realtime overlay (see overlay.RealtimeOverlay), None = scheduled times only
+        self.overlay = None
+        self.stop_index: Dict[str, int] = {s: i for i, s in enumerate(stop_ids)}
+        # feed identity (crc32 of the binary file, if loaded from one)
+        self.version = ""
+
+    def __len__(self) -> int:
+        return len(self.c_dep)
+
+    @property
+    def n_stops(self) -> int:
+        return len(self.stop_ids)
+
+    @property
+    def n_trips(self) -> int:
+        return len(self.trip_ids)
+
+    @property
+    def has_calendar(self) -> bool:
+        return len(self.service_ids) > 0
+
+    @property
+    def trip_index(self) -> Dict[str, int]:
+        """trip_id -> trip id (built on first use: only realtime lookups need it)."""
+        if self._trip_index is None:
+            self._trip_index = {t: i for i, t in enumerate(self.trip_ids)}
+        return self._trip_index
+
+    def route_of(self, trip_id: str) -> Optional[str]:
+        t = self.trip_index.get(trip_id)
+        return self.route_ids[self.trip_route[t]] if t is not None else None
+
+    def window(self, t0: int, t1: int) -> Tuple[int, int]:
+        """Index range [lo, hi) of connections departing in [t0, t1]."""
+        return bisect_left(self.c_dep, t0), bisect_right(self.c_dep, t1)
+
+    def active_trips(self, day: date) -> Optional[bytearray]:
+        """
+        Bitset over trip ids (bit t set = trip t runs on service day `day`),
+        or None when the feed has no calendar (every trip runs).
+        """
+        if not self.has_calendar:
+            return None
+        key = day.toordinal()
+        bits = self._active.get(key)
+        if bits is not None:
+            return bits
+        ymd = day.year * 10000 + day.month * 100 + day.day
+        wd = 1 << day.weekday()
+        n_services = len(self.service_ids)
+        running = bytearray(n_services)
+        for sv in range(n_services):
+            on = self.cal_start[sv] <= ymd <= self.cal_end[sv] and bool(self.cal_days[sv] & wd)
+            # calendar_dates: 1 = added, 2 = removed
+            lo, hi = self.cx_off[sv], self.cx_off[sv + 1]
+            k = bisect_left(self.cx_date, ymd, lo, hi)
+            if k < hi and self.cx_date[k] == ymd:
+                on = self.cx_type[k] == 1
+            running[sv] = on
+        bits = bytearray((self.n_trips + 7) >> 3)
+        for t, sv in enumerate(self.trip_service):
+            if sv >= 0 and running[sv]:
+                bits[t >> 3] |= 1 << (t & 7)
+        if len(self._active) >= ACTIVE_CACHE_SIZE:
+            self._active.pop(next(iter(self._active)))
+        self._active[key] = bits
+        return bits
+
+    def service_days(self, t1: int, day: Optional[date] = None) -> List[Tuple[int, Optional[bytearray]]]:
+        """
+        (time shift, active-trip bitset) of the service days a query ending at t1 on
+        `day` can use: the previous day's trips running past midnight (HH >= 24)
+        and, for windows crossing midnight, the next day's early trips.
+        Without a day: one unshifted day, no calendar filter.
+        """
+        if day is None:
+            return [(0, None)]
+        return [(k * DAY_SEC, self.active_trips(day + timedelta(days=k)))
+                for k in (-1, 0, 1) if t1 - k * DAY_SEC >= 0]
+
+    def segments(self, t0: int, t1: int, day: Optional[date] = None) -> List[Tuple[int, int, int, Optional[bytearray]]]:
+        """
+        Connection slices answering a [t0, t1] query on service day `day`:
+        [(lo, hi, shift, active_bits), ...]. Times of a slice are c_dep[i] + shift.
+        """
+        segs = []
+        for shift, bits in self.service_days(t1, day):
+            lo, hi = self.window(t0 - shift, t1 - shift)
+            if lo < hi or day is None:
+                segs.append((lo, hi, shift, bits))
+        return segs
+
+    def scan(self, t0: int, t1: int, day: Optional[date] = None, reverse: bool = False) -> Iterator[Tuple[int, int]]:
+        """
+        Yields (connection index, time shift) in departure order (latest first if
+        reverse), inactive trips skipped. With an active realtime overlay, delayed
+        trips come from its delta list (shift includes the delay) and cancelled
+        ones not at all.
+        """
+        ov = self.overlay
+        if ov is not None and ov.active:
+            mask = ov.mask
+            segs = self.segments(t0, t1, day)
+            deltas = [(shift, bits) for shift, bits in self.service_days(t1, day)
+                      if len(range(*ov.window(t0 - shift, t1 - shift)))]
+            if len(segs) == 1 and len(deltas) == 1 and segs[0][2] == deltas[0][0]:
+                # usual case: one service day, base slice and delay list merged inline
+                lo, hi, shift, bits = segs[0]
+                return self._scan_merged(lo, hi, shift, bits, mask, *ov.window(t0 - shift, t1 - shift), reverse)
+            its = [self._scan_segment(lo, hi, shift, bits, reverse, mask) for lo, hi, shift, bits in segs]
+            its += [ov.scan(t0 - shift, t1 - shift, shift, bits, reverse) for shift, bits in deltas]
+        else:
+            segs = self.segments(t0, t1, day)
+            if len(segs) == 1:
+                return self._scan_segment(*segs[0], reverse)
+            its = [self._scan_segment(*sg, reverse) for sg in segs]
+        dep = self.c_dep
+        return heapq.merge(*its, key=lambda x: dep[x[0]] + x[1], reverse=reverse)
+
+    def _scan_segment(self, lo: int, hi: int, shift: int, bits: Optional[bytearray],
+                      reverse: bool = False, mask: Optional[bytearray] = None) -> Iterator[Tuple[int, int]]:
+        rng = range(hi - 1, lo - 1, -1) if reverse else range(lo, hi)
+        c_trip = self.c_trip
+        if mask is not None:
+            for i in rng:
+                t = c_trip[i]
+                if not mask[t >> 3] >> (t & 7) & 1 and (bits is None or bits[t >> 3] >> (t & 7) & 1):
+                    yield i, shift
+            return
+        if bits is None:
+            for i in rng:
+                yield i, shift
+            return
+        for i in rng:
+            t = c_trip[i]
+            if bits[t >> 3] >> (t & 7) & 1:
+                yield i, shift
+
+    def _scan_merged(self, lo: int, hi: int, shift: int, bits: Optional[bytearray], mask: bytearray,
+                     dlo: int, dhi: int, reverse: bool = False) -> Iterator[Tuple[int, int]]:
+        """Base slice [lo, hi) and overlay delta entries [dlo, dhi) of the same day, in departure order."""
+        delta = self.overlay._delta
+        c_dep, c_trip = self.c_dep, self.c_trip
+        if reverse:
+            rng, j, step, stop = range(hi - 1, lo - 1, -1), dhi - 1, -1, dlo - 1
+        else:
+            rng, j, step, stop = range(lo, hi), dlo, 1, dhi
+        for i in rng:
+            d = c_dep[i]
+            while j != stop and (delta[j][0] >= d if reverse else delta[j][0] <= d):
+                _, c, y = delta[j]
+                t = c_trip[c]
+                if bits is None or bits[t >> 3] >> (t & 7) & 1:
+                    yield c, shift + y
+                j += step
+            t = c_trip[i]
+            if not mask[t >> 3] >> (t & 7) & 1 and (bits is None or bits[t >> 3] >> (t & 7) & 1):
+                yield i, shift
+        while j != stop:
+            _, c, y = delta[j]
+            t = c_trip[c]
+            if bits is None or bits[t >> 3] >> (t & 7) & 1:
+                yield c, shift + y
+            j += step
+
+    def footpaths(self, s: int) -> List[Tuple[int, int, Optional[int]]]:
+        """[(to_stop, walk_sec, distance_m), ...] leaving stop s."""
+        lo, hi = self.fp_off[s], self.fp_off[s + 1]
+        return [(self.fp_to[k], self.fp_walk[k], self.fp_dist[k] if self.fp_dist[k] >= 0 else None)
+                for k in range(lo, hi)]
+
+    def incoming_footpaths(self) -> Tuple[array, array, array]:
+        """
+        Reverse footpath CSR, built on first use: for stop s,
+        (in_from[j], in_k[j]) for j in in_off[s]:in_off[s+1] are (from_stop, footpath index).
+        """
+        if self._fp_in is None:
+            n = self.n_stops
+            cnt = array("i", [0]) * (n + 1)
+            for k in range(len(self.fp_to)):
+                cnt[self.fp_to[k] + 1] += 1
+            for s in range(n):
+                cnt[s + 1] += cnt[s]
+            pos = array("i", cnt)
+            in_k = array("i", [0]) * len(self.fp_to)
+            in_from = array("i", [0]) * len(self.fp_to)
+            for s in range(n):
+                for k in range(self.fp_off[s], self.fp_off[s + 1]):
+                    j = pos[self.fp_to[k]]
+                    in_k[j], in_from[j] = k, s
+                    pos[self.fp_to[k]] = j + 1
+            self._fp_in = (cnt, in_k, in_from)
+        return self._fp_in
+
+    def trip_connections(self) -> Tuple[array, array]:
+        """CSR trip -> connection indices in ride order: t_conn[t_off[t]:t_off[t+1]] (built on first use)."""
+        if self._trip_conns is None:
+            n = self.n_trips
+            t_off = array("i", [0]) * (n + 1)
+            for t in self.c_trip:
+                t_off[t + 1] += 1
+            for t in range(n):
+                t_off[t + 1] += t_off[t]
+            pos = array("i", t_off)
+            t_conn = array("i", [0]) * len(self.c_trip)
+            for i, t in enumerate(self.c_trip):
+                t_conn[pos[t]] = i
+                pos[t] += 1
+            self._trip_conns = (t_off, t_conn)
+        return self._trip_conns
+
+    def connection(self, i: int, shift: int = 0) -> Connection:
+        """Materialize connection i as a domain object (reconstruction only)."""
+        trip = self.c_trip[i]
+        return Connection(self.c_dep[i] + shift, self.c_arr[i] + shift,
+                          self.stop_ids[self.c_from[i]], self.stop_ids[self.c_to[i]],
+                          self.trip_ids[trip], self.route_ids[self.trip_route[trip]])
+
+    @classmethod
+    def from_sqlite(cls, db_path: str) -> "Timetable":
+        """
+        Compile from a GTFS SQLite. Schema expected:
+          - stop_times(trip_id, stop_id, arrival_time, departure_time, stop_sequence)
+            (times as integer seconds, see gtfs_import, or 'HH:MM:SS' text)
+          - trips(trip_id, route_id)
+          - optional footpaths(from_stop, to_stop, walk_sec, distance_m)
+          - optional trips.service_id + calendar / calendar_dates
+        Connections = consecutive stop_times of the same trip (by stop_sequence order).
+        """
+        stop_index: Dict[str, int] = {}
+        trip_index: Dict[str, int] = {}
+        route_index: Dict[str, int] = {}
+        stop_ids: List[str] = []
+        trip_ids: List[str] = []
+        route_ids: List[str] = []
+        trip_route = array("i")
+
+        def intern(key, index, ids):
+            i = index.get(key)
+            if i is None:
+                i = index[key] = len(ids)
+                ids.append(key)
+            return i
+
+        dep, arr, frm, to, trp = array("i"), array("i"), array("i"), array("i"), array("i")
+        foot: List[Tuple[int, int, int, int]] = []
+
+        with sqlite3.connect(db_path) as db:
+            cur = db.execute("""
+                SELECT st.trip_id, t.route_id, st.stop_id, st.arrival_time, st.departure_time
+                FROM stop_times st
+                JOIN trips t ON t.trip_id = st.trip_id
+                ORDER BY st.trip_id, st.stop_sequence
+            """)
+            last_trip = None
+            last_stop = last_dep = 0
+            for trip_id, route_id, stop_id, arr_txt, dep_txt in cur:
+                s = intern(stop_id, stop_index, stop_ids)
+                if trip_id != last_trip:
+                    t = trip_index.get(trip_id)
+                    if t is None:
+                        t = intern(trip_id, trip_index, trip_ids)
+                        trip_route.append(intern(route_id, route_index, route_ids))
+                    last_trip = trip_id
+                else:
+                    a = to_seconds(arr_txt)
+                    # Skip bad rows
+                    if a >= last_dep:
+                        dep.append(last_dep); arr.append(a)
+                        frm.append(last_stop); to.append(s); trp.append(t)
+                last_stop = s
+                last_dep = to_seconds(dep_txt)
+
+            try:
+                rows = db.execute("SELECT from_stop, to_stop, walk_sec, distance_m FROM footpaths").fetchall()
+            except sqlite3.Error:
+                rows = []
+            for from_stop, to_stop, walk_sec, dist_m in rows:
+                a = intern(from_stop, stop_index, stop_ids)
+                b = intern(to_stop, stop_index, stop_ids)
+                foot.append((a, b, int(walk_sec), int(dist_m) if dist_m is not None else -1))
+
+            cal = _load_calendar(db, trip_index)
+
+        # Sort by departure time (CSA requirement)
+        order = sorted(range(len(dep)), key=dep.__getitem__)
+        def by_order(a: array) -> array:
+            return array("i", [a[i] for i in order])
+
+        # Footpaths -> transitive closure (one-hop relaxation is then exact) -> CSR by from_stop
+        # (shortest walks first per stop: scans stop relaxing once walks cannot beat the target)
+        foot = close_footpaths(foot)
+        foot.sort(key=lambda f: (f[0], f[2], f[1]))
+        fp_off = array("i", [0]) * (len(stop_ids) + 1)
+        for a, _, _, _ in foot:
+            fp_off[a + 1] += 1
+        for k in range(len(stop_ids)):
+            fp_off[k + 1] += fp_off[k]
+
+        return cls(stop_ids, trip_ids, route_ids, trip_route,
+                   by_order(dep), by_order(arr), by_order(frm), by_order(to), by_order(trp),
+                   fp_off,
+                   array("i", [f[1] for f in foot]),
+                   array("i", [f[2] for f in foot]),
+                   array("i", [f[3] for f in foot]),
+                   **cal)
+
+def close_footpaths(foot: List[Tuple[int, int, int, int]],
+                    max_walk_sec: Optional[int] = None) -> List[Tuple[int, int, int, int]]:
+    """
+    Transitive closure of (from, to, walk_sec, distance_m) footpaths: shortest walk
+    between every pair of stops linked by a chain of footpaths, up to max_walk_sec
+    (default: the longest given footpath, so a transfer walk never gets longer than
+    the feed allows for a single one). Distances add up; -1 if any hop's is unknown.
+    Dijkstra from each stop over the given footpaths, self-loops dropped.
+    """
+    if not foot:
+        return []
+    if max_walk_sec is None:
+        max_walk_sec = max(f[2] for f in foot)
+    adj: Dict[int, List[Tuple[int, int, int]]] = {}
+    for a, b, w, d in foot:
+        if a != b:
+            adj.setdefault(a, []).append((b, w, d))
+    out: List[Tuple[int, int, int, int]] = []
+    for src in adj:
+        best: Dict[int, Tuple[int, int]] = {src: (0, 0)}
+        heap = [(0, src, 0)]
+        while heap:
+            w, s, d = heapq.heappop(heap)
+            if best[s][0] < w:
+                continue
+            if s != src:
+                out.append((src, s, w, d))
+            for b, wb, db in adj.get(s, ()):
+                nw = w + wb
+                if nw <= max_walk_sec and (b not in best or nw < best[b][0]):
+                    nd = d + db if d >= 0 and db >= 0 else -1
+                    best[b] = (nw, nd)
+                    heapq.heappush(heap, (nw, b, nd))
+    return out
+
+def _table_columns(db: sqlite3.Connection, table: str) -> List[str]:
+    return [r[1] for r in db.execute(f"PRAGMA table_info({table})")]
+
+def _load_calendar(db: sqlite3.Connection, trip_index: Dict[str, int]) -> Dict[str, Sequence]:
+    """Calendar columns for Timetable(**cal); {} when the feed has no service data."""
+    if "service_id" not in _table_columns(db, "trips"):
+        return {}
+    has_cal = bool(_table_columns(db, "calendar"))
+    has_dates = bool(_table_columns(db, "calendar_dates"))
+    if not has_cal and not has_dates:
+        return {}
+
+    service_index: Dict[str, int] = {}
+    service_ids: List[str] = []
+    def sv(sid: str) -> int:
+        i = service_index.get(sid)
+        if i is None:
+            i = service_index[sid] = len(service_ids)
+            service_ids.append(sid)
+        return i
+
+    days: Dict[int, Tuple[int, int, int]] = {}
+    if has_cal:
+        for row in db.execute("""
+            SELECT service_id, monday, tuesday, wednesday, thursday, friday, saturday, sunday,
+                   start_date, end_date FROM calendar
+        """):
+            mask = sum(1 << d for d in range(7) if int(row[1 + d] or 0))
+            days[sv(row[0])] = (mask, int(row[8]), int(row[9]))
+    exceptions: List[Tuple[int, int, int]] = []
+    if has_dates:
+        for sid, d, kind in db.execute("SELECT service_id, date, exception_type FROM calendar_dates"):
+            exceptions.append((sv(sid), int(d), int(kind)))
+
+    trip_service = array("i", [-1]) * len(trip_index)
+    for trip_id, sid in db.execute("SELECT trip_id, service_id FROM trips"):
+        t = trip_index.get(trip_id)
+        if t is not None and sid is not None:
+            trip_service[t] = sv(sid)
+
+    n = len(service_ids)
+    exceptions.sort()
+    cx_off = array("i", [0]) * (n + 1)
+    for s_, _, _ in exceptions:
+        cx_off[s_ + 1] += 1
+    for k in range(n):
+        cx_off[k + 1] += cx_off[k]
+    return dict(
+        service_ids=service_ids,
+        trip_service=trip_service,
+        cal_days=array("i", [days.get(k, (0, 0, 0))[0] for k in range(n)]),
+        cal_start=array("i", [days.get(k, (0, 0, 0))[1] for k in range(n)]),
+        cal_end=array("i", [days.get(k, (0, 0, 0))[2] for k in range(n)]),
+        cx_off=cx_off,
+        cx_date=array("i", [e[1] for e in exceptions]),
+        cx_type=array("i", [e[2] for e in exceptions]),
+    )
+
+# Loaded timetables, one per file; reloaded when the file changes on disk.
+_TIMETABLES: Dict[str, Tuple[float, Timetable]] = {}
+
+def load_timetable(path: str, reload: bool = False) -> Timetable:
+    """
+    `path` is either a binary timetable (built by app.tools.build_timetable, mmap'ed)
+    or a GTFS SQLite (compiled in-process).
+    """
+    from app.adapters.router.timetable_file import is_timetable_file, open_timetable
+    mtime = os.path.getmtime(path)
+    cached = _TIMETABLES.get(path)
+    if cached and cached[0] == mtime and not reload:
+        return cached[1]
+    tt = open_timetable(path) if is_timetable_file(path) else Timetable.from_sqlite(path)
+    if not tt.version:
+        tt.version = f"{int(mtime * 1e6):x}"   # compiled SQLite: identified by its mtime
+    _TIMETABLES[path] = (mtime, tt)
+    return tt
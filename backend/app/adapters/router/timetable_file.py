@@ -0,0 +1,169 @@
+"""
+Binary timetable file (offline-built, mmap-loaded).
+
+Layout (little-endian):
+  header   : magic(8s) version(I) n_sections(I) payload_size(Q) crc32(I)
+  sections : n_sections x [name(16s) kind(c) pad(3x) offset(Q) nbytes(Q)]
+  payload  : section bodies, each 8-byte aligned
+crc32 covers everything after the header. Int sections are int32 columns;
+string tables are an int32 offsets section `<name>.off` + a utf-8 blob `<name>.str`.
+Calendar sections are optional (absent for feeds without service data).
+
+Every worker maps the same file read-only, so the OS shares the pages and
+opening is O(header) + building the stop_id -> index dict.
+"""
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from typing import Dict, List, Sequence, Tuple
+from app.adapters.router.timetable import Timetable
+
+MAGIC = b"SPKTT\x00\x00\x00"
+# v2: footpaths transitively closed and sorted shortest walk first per stop
+FORMAT_VERSION = 2
+
+_HEADER = struct.Struct("<8sIIQI")
+_SECTION = struct.Struct("<16sc3xQQ")
+
+# Int columns of Timetable stored as-is
+_INT_COLUMNS = ("trip_route", "c_dep", "c_arr", "c_from", "c_to", "c_trip",
+                "fp_off", "fp_to", "fp_walk", "fp_dist")
+_STRING_TABLES = ("stop_ids", "trip_ids", "route_ids")
+# Optional (feeds without calendar data omit them)
+_CALENDAR_COLUMNS = ("trip_service", "cal_days", "cal_start", "cal_end", "cx_off", "cx_date", "cx_type")
+
+class TimetableFormatError(ValueError):
+    pass
+
+class StringTable(Sequence[str]):
+    """Interned strings decoded lazily from an offsets column + utf-8 blob."""
+    def __init__(self, offsets: Sequence[int], blob: memoryview):
+        self._off = offsets
+        self._blob = blob
+
+    def __len__(self) -> int:
+        return len(self._off) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[k] for k in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        return bytes(self._blob[self._off[i]:self._off[i + 1]]).decode("utf-8")
+
+    def __iter__(self):
+        blob = bytes(self._blob)
+        off = self._off
+        for i in range(len(self)):
+            yield blob[off[i]:off[i + 1]].decode("utf-8")
+
+def _encode_strings(items: Sequence[str]) -> Tuple[array, bytes]:
+    off = array("i", [0])
+    parts: List[bytes] = []
+    pos = 0
+    for s in items:
+        b = s.encode("utf-8")
+        parts.append(b)
+        pos += len(b)
+        off.append(pos)
+    return off, b"".join(parts)
+
+def _check_byteorder():
+    if sys.byteorder != "little":
+        raise TimetableFormatError("timetable files are little-endian only")
+
+def write_timetable(tt: Timetable, path: str) -> int:
+    """Serialize `tt` to `path` atomically (tmp + rename). Returns the crc32."""
+    _check_byteorder()
+    sections: List[Tuple[str, bytes, bytes]] = []
+    for name in _INT_COLUMNS:
+        sections.append((name, b"i", array("i", getattr(tt, name)).tobytes()))
+    if tt.has_calendar:
+        for name in _CALENDAR_COLUMNS:
+            sections.append((name, b"i", array("i", getattr(tt, name)).tobytes()))
+    for name in _STRING_TABLES + (("service_ids",) if tt.has_calendar else ()):
+        off, blob = _encode_strings(getattr(tt, name))
+        sections.append((name + ".off", b"i", off.tobytes()))
+        sections.append((name + ".str", b"s", blob))
+
+    table_size = _SECTION.size * len(sections)
+    body = bytearray()
+    entries = bytearray()
+    base = _HEADER.size + table_size
+    for name, kind, data in sections:
+        pad = (-(base + len(body))) % 8
+        body += b"\x00" * pad
+        entries += _SECTION.pack(name.encode("ascii"), kind, base + len(body), len(data))
+        body += data
+    payload = bytes(entries) + bytes(body)
+    crc = zlib.crc32(payload)
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(sections), len(payload), crc))
+        f.write(payload)
+    # Rename over the old file: workers that mapped it keep their (unlinked) pages
+    os.replace(tmp, path)
+    return crc
+
+def is_timetable_file(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+def read_header(path: str) -> Dict[str, int]:
+    with open(path, "rb") as f:
+        magic, version, n_sections, payload_size, crc = _HEADER.unpack(f.read(_HEADER.size))
+    if magic != MAGIC:
+        raise TimetableFormatError(f"{path}: not a timetable file")
+    return {"version": version, "n_sections": n_sections, "payload_size": payload_size, "crc32": crc}
+
+def verify_timetable(path: str) -> bool:
+    hdr = read_header(path)
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        payload = memoryview(mm)[_HEADER.size:]
+        try:
+            return len(payload) == hdr["payload_size"] and zlib.crc32(payload) == hdr["crc32"]
+        finally:
+            payload.release()
+
+def open_timetable(path: str, verify: bool = False) -> Timetable:
+    """
+    Map `path` read-only and build a Timetable whose columns are memoryviews
+    into the mapping (no copy). `verify=True` also checks the crc32 (reads every page).
+    """
+    _check_byteorder()
+    hdr = read_header(path)
+    if hdr["version"] != FORMAT_VERSION:
+        raise TimetableFormatError(f"{path}: format v{hdr['version']}, expected v{FORMAT_VERSION}")
+    if verify and not verify_timetable(path):
+        raise TimetableFormatError(f"{path}: checksum mismatch")
+
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mm)
+    if len(view) != _HEADER.size + hdr["payload_size"]:
+        raise TimetableFormatError(f"{path}: truncated")
+
+    sec: Dict[str, memoryview] = {}
+    for k in range(hdr["n_sections"]):
+        name, kind, offset, nbytes = _SECTION.unpack_from(view, _HEADER.size + k * _SECTION.size)
+        chunk = view[offset:offset + nbytes]
+        sec[name.rstrip(b"\x00").decode("ascii")] = chunk.cast("i") if kind == b"i" else chunk
+
+    try:
+        strings = {n: StringTable(sec[n + ".off"], sec[n + ".str"]) for n in _STRING_TABLES}
+        cols = {n: sec[n] for n in _INT_COLUMNS}
+    except KeyError as e:
+        raise TimetableFormatError(f"{path}: missing section {e}") from None
+    if "service_ids.off" in sec:
+        cols["service_ids"] = StringTable(sec["service_ids.off"], sec["service_ids.str"])
+        cols.update({n: sec[n] for n in _CALENDAR_COLUMNS})
+
+    tt = Timetable(strings["stop_ids"], strings["trip_ids"], strings["route_ids"], **cols)
+    tt.version = f"{hdr['crc32']:08x}"
+    # keep the mapping alive as long as the timetable
+    tt._mmap = mm
+    return tt
@@ -0,0 +1,43 @@
+"""
+Read-only SQLite connection pool shared by request handlers.
+Connections are opened once (mode=ro URI, usable from any thread) and handed
+out one request at a time; the GTFS database is never written by the API.
+"""
+import queue
+import sqlite3
+from contextlib import contextmanager
+from typing import Iterator, List
+
+class ReadOnlySQLitePool:
+    def __init__(self, path: str, size: int = 4, timeout_sec: float = 5.0):
+        self.path = path
+        self.size = size
+        self.timeout_sec = timeout_sec
+        self._idle: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._all: List[sqlite3.Connection] = []
+        for _ in range(size):
+            db = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+            db.execute("PRAGMA query_only=ON")
+            self._all.append(db)
+            self._idle.put(db)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        db = self._idle.get(timeout=self.timeout_sec)
+        try:
+            yield db
+        finally:
+            self._idle.put(db)
+
+    def ping(self) -> bool:
+        try:
+            with self.connection() as db:
+                db.execute("SELECT 1").fetchone()
+            return True
+        except (sqlite3.Error, queue.Empty):
+            return False
+
+    def close(self):
+        for db in self._all:
+            db.close()
+        self._all.clear()
@@ -0,0 +1,115 @@
+"""
+Stop locations and radius queries.
+
+StopGrid projects (lat, lon) to metres around the feed's mean latitude (same
+equirectangular projection as the footpath generator) and buckets stops into
+square cells stored CSR-style: a radius query reads only the cells overlapping
+the query circle, so it costs a few dozen distance checks on a city feed.
+SQLiteStopRepository builds the grid from the GTFS SQLite `stops` table once.
+"""
+import math
+import sqlite3
+import threading
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from app.adapters.gtfs_import import EARTH_M_PER_DEG
+from app.adapters.sqlite_pool import ReadOnlySQLitePool
+from app.domain.ports import StaticGTFSRepository
+
+CELL_M = 250
+
+class StopGrid:
+    def __init__(self, stops: Sequence[Tuple[str, str, float, float]], cell_m: int = CELL_M):
+        """stops: (stop_id, stop_name, lat, lon)."""
+        self.cell_m = cell_m
+        self.stop_ids: List[str] = [s[0] for s in stops]
+        self.names: List[str] = [s[1] or s[0] for s in stops]
+        self.index: Dict[str, int] = {s: i for i, s in enumerate(self.stop_ids)}
+        lat0 = math.radians(sum(s[2] for s in stops) / len(stops)) if stops else 0.0
+        self._mx = EARTH_M_PER_DEG * math.cos(lat0)   # metres per degree of longitude
+        self._my = EARTH_M_PER_DEG
+        self.x = array("d", (s[3] * self._mx for s in stops))
+        self.y = array("d", (s[2] * self._my for s in stops))
+        # cell (cx, cy) -> slice of `members`
+        cells: Dict[Tuple[int, int], List[int]] = {}
+        for i in range(len(stops)):
+            cells.setdefault(self._cell(self.x[i], self.y[i]), []).append(i)
+        self.members = array("i")
+        self.cells: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        for key, idx in cells.items():
+            self.cells[key] = (len(self.members), len(self.members) + len(idx))
+            self.members.extend(idx)
+
+    def __len__(self) -> int:
+        return len(self.stop_ids)
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return int(x // self.cell_m), int(y // self.cell_m)
+
+    def within(self, x: float, y: float, radius_m: float) -> List[Tuple[float, int]]:
+        """(distance_m, stop) for stops within radius_m of projected point (x, y), nearest first."""
+        cx0, cy0 = self._cell(x - radius_m, y - radius_m)
+        cx1, cy1 = self._cell(x + radius_m, y + radius_m)
+        xs, ys, members, cells = self.x, self.y, self.members, self.cells
+        r2 = radius_m * radius_m
+        out = []
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                span = cells.get((cx, cy))
+                if span is None:
+                    continue
+                for j in range(span[0], span[1]):
+                    i = members[j]
+                    d2 = (xs[i] - x) ** 2 + (ys[i] - y) ** 2
+                    if d2 <= r2:
+                        out.append((math.sqrt(d2), i))
+        out.sort()
+        return out
+
+    def near_stop(self, stop_id: str, radius_m: float) -> List[Tuple[float, int]]:
+        """Stops within radius_m of stop_id (itself included, at 0 m); [] for unknown stops."""
+        i = self.index.get(stop_id)
+        if i is None:
+            return []
+        return self.within(self.x[i], self.y[i], radius_m)
+
+    def near_point(self, lat: float, lon: float, radius_m: float) -> List[Tuple[float, int]]:
+        return self.within(lon * self._mx, lat * self._my, radius_m)
+
+class SQLiteStopRepository(StaticGTFSRepository):
+    """Located stops (location_type 0) of the GTFS SQLite; feeds without a stops table give an empty grid."""
+    def __init__(self, db: ReadOnlySQLitePool, cell_m: int = CELL_M):
+        self.db = db
+        self.cell_m = cell_m
+        self._grid: Optional[StopGrid] = None
+        self._lock = threading.Lock()
+
+    @property
+    def grid(self) -> StopGrid:
+        if self._grid is None:
+            with self._lock:
+                if self._grid is None:
+                    self._grid = StopGrid(self._load(), self.cell_m)
+        return self._grid
+
+    def _load(self) -> List[Tuple[str, str, float, float]]:
+        try:
+            with self.db.connection() as db:
+                return db.execute("""
+                    SELECT stop_id, stop_name, stop_lat, stop_lon FROM stops
+                    WHERE stop_lat IS NOT NULL AND stop_lon IS NOT NULL AND COALESCE(location_type, 0) = 0
+                    ORDER BY stop_id
+                """).fetchall()
+        except sqlite3.OperationalError:
+            return []
+
+    def stops_nearby(self, stop_id: str, radius_m: int) -> Dict[str, Any]:
+        g = self.grid
+        return {
+            "stop_id": stop_id,
+            "radius_m": radius_m,
+            "stops": [
+                {"stop_id": g.stop_ids[i], "stop_name": g.names[i], "distance_m": int(round(d))}
+                for d, i in g.near_stop(stop_id, radius_m)
+            ]
+        }
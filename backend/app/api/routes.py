@@ -1,39 +1,196 @@
-from fastapi import APIRouter, Depends, Query
+import hashlib
+import json
+from datetime import date
+from typing import Any, List, Literal, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, WebSocket
+from fastapi import WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field
+from app.application import services
+from app.application.broadcast import LiveBroadcaster
 from app.application.services import JourneyRadarService, get_service
-from app.application.services import DEMO_SCENARIO
+from app.domain.entities import CrowdReport, JourneyRequest
+from app.settings import settings
 
 router = APIRouter()
 
+def conditional_json(request: Request, body: Any) -> Response:
+    """JSON response with a content ETag; 304 without a body when If-None-Match already has it."""
+    raw = json.dumps(body, separators=(",", ":"), ensure_ascii=False).encode()
+    etag = '"%s"' % hashlib.sha1(raw).hexdigest()[:20]
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in (t.strip() for t in request.headers.get("if-none-match", "").split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(raw, media_type="application/json", headers=headers)
+
 @router.get("/status")
-async def status(svc: JourneyRadarService = Depends(get_service)):
-    return await svc.get_status()
+async def status(request: Request, svc: JourneyRadarService = Depends(get_service)):
+    return conditional_json(request, await svc.get_status())
 
 @router.get("/alerts")
-async def alerts(svc: JourneyRadarService = Depends(get_service)):
-    return await svc.get_alerts()
+async def alerts(request: Request, svc: JourneyRadarService = Depends(get_service)):
+    return conditional_json(request, await svc.get_alerts())
 
 @router.get("/alternatives")
 async def alternatives(from_stop: str, radius_m: int = 400, window_min: int = 20, svc: JourneyRadarService = Depends(get_service)):
     return await svc.get_alternatives(from_stop, radius_m, window_min)
 
 @router.get("/bulletins")
-async def bulletins(svc: JourneyRadarService = Depends(get_service)):
+async def bulletins(request: Request, svc: JourneyRadarService = Depends(get_service)):
     # in demo serviamo il file; in reale potresti leggere da DB
-    return {"bulletins": svc.repo.load_fixture("demo_bulletins.json").get("bulletins", [])}
+    return conditional_json(request, {"bulletins": svc.repo.load_fixture("demo_bulletins.json").get("bulletins", [])})
 
 @router.post("/_demo/scenario")
-async def set_scenario(s: str):
-    global DEMO_SCENARIO
+async def set_scenario(s: str, svc: JourneyRadarService = Depends(get_service)):
     if s in ("normal","heavy"):
-        DEMO_SCENARIO = s
-    return {"scenario": DEMO_SCENARIO}
+        services.DEMO_SCENARIO = s
+        await svc.publish_live(alerts=False)
+    return {"scenario": services.DEMO_SCENARIO}
+
+async def sse_events(live: LiveBroadcaster, last_event_id: Optional[str] = None):
+    """SSE frames for one client: snapshot (or missed deltas), then deltas; comments as heartbeats."""
+    sub = live.subscribe(last_event_id)
+    try:
+        yield b"retry: 3000\n\n"
+        while True:
+            msg = await live.next(sub, settings.stream_heartbeat_sec)
+            yield msg.sse if msg is not None else b": ping\n\n"
+    finally:
+        live.unsubscribe(sub)
+
+@router.get("/stream")
+async def stream(last_event_id: Optional[str] = Header(None), svc: JourneyRadarService = Depends(get_service)):
+    """Server-sent events: line status and alert changes pushed as they happen (see application.broadcast)."""
+    return StreamingResponse(sse_events(svc.live, last_event_id), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.websocket("/stream/ws")
+async def stream_ws(ws: WebSocket, svc: JourneyRadarService = Depends(get_service)):
+    """Same messages as /stream, one JSON text frame each."""
+    await ws.accept()
+    sub = svc.live.subscribe(ws.query_params.get("last_event_id"))
+    try:
+        while True:
+            msg = await svc.live.next(sub, settings.stream_heartbeat_sec)
+            if msg is None:
+                await ws.send_text('{"type":"ping"}')
+            else:
+                await ws.send_text(msg.json)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        svc.live.unsubscribe(sub)
 
 
 @router.get("/plan")
 async def plan(
     from_stop: str = Query(...),
     to_stop: str = Query(...),
-    depart_at: int = Query(..., description="seconds since midnight"),
+    depart_at: Optional[int] = Query(None, description="seconds since midnight, default now (feed timezone)"),
+    service_date: Optional[date] = Query(None, alias="date", description="YYYY-MM-DD, default today (feed timezone)"),
+    depart_until: Optional[int] = Query(None, description="profile query: latest departure, seconds since midnight"),
+    max_transfers: int = Query(3, ge=0, le=6),
+    reliability: Optional[float] = Query(None, gt=0, lt=1,
+                                         description="buffer transfers with this quantile of historical delay, e.g. 0.9"),
+    svc: JourneyRadarService = Depends(get_service)
+):
+    if reliability is not None:
+        try:
+            svc.check_reliability(reliability)
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+    return await svc.plan(from_stop, to_stop, depart_at, service_date, depart_until, max_transfers, reliability)
+
+@router.get("/delays")
+async def delays(
+    route_id: str = Query(...),
+    stop_id: Optional[str] = Query(None, description="omit for the whole route"),
+    at: int = Query(..., description="scheduled time, seconds since midnight"),
+    svc: JourneyRadarService = Depends(get_service)
+):
+    return await svc.delay_quantiles(route_id, stop_id, at)
+
+
+@router.get("/plan/cache")
+async def plan_cache_stats(svc: JourneyRadarService = Depends(get_service)):
+    return svc.cache.stats() if svc.cache is not None else {}
+
+class PlanItem(BaseModel):
+    from_stop: str
+    to_stop: str
+    depart_at: int
+    service_date: Optional[date] = Field(None, alias="date")
+    depart_until: Optional[int] = None
+    max_transfers: int = Field(3, ge=0, le=6)
+
+class PlanBatch(BaseModel):
+    requests: List[PlanItem]
+
+@router.post("/plan/batch")
+async def plan_batch(body: PlanBatch, svc: JourneyRadarService = Depends(get_service)):
+    """NDJSON stream, one line per request as it is answered: {"index": i, "itineraries": [...]}."""
+    if len(body.requests) > settings.plan_batch_max:
+        raise HTTPException(413, f"at most {settings.plan_batch_max} requests per batch")
+    reqs = [JourneyRequest(from_stop=r.from_stop, to_stop=r.to_stop, depart_at=r.depart_at,
+                           max_transfers=r.max_transfers, service_date=r.service_date, depart_until=r.depart_until)
+            for r in body.requests]
+
+    async def lines():
+        async for item in svc.plan_batch(reqs):
+            yield json.dumps(item, separators=(",", ":")) + "\n"
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@router.get("/reachable")
+async def reachable(
+    from_stop: str = Query(...),
+    depart_at: Optional[int] = Query(None, description="seconds since midnight, default now (feed timezone)"),
+    budget_min: int = Query(20, ge=1, le=240),
+    service_date: Optional[date] = Query(None, alias="date", description="YYYY-MM-DD, default today (feed timezone)"),
+    svc: JourneyRadarService = Depends(get_service)
+):
+    return await svc.reachable(from_stop, depart_at, budget_min, service_date)
+
+@router.get("/departures")
+async def departures(
+    stop_id: List[str] = Query(..., description="one or more stops (repeat the parameter)"),
+    depart_at: Optional[int] = Query(None, description="seconds since midnight, default now (feed timezone)"),
+    window_min: int = Query(60, ge=1, le=24 * 60),
+    limit: int = Query(10, ge=1, le=200, description="departures per stop"),
+    service_date: Optional[date] = Query(None, alias="date", description="YYYY-MM-DD, default today (feed timezone)"),
+    svc: JourneyRadarService = Depends(get_service)
+):
+    if len(stop_id) > settings.departures_max_stops:
+        raise HTTPException(413, f"at most {settings.departures_max_stops} stops per call")
+    return await svc.departures(stop_id, depart_at, window_min, limit, service_date)
+
+class ReportIn(BaseModel):
+    model_config = ConfigDict(str_strip_whitespace=True)
+    type: Literal["delay", "disruption", "other"] = "other"
+    text: str = Field(..., min_length=1, max_length=2000)
+    line: str = Field("", max_length=32)
+    stop_id: str = Field("", max_length=64)
+
+@router.post("/reports", status_code=202)
+async def submit_report(body: ReportIn, svc: JourneyRadarService = Depends(get_service)):
+    return await svc.submit_report(CrowdReport(type=body.type, text=body.text, line=body.line, stop_id=body.stop_id))
+
+@router.get("/reports/counts")
+async def report_counts(
+    by: Literal["stop", "line", "type"] = "stop",
+    window_min: int = Query(0, ge=0, description="0 = all time, else one of REPORTS_WINDOWS_MIN"),
+    key: Optional[str] = Query(None, description="one stop / line / type: just its count"),
+    svc: JourneyRadarService = Depends(get_service)
+):
+    try:
+        return await svc.report_counts(by, window_min, key)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+@router.get("/admin/reports")
+async def admin_reports(
+    limit: int = Query(50, ge=1, le=500),
+    before: Optional[int] = Query(None, description="next_before of the previous page"),
+    stop_id: str = "", line: str = "", type: str = "",
     svc: JourneyRadarService = Depends(get_service)
 ):
-    return await svc.plan(from_stop, to_stop, depart_at)
+    return await svc.reports_page(limit, before, stop=stop_id, line=line, type=type)
@@ -0,0 +1,139 @@
+"""
+Live status/alert stream: one in-process broadcaster, many subscribers.
+
+The broadcaster keeps the current lines (by route_id) and alerts (by id).
+publish() diffs a new /status or /alerts body against them and, when
+something changed, builds one message, serialized once (JSON and SSE frame),
+and appends it to every subscriber's queue:
+  {"type": "snapshot", "id", "seq", "lines", "alerts"}              on connect / resync
+  {"type": "delta", "id", "seq", "lines", "lines_removed", "alerts", "alerts_expired"}
+Backpressure is per subscriber: a client whose queue is full (it reads slower
+than updates arrive) has its backlog dropped and gets a fresh snapshot next,
+so a slow client costs bounded memory and never delays the others. Recent
+deltas are kept so a reconnect with Last-Event-ID only replays what it missed
+(event ids carry a per-process epoch: ids from another worker or before a
+restart get a snapshot).
+Everything runs on the event loop (poller listeners, request handlers).
+"""
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set
+from app.metrics import REGISTRY
+
+STREAM_MESSAGES = REGISTRY.counter("spooroute_stream_messages_total", "Stream messages built.", ("type",))
+STREAM_RESYNCS = REGISTRY.counter("spooroute_stream_resyncs_total", "Slow stream clients reset to a snapshot.")
+STREAM_CLIENTS = REGISTRY.gauge("spooroute_stream_clients", "Connected stream clients.")
+
+class Message:
+    """One update, serialized once for every client."""
+    __slots__ = ("seq", "json", "sse")
+
+    def __init__(self, epoch: str, seq: int, kind: str, body: Dict[str, Any]):
+        self.seq = seq
+        event_id = f"{epoch}.{seq}"
+        self.json = json.dumps({"type": kind, "id": event_id, "seq": seq, **body},
+                               separators=(",", ":"), ensure_ascii=False)
+        self.sse = f"id: {event_id}\nevent: {kind}\ndata: {self.json}\n\n".encode()
+        STREAM_MESSAGES.inc(type=kind)
+
+class Subscriber:
+    __slots__ = ("queue", "event", "resync")
+
+    def __init__(self):
+        self.queue: Deque[Message] = deque()
+        self.event = asyncio.Event()
+        self.resync = False
+
+class LiveBroadcaster:
+    def __init__(self, queue_max: int = 64, history: int = 64):
+        self.queue_max = queue_max
+        self.epoch = f"{os.getpid():x}{int(time.time()):x}"
+        self.seq = 0
+        self.lines: Dict[str, dict] = {}
+        self.alerts: Dict[str, dict] = {}
+        self._subs: Set[Subscriber] = set()
+        self._history: Deque[Message] = deque(maxlen=history)
+        self._snapshot: Optional[Message] = None
+
+    def __len__(self) -> int:
+        return len(self._subs)
+
+    def publish(self, lines: Optional[Iterable[dict]] = None,
+                alerts: Optional[Iterable[dict]] = None) -> Optional[Message]:
+        """New /status lines and/or /alerts list (None = unchanged); fans out the delta, if any."""
+        body: Dict[str, List] = {"lines": [], "lines_removed": [], "alerts": [], "alerts_expired": []}
+        if lines is not None:
+            body["lines"], body["lines_removed"] = _diff(self.lines, lines, "route_id")
+        if alerts is not None:
+            body["alerts"], body["alerts_expired"] = _diff(self.alerts, alerts, "id")
+        if not any(body.values()):
+            return None
+        self.seq += 1
+        msg = Message(self.epoch, self.seq, "delta", body)
+        self._history.append(msg)
+        self._snapshot = None
+        for sub in self._subs:
+            if sub.resync:
+                pass   # the snapshot it gets next covers this update
+            elif len(sub.queue) >= self.queue_max:
+                sub.queue.clear()
+                sub.resync = True
+                STREAM_RESYNCS.inc()
+            else:
+                sub.queue.append(msg)
+            sub.event.set()
+        return msg
+
+    def snapshot(self) -> Message:
+        """Current state; built once per seq however many clients (re)connect."""
+        if self._snapshot is None or self._snapshot.seq != self.seq:
+            body = {"lines": list(self.lines.values()), "alerts": list(self.alerts.values())}
+            self._snapshot = Message(self.epoch, self.seq, "snapshot", body)
+        return self._snapshot
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Subscriber:
+        """New client: the deltas after last_event_id if still in the history, else a snapshot first."""
+        sub = Subscriber()
+        last_seq = self._parse_id(last_event_id)
+        oldest = self._history[0].seq if self._history else self.seq + 1
+        if last_seq is not None and oldest - 1 <= last_seq <= self.seq:
+            sub.queue.extend(m for m in self._history if m.seq > last_seq)
+        else:
+            sub.queue.append(self.snapshot())
+        self._subs.add(sub)
+        STREAM_CLIENTS.set(len(self._subs))
+        return sub
+
+    def _parse_id(self, event_id: Optional[str]) -> Optional[int]:
+        epoch, _, seq = (event_id or "").partition(".")
+        return int(seq) if epoch == self.epoch and seq.isdigit() else None
+
+    def unsubscribe(self, sub: Subscriber):
+        self._subs.discard(sub)
+        STREAM_CLIENTS.set(len(self._subs))
+
+    async def next(self, sub: Subscriber, timeout: Optional[float] = None) -> Optional[Message]:
+        """The subscriber's next message; None after `timeout` seconds without one (send a heartbeat)."""
+        while not sub.queue and not sub.resync:
+            sub.event.clear()
+            try:
+                await asyncio.wait_for(sub.event.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        if sub.resync:
+            sub.resync = False
+            sub.queue.clear()
+            return self.snapshot()
+        return sub.queue.popleft()
+
+def _diff(current: Dict[str, dict], items: Iterable[dict], key: str):
+    """Update current (key -> item) in place to items; returns (new or changed items, removed keys)."""
+    new = {it[key]: it for it in items}
+    changed = [it for k, it in new.items() if current.get(k) != it]
+    removed = [k for k in current if k not in new]
+    current.clear()
+    current.update(new)
+    return changed, removed
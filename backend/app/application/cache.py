@@ -0,0 +1,77 @@
+"""
+Plan result cache: bounded LRU with TTL over serialized itineraries.
+Keys are built by the service (origin, destination, departure bucket, ...,
+timetable version); each entry remembers the trips its itineraries ride so
+realtime updates can drop exactly the affected entries.
+Used from the event loop only (no locking).
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+class PlanCache:
+    def __init__(self, max_entries: int = 10_000, ttl_sec: float = 300.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self._clock = clock
+        # key -> (expires_at, value, trip ids)
+        self._data: "OrderedDict[Hashable, Tuple[float, Any, Tuple[str, ...]]]" = OrderedDict()
+        self._by_trip: Dict[str, Set[Hashable]] = {}
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] <= self._clock():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Hashable, value: Any, trips: Iterable[str] = ()):
+        if key in self._data:
+            self._remove(key)
+        trips = tuple(set(trips))
+        self._data[key] = (self._clock() + self.ttl_sec, value, trips)
+        for t in trips:
+            self._by_trip.setdefault(t, set()).add(key)
+        while len(self._data) > self.max_entries:
+            self._remove(next(iter(self._data)))
+            self.evictions += 1
+
+    def invalidate_trips(self, trip_ids: Iterable[str]) -> int:
+        """Drop every entry riding one of trip_ids (e.g. delayed or cancelled). Returns the count."""
+        keys: Set[Hashable] = set()
+        for t in trip_ids:
+            keys |= self._by_trip.get(t, set())
+        for k in keys:
+            self._remove(k)
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self):
+        self._data.clear()
+        self._by_trip.clear()
+
+    def _remove(self, key: Hashable):
+        _, _, trips = self._data.pop(key)
+        for t in trips:
+            keys = self._by_trip.get(t)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_trip[t]
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._data), "max_entries": self.max_entries,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "expirations": self.expirations, "invalidations": self.invalidations}
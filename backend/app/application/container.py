@@ -0,0 +1,198 @@
+"""
+Process-wide wiring: planner, compiled timetable, caches, pools and the
+JourneyRadarService are built once per worker (FastAPI lifespan, see main.py)
+and shared by every request instead of being rebuilt per call.
+"""
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+from app.adapters.alternatives import SimpleAlternativeSuggester
+from app.adapters.feed_time import FeedClock, feed_timezone, zone
+from app.adapters.realtime.history import DelayHistory
+from app.adapters.realtime.poller import GtfsRtPoller
+from app.adapters.realtime.store import DelayStore
+from app.adapters.router.overlay import RealtimeOverlay
+from app.adapters.reports import SQLiteReportStore
+from app.adapters.repositories import FixtureRepository
+from app.adapters.router.pool import PlannerPool
+from app.adapters.sqlite_pool import ReadOnlySQLitePool
+from app.adapters.stops import SQLiteStopRepository
+from app.application.broadcast import LiveBroadcaster
+from app.application.cache import PlanCache
+from app.application.services import JourneyRadarService, planner_class
+from app.domain.entities import JourneyRequest
+from app.settings import settings
+
+log = logging.getLogger(__name__)
+
+class Container:
+    def __init__(self):
+        cls = planner_class()
+        self.planner = cls(settings.gtfs_sqlite_path)
+        self.cache = PlanCache(settings.plan_cache_size, settings.plan_cache_ttl_sec)
+        # "today" / "now" in the feed's timezone, not the server's
+        self.clock = FeedClock(zone(settings.feed_timezone or feed_timezone(settings.gtfs_sqlite_path)))
+        self.pool = PlannerPool(cls, settings.gtfs_sqlite_path, settings.timetable_path,
+                                workers=settings.plan_workers)
+        self.gtfs_db: Optional[ReadOnlySQLitePool] = None
+        if os.path.exists(settings.gtfs_sqlite_path):
+            self.gtfs_db = ReadOnlySQLitePool(settings.gtfs_sqlite_path, settings.sqlite_pool_size)
+        self.stops = SQLiteStopRepository(self.gtfs_db) if self.gtfs_db is not None else None
+        self.history = self._delay_history(self.clock)
+        self.planner.delay_history = self.history
+        # one writer thread: the trip walk and day-file I/O stay off the event loop, one poll at a time
+        self._history_writer = ThreadPoolExecutor(1, thread_name_prefix="delay-history")
+        self.realtime: Optional[GtfsRtPoller] = None
+        if settings.gtfs_rt_trip_updates_url or settings.gtfs_rt_alerts_url:
+            self.realtime = GtfsRtPoller(settings.gtfs_rt_trip_updates_url or None,
+                                         settings.gtfs_rt_alerts_url or None,
+                                         settings.realtime_poll_sec,
+                                         delays=DelayStore(route_of=self._route_of))
+            self.realtime.listeners.append(self.apply_delays)
+            self.realtime.listeners.append(self.cache.invalidate_trips)
+            self.realtime.listeners.append(self.record_delays)
+        self.reports = self._report_store()
+        suggester = SimpleAlternativeSuggester(self.stops, self.planner, clock=self.clock.now)
+        self.live = LiveBroadcaster(settings.stream_queue_max)
+        self.service = JourneyRadarService(FixtureRepository(), suggester, self.planner,
+                                           pool=self.pool, cache=self.cache, realtime=self.realtime,
+                                           live=self.live, reports=self.reports, history=self.history,
+                                           clock=self.clock)
+        if self.realtime is not None:
+            # stream clients get the changed lines / alerts right after each poll
+            self.realtime.listeners.append(
+                lambda _: self.live.publish(lines=self.realtime.delays.snapshot["lines"]))
+            self.realtime.alert_listeners.append(
+                lambda _: self.live.publish(alerts=self.realtime.alerts.snapshot["alerts"]))
+        self.ready = False
+        self.warmup_sec: Optional[float] = None
+        self.warmup_error: Optional[str] = None
+
+    def warm_up(self):
+        """Load the timetable (and engine indexes) and run one query, so the first user request is not the slow one."""
+        t = time.perf_counter()
+        try:
+            if os.path.exists(self.planner._source()):
+                tt = self.planner.timetable
+                if tt.n_stops:
+                    if hasattr(self.planner, "index"):
+                        self.planner.index(tt)
+                    if self.realtime is not None:
+                        tt.trip_connections(), tt.trip_index   # overlay lookups, built off the event loop
+                    self.planner.boards()
+                    if self.stops is not None:
+                        self.stops.grid
+                    s = tt.stop_ids[0]
+                    self.planner.plan(JourneyRequest(s, s if tt.n_stops == 1 else tt.stop_ids[-1], 8 * 3600))
+        except Exception as e:
+            self.warmup_error = f"{type(e).__name__}: {e}"
+            log.exception("planner warm-up failed")
+        self.warmup_sec = round(time.perf_counter() - t, 3)
+        # a feed that failed to load must keep the readiness probe failing
+        self.ready = self.warmup_error is None
+
+    @staticmethod
+    def _report_store() -> SQLiteReportStore:
+        path = settings.reports_sqlite_path
+        if not os.path.isdir(os.path.dirname(os.path.abspath(path))):
+            log.warning("no directory for %s: rider reports are kept in memory only", path)
+            path = ":memory:"
+        windows = [int(w) for w in settings.reports_windows_min.split(",") if w.strip()]
+        return SQLiteReportStore(path, windows, settings.reports_flush_sec, settings.reports_batch_max)
+
+    @staticmethod
+    def _delay_history(clock: FeedClock) -> DelayHistory:
+        path: Optional[str] = settings.delay_history_path
+        if not os.path.isdir(os.path.dirname(os.path.abspath(path))):
+            log.warning("no directory for %s: delay history is kept in memory only", path)
+            path = None
+        return DelayHistory(path, settings.delay_history_days, settings.delay_bucket_min,
+                            [float(q) for q in settings.delay_quantiles.split(",") if q.strip()],
+                            settings.delay_min_samples, tz=clock.tz)
+
+    def record_delays(self, _trip_ids=None):
+        """Realtime listener: add the running trips' delays to the history (once per trip and stop)."""
+        tt = self.planner._timetable
+        if tt is None:
+            return
+        return self._history_writer.submit(self._record, tt, list(self.realtime.delays.items()))
+
+    def _record(self, tt, delays):
+        try:
+            self.history.observe_feed(tt, delays)
+            self.history.flush()
+        except Exception:
+            log.exception("delay history update failed")
+
+    def apply_delays(self, trip_ids):
+        """Realtime listener: patch predicted times into the planner's timetable (changed trips only)."""
+        tt = self.planner._timetable
+        if tt is None:
+            return
+        store = self.realtime.delays
+        if tt.overlay is None:
+            # first update for this timetable (or a reloaded feed): take the whole current state
+            tt.overlay = RealtimeOverlay(tt)
+            trip_ids = set(trip_ids) | {t for t, _, _ in store.items()}
+        tt.overlay.update(trip_ids, store.get)
+
+    def _route_of(self, trip_id: str) -> Optional[str]:
+        tt = self.planner._timetable
+        return tt.route_of(trip_id) if tt is not None else None
+
+    async def start(self):
+        await asyncio.get_running_loop().run_in_executor(None, self.warm_up)
+        await self.service.publish_live()
+        if self.realtime is not None:
+            self.realtime.start()
+
+    async def stop(self):
+        if self.realtime is not None:
+            await self.realtime.stop()
+        self.close()
+
+    def close(self):
+        self.pool.shutdown()
+        self._history_writer.shutdown(wait=True)
+        self.reports.close()
+        if self.gtfs_db is not None:
+            self.gtfs_db.close()
+
+    def health(self) -> Dict[str, Any]:
+        tt = self.planner._timetable
+        return {
+            "status": "ok",
+            "ready": self.ready,
+            "engine": settings.planner_engine,
+            "timetable": None if tt is None else {
+                "version": tt.version, "connections": len(tt), "stops": tt.n_stops},
+            "gtfs_db": self.gtfs_db.ping() if self.gtfs_db is not None else None,
+            "warmup_sec": self.warmup_sec,
+            "warmup_error": self.warmup_error,
+            "realtime": self.realtime.stats() if self.realtime is not None else None,
+            "delay_history": self.history.stats(),
+        }
+
+_CONTAINER: Optional[Container] = None
+
+def get_container() -> Container:
+    """The process container; created on first use (lifespan, or lazily in tests/scripts)."""
+    global _CONTAINER
+    if _CONTAINER is None:
+        _CONTAINER = Container()
+    return _CONTAINER
+
+def close_container():
+    global _CONTAINER
+    if _CONTAINER is not None:
+        _CONTAINER.close()
+        _CONTAINER = None
+
+async def stop_container():
+    global _CONTAINER
+    if _CONTAINER is not None:
+        await _CONTAINER.stop()
+        _CONTAINER = None
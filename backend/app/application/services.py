@@ -1,10 +1,48 @@
 # backend/app/application/services.py
-from typing import Any, Dict, Optional, List
+import asyncio
+import copy
+import functools
+from dataclasses import asdict, replace
+from datetime import date
+from typing import Any, AsyncIterator, Dict, Optional, List
 from app.settings import settings
+from app.application.broadcast import LiveBroadcaster
+from app.application.cache import PlanCache
 from app.adapters.repositories import FixtureRepository
 from app.adapters.alternatives import SimpleAlternativeSuggester
+from app.adapters.feed_time import FeedClock
+from app.adapters.realtime.history import DelayHistory
 from app.adapters.router.csa_planner import CsaRoutePlanner
-from app.domain.entities import JourneyRequest, Itinerary
+from app.adapters.router.pool import PlannerPool
+from app.adapters.router.raptor_planner import RaptorRoutePlanner
+from app.domain.entities import CrowdReport, Departure, JourneyRequest, Itinerary
+from app.domain.ports import RealtimeProvider, ReportRepository, RoutePlannerPort
+from app.metrics import REGISTRY, stage, timer
+
+SERVICE_SECONDS = REGISTRY.histogram("spooroute_service_seconds", "JourneyRadarService call time.", ("op",))
+SERVICE_STAGE_SECONDS = REGISTRY.histogram(
+    "spooroute_service_stage_seconds", "JourneyRadarService time per stage.", ("op", "stage"))
+SERVICE_ERRORS = REGISTRY.counter("spooroute_service_errors_total", "JourneyRadarService calls that raised.", ("op",))
+PLAN_CACHE_LOOKUPS = REGISTRY.counter("spooroute_plan_cache_lookups_total", "Plan cache lookups.", ("result",))
+
+def _timed(op: str):
+    """Time an async service call into SERVICE_SECONDS{op} (and the request profile); count errors."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        async def run(*args, **kwargs):
+            with timer(SERVICE_SECONDS, f"service.{op}", op=op):
+                try:
+                    return await fn(*args, **kwargs)
+                except Exception:
+                    SERVICE_ERRORS.inc(op=op)
+                    raise
+        return run
+    return wrap
+
+def _stage(op: str, name: str):
+    return stage(SERVICE_STAGE_SECONDS, name, f"service.{op}.", op=op)
+
+PLANNER_ENGINES = {"csa": CsaRoutePlanner, "raptor": RaptorRoutePlanner}
 
 # demo scenario toggle (usato altrove se implementi switcher)
 DEMO_SCENARIO = "normal"  # normal|heavy
@@ -13,60 +51,286 @@ class JourneyRadarService:
     def __init__(self,
                  repo: FixtureRepository,
                  suggester: SimpleAlternativeSuggester,
-                 planner: Optional[CsaRoutePlanner] = None):
+                 planner: Optional[RoutePlannerPort] = None,
+                 pool: Optional[PlannerPool] = None,
+                 cache: Optional[PlanCache] = None,
+                 realtime: Optional[RealtimeProvider] = None,
+                 live: Optional[LiveBroadcaster] = None,
+                 reports: Optional[ReportRepository] = None,
+                 history: Optional[DelayHistory] = None,
+                 clock: Optional[FeedClock] = None):
         self.repo = repo
         self.suggester = suggester
         self.planner = planner or CsaRoutePlanner()
+        self.pool = pool
+        self.cache = cache
+        self.realtime = realtime
+        self.live = live or LiveBroadcaster()
+        self.reports = reports
+        self.history = history
+        self.clock = clock or FeedClock()
 
+    @_timed("status")
     async def get_status(self) -> Dict[str, Any]:
         if settings.demo_mode:
             fname = "demo_delays.json" if DEMO_SCENARIO == "normal" else "demo_delays_heavy.json"
             return self.repo.load_fixture(fname)
+        if self.realtime is not None:
+            return await self.realtime.fetch_status()
         return {"lines": []}
 
+    @_timed("alerts")
     async def get_alerts(self) -> Dict[str, Any]:
         if settings.demo_mode:
             return self.repo.load_fixture("demo_alerts.json")
+        if self.realtime is not None:
+            return await self.realtime.fetch_alerts()
         return {"alerts": []}
 
+    @_timed("alternatives")
     async def get_alternatives(self, from_stop: str, radius_m: int, window_min: int) -> Dict[str, Any]:
         if settings.demo_mode:
             per_stop = f"demo_alternatives_{from_stop}.json"
             data = getattr(self.repo, "load_fixture_if_exists", lambda _: None)(per_stop)
             if not data:
-                data = self.repo.load_fixture("demo_alternatives.json")
-                data["from_stop"] = from_stop
+                data = dict(self.repo.load_fixture("demo_alternatives.json"), from_stop=from_stop)
             return data
-        return self.suggester.suggest(from_stop, radius_m, window_min)
+        # the first call builds the stop grid, timetable and boards: off the event loop
+        return await asyncio.to_thread(self.suggester.suggest, from_stop, radius_m, window_min)
 
-    async def plan(self, from_stop: str, to_stop: str, depart_at: int) -> Dict[str, Any]:
+    @_timed("plan")
+    async def plan(self, from_stop: str, to_stop: str, depart_at: Optional[int] = None,
+                   service_date: Optional[date] = None,
+                   depart_until: Optional[int] = None,
+                   max_transfers: int = 3,
+                   reliability: Optional[float] = None) -> Dict[str, Any]:
         """
         Always try planner; if DB missing or no path, demo fallback inside the planner returns a synthetic itinerary.
+        depart_at / service_date default to now / today in the feed's timezone
+        (only trips running that day are considered).
+        Returns every Pareto-optimal option (fastest, fewer changes, and with
+        depart_until also later departures), not just the fastest one.
+        reliability (a tracked delay quantile, e.g. 0.9) buffers every transfer
+        with how late the arriving route usually is there (see check_reliability).
+        With a cache, departures share an entry per plan_cache_bucket_sec: the entry
+        holds every option leaving in the bucket (a profile) or after it (a plan
+        from the bucket's end), and each request keeps the ones leaving at or after
+        its own depart_at. Reliability plans (no slack in profiles) are keyed on
+        the exact time, and pairs with a walk-only option are planned per request.
+        Callers get their own copy of a cached answer.
+        Planner errors (e.g. a feed that fails to load) propagate.
         """
-        req = JourneyRequest(from_stop=from_stop, to_stop=to_stop, depart_at=depart_at)
-        itins: List[Itinerary] = self.planner.plan(req)
-        out = []
-        for it in itins:
-            out.append({
-                "total_time": it.total_time,
-                "transfers": it.transfers,
-                "legs": [
-                    {
-                        "mode": lg.mode,
-                        "from_stop": lg.from_stop,
-                        "to_stop": lg.to_stop,
-                        "dep_time": lg.dep_time,
-                        "arr_time": lg.arr_time,
-                        "route_id": lg.route_id,
-                        "trip_id": lg.trip_id,
-                        "distance_m": lg.distance_m,
-                    } for lg in it.legs
-                ]
-            })
+        depart_at, service_date = self.clock.resolve(depart_at, service_date)
+        if depart_until is not None and depart_until <= depart_at:
+            depart_until = None   # the planner treats it as a plain query anyway
+        req = JourneyRequest(from_stop=from_stop, to_stop=to_stop, depart_at=depart_at,
+                             max_transfers=max_transfers,
+                             service_date=service_date,
+                             depart_until=depart_until,
+                             reliability=reliability)
+        key = start = hit = None
+        if self.cache is not None:
+            # a cold planner loads / compiles the feed to answer version: keep that off the loop
+            version = await asyncio.to_thread(lambda: self.planner.version)
+            b = settings.plan_cache_bucket_sec
+            if b > 1 and reliability is None and version != "demo":
+                start = depart_at - depart_at % b
+            with _stage("plan", "cache"):
+                # reliability answers also depend on the delay history, refreshed every realtime poll
+                hv = self.history.version if reliability is not None and self.history is not None else None
+                key = (from_stop, to_stop, depart_at if start is None else ("bucket", start), depart_until,
+                       service_date, max_transfers, reliability, version, hv)
+                hit = self.cache.get(key)
+            PLAN_CACHE_LOOKUPS.inc(result="miss" if hit is None else "hit")
+            if hit is not None:
+                out = copy.deepcopy(hit) if start is None else _leaving_from(hit, depart_at, depart_until is not None)
+                if out is not None:
+                    return {"itineraries": out}
+        # CPU-bound: keep the event loop free for /health, /status, ...
+        # (to_thread carries the request context, so planner stages land in the request profile)
+        if start is not None and hit is None:
+            with _stage("plan", "planner"):
+                itins: List[Itinerary] = await asyncio.to_thread(
+                    self._plan_bucket, req, start, start + settings.plan_cache_bucket_sec)
+            with _stage("plan", "serialize"):
+                out = [itinerary_to_dict(it) for it in itins]
+                self.cache.put(key, out, (lg.trip_id for it in itins for lg in it.legs if lg.trip_id))
+                out = _leaving_from(out, depart_at, depart_until is not None)
+            if out is not None:
+                return {"itineraries": out}
+        if start is not None:
+            key = None   # a walk-only option: this departure is planned on its own
+        with _stage("plan", "planner"):
+            itins = await asyncio.to_thread(self.planner.plan, req)
+        with _stage("plan", "serialize"):
+            out = [itinerary_to_dict(it) for it in itins]
+            if key is not None:
+                self.cache.put(key, copy.deepcopy(out), (lg.trip_id for it in itins for lg in it.legs if lg.trip_id))
         return {"itineraries": out}
 
+    def _plan_bucket(self, req: JourneyRequest, start: int, end: int) -> List[Itinerary]:
+        """Options for any departure in [start, end): every one leaving in the bucket, plus the best after it."""
+        if req.depart_until is not None:
+            return self.planner.plan(replace(req, depart_at=start))
+        return (self.planner.plan(replace(req, depart_at=start, depart_until=end - 1))
+                + self.planner.plan(replace(req, depart_at=end)))
+
+    async def publish_live(self, status: bool = True, alerts: bool = True):
+        """Push the current /status lines and /alerts to stream clients (deltas only)."""
+        lines = (await self.get_status()).get("lines", []) if status else None
+        current = (await self.get_alerts()).get("alerts", []) if alerts else None
+        self.live.publish(lines=lines, alerts=current)
+
+    def invalidate_trips(self, trip_ids) -> int:
+        """Realtime hook: drop cached plans riding any of these trips."""
+        return self.cache.invalidate_trips(trip_ids) if self.cache is not None else 0
+
+    async def plan_batch(self, reqs: List[JourneyRequest]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Many plans on the process pool, streamed as they finish:
+        {"index": i, "itineraries": [...]} or {"index": i, "error": "..."}.
+        """
+        for r in reqs:
+            r.service_date = r.service_date or self.clock.today()
+        if self.pool is None:
+            raise RuntimeError("no planner pool configured")
+        async for i, itins, error in self.pool.plan_stream(reqs):
+            if error is not None:
+                yield {"index": i, "error": error}
+            else:
+                yield {"index": i, "itineraries": [itinerary_to_dict(it) for it in itins]}
+
+    @_timed("reachable")
+    async def reachable(self, from_stop: str, depart_at: Optional[int], budget_min: int,
+                        service_date: Optional[date] = None) -> Dict[str, Any]:
+        """Stops reachable within budget_min (one scan): "what's reachable in 20 min", isochrones."""
+        depart_at, service_date = self.clock.resolve(depart_at, service_date)
+        # one full CPU-bound scan: off the event loop, like plan()
+        stops = await asyncio.to_thread(self.planner.reachable, from_stop, depart_at, budget_min * 60, service_date)
+        return {
+            "from_stop": from_stop,
+            "depart_at": depart_at,
+            "budget_min": budget_min,
+            "stops": [
+                {
+                    "stop_id": r.stop_id,
+                    "arr_time": r.arr_time,
+                    "travel_sec": r.travel_sec,
+                    "transfers": r.transfers,
+                } for r in stops
+            ]
+        }
+
+    @_timed("departures")
+    async def departures(self, stop_ids: List[str], depart_at: Optional[int], window_min: int, limit: int,
+                         service_date: Optional[date] = None) -> Dict[str, Any]:
+        """Next departures per stop (bisect on precomputed boards), predicted times when realtime is on."""
+        depart_at, service_date = self.clock.resolve(depart_at, service_date)
+
+        def lookup() -> Dict[str, List[Departure]]:
+            if self.planner.version == "demo":
+                return {s: [] for s in stop_ids}
+            return self.planner.boards().departures_many(
+                stop_ids, depart_at, depart_at + window_min * 60, service_date, limit)
+        # boards are built on first use after a (re)load, and a viewport asks for hundreds of stops
+        boards = await asyncio.to_thread(lookup)
+        return {
+            "depart_at": depart_at,
+            "boards": {s: [asdict(d) for d in deps] for s, deps in boards.items()}
+        }
+
+    @_timed("report")
+    async def submit_report(self, report: CrowdReport) -> Dict[str, Any]:
+        """Queue a rider report (stored in the next batch, counted right after)."""
+        self.reports.add(report)
+        return {"accepted": True, "created_at": report.created_at}
+
+    @_timed("report_counts")
+    async def report_counts(self, by: str, window_min: int = 0, key: Optional[str] = None) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"by": by, "window_min": window_min}
+        if key is not None:
+            out.update(key=key, count=self.reports.count(by, key, window_min))
+        else:
+            out["counts"] = self.reports.counts(by, window_min)
+        return out
+
+    @_timed("reports_page")
+    async def reports_page(self, limit: int, before: Optional[int] = None, **filters: str) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.reports.page, limit, before, **filters)
+
+    def check_reliability(self, q: float):
+        """ValueError unless q is one of the delay quantiles the history tracks."""
+        if self.history is not None:
+            self.history.quantile_index(q)
+
+    @_timed("delay_quantiles")
+    async def delay_quantiles(self, route_id: str, stop_id: Optional[str], at: int) -> Dict[str, Any]:
+        """How late route_id usually is at stop_id around `at` (seconds since midnight)."""
+        q = self.history.lookup(route_id, stop_id, at) if self.history is not None else None
+        return {"route_id": route_id, "stop_id": stop_id, "at": at, "delay_sec": q}
+
+def _leaving_from(options: List[Dict[str, Any]], t: int, profile: bool) -> Optional[List[Dict[str, Any]]]:
+    """
+    A bucket's options (copies) as planned from t: those that can still be caught
+    leaving at t, and for a plain query only the (arrival, transfers) Pareto set,
+    fastest first, with the first walk starting at t as the planner times it.
+    None when the origin has a walk-only option: the bucket's rides were pruned
+    against walking off at the bucket start, so they do not stand for a later t.
+    """
+    out = []
+    for o in options:
+        legs = o["legs"]
+        if all(lg["mode"] == "walk" for lg in legs):
+            return None
+        first = legs[0]
+        walk = first["arr_time"] - first["dep_time"] if first["mode"] == "walk" else 0
+        ride = legs[1] if first["mode"] == "walk" else first
+        if ride["dep_time"] - walk >= t:
+            out.append(copy.deepcopy(o))
+    if profile:
+        return out
+    for o in out:
+        first = o["legs"][0]
+        if first["mode"] == "walk":
+            first["dep_time"], first["arr_time"] = t, t + first["arr_time"] - first["dep_time"]
+            o["total_time"] = o["legs"][-1]["arr_time"] - t
+    out.sort(key=lambda o: (o["legs"][-1]["arr_time"], o["transfers"], -o["legs"][0]["dep_time"]))
+    front, fewest = [], None
+    for o in out:
+        if fewest is None or o["transfers"] < fewest:
+            front.append(o)
+            fewest = o["transfers"]
+    return front
+
+def itinerary_to_dict(it: Itinerary) -> Dict[str, Any]:
+    return {
+        "total_time": it.total_time,
+        "transfers": it.transfers,
+        "legs": [
+            {
+                "mode": lg.mode,
+                "from_stop": lg.from_stop,
+                "to_stop": lg.to_stop,
+                "dep_time": lg.dep_time,
+                "arr_time": lg.arr_time,
+                "route_id": lg.route_id,
+                "trip_id": lg.trip_id,
+                "distance_m": lg.distance_m,
+            } for lg in it.legs
+        ]
+    }
+
+def planner_class(engine: Optional[str] = None):
+    name = (engine or settings.planner_engine).lower()
+    if name not in PLANNER_ENGINES:
+        raise ValueError(f"unknown planner engine {name!r}, expected one of {sorted(PLANNER_ENGINES)}")
+    return PLANNER_ENGINES[name]
+
+def make_planner(engine: Optional[str] = None) -> RoutePlannerPort:
+    """Planner selected by settings.planner_engine (or `engine`)."""
+    return planner_class(engine)(settings.gtfs_sqlite_path)
+
 def get_service() -> "JourneyRadarService":
-    repo = FixtureRepository()
-    suggester = SimpleAlternativeSuggester()
-    planner = CsaRoutePlanner(settings.gtfs_sqlite_path)
-    return JourneyRadarService(repo, suggester, planner)
+    """FastAPI dependency: the process-wide service (built once, see container)."""
+    from app.application.container import get_container
+    return get_container().service
@@ -1,15 +1,16 @@
 # backend/app/domain/entities.py
 from dataclasses import dataclass, field
+from datetime import date
 from typing import Optional, List
 
 # --- già presenti (status / alt / alert) ---
-@dataclass
+@dataclass(slots=True)
 class RouteStatus:
     route_id: str
     status: str  # on_time | delayed | alert
     delay_min: int = 0
 
-@dataclass
+@dataclass(slots=True)
 class Alternative:
     route_id: str
     stop_id: str
@@ -18,24 +19,51 @@ class Alternative:
     distance_m: int
     changes: int = 0
 
-@dataclass
+@dataclass(slots=True)
 class ServiceAlert:
     id: str
     severity: str
     text: str
     route_ids: Optional[List[str]] = None
 
+@dataclass(slots=True)
+class CrowdReport:
+    type: str                 # delay | disruption | other
+    text: str
+    line: str = ""
+    stop_id: str = ""
+    created_at: float = 0.0   # unix time
+
 # --- Planner CSA ---
 
-@dataclass
+@dataclass(slots=True)
 class JourneyRequest:
     from_stop: str
     to_stop: str
     depart_at: int            # seconds since midnight
     max_transfers: int = 3
     window_sec: int = 90 * 60 # how far we scan
+    service_date: Optional[date] = None  # None = ignore calendar (all trips)
+    depart_until: Optional[int] = None   # profile query: any departure in [depart_at, depart_until]
+    reliability: Optional[float] = None  # buffer each transfer with this quantile of historical delay (e.g. 0.9)
+
+@dataclass(slots=True)
+class ReachableStop:
+    stop_id: str
+    arr_time: int             # seconds since midnight
+    travel_sec: int           # arr_time - depart_at
+    transfers: int = 0        # changes on the fastest way there (walk only: 0)
+
+@dataclass(slots=True)
+class Departure:
+    stop_id: str
+    route_id: str
+    trip_id: str
+    dep_time: int             # seconds since midnight, predicted if delayed
+    headsign: Optional[str] = None
+    delay_sec: int = 0        # realtime delay included in dep_time
 
-@dataclass
+@dataclass(slots=True)
 class Connection:
     dep_time: int
     arr_time: int
@@ -44,7 +72,7 @@ class Connection:
     trip_id: str
     route_id: str
 
-@dataclass
+@dataclass(slots=True)
 class Leg:
     mode: str                 # "walk" | "transit"
     from_stop: str
@@ -55,7 +83,7 @@ class Leg:
     trip_id: Optional[str] = None
     distance_m: Optional[int] = None   # only for walk
 
-@dataclass
+@dataclass(slots=True)
 class Itinerary:
     legs: List[Leg] = field(default_factory=list)
 
@@ -1,16 +1,42 @@
 # backend/app/domain/ports.py
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
-from app.domain.entities import JourneyRequest, Itinerary
+from datetime import date
+from typing import Dict, Any, List, Optional
+from app.domain.entities import CrowdReport, JourneyRequest, Itinerary, ReachableStop
 
 class RealtimeProvider(ABC):
     @abstractmethod
     async def fetch_status(self) -> Dict[str, Any]: ...
 
+    @abstractmethod
+    async def fetch_alerts(self) -> Dict[str, Any]: ...
+
 class StaticGTFSRepository(ABC):
     @abstractmethod
     def stops_nearby(self, stop_id: str, radius_m: int) -> Dict[str, Any]: ...
 
+class ReportRepository(ABC):
+    @abstractmethod
+    def add(self, report: CrowdReport) -> CrowdReport: ...
+
+    @abstractmethod
+    def count(self, by: str, key: str, window_min: int = 0) -> int: ...
+
+    @abstractmethod
+    def counts(self, by: str, window_min: int = 0) -> Dict[str, int]: ...
+
+    @abstractmethod
+    def page(self, limit: int = 50, before: Optional[int] = None, **filters: str) -> Dict[str, Any]: ...
+
 class RoutePlannerPort(ABC):
     @abstractmethod
     def plan(self, req: JourneyRequest) -> List[Itinerary]: ...
+
+    @property
+    def version(self) -> str:
+        """Identity of the timetable answers come from (cache keys); "" if unknown."""
+        return ""
+
+    @abstractmethod
+    def reachable(self, from_stop: str, depart_at: int, budget_sec: int,
+                  service_date: Optional[date] = None) -> List[ReachableStop]: ...
@@ -1,17 +1,48 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.api.profiling import ProfilingMiddleware
 from app.api.routes import router as api_router
+from app.application.container import get_container, stop_container
+from app.metrics import REGISTRY
+from app.settings import settings
 
-app = FastAPI(title="SpokoRoute API", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # one planner / timetable / pool per worker process; the warm-up runs in the
+    # background and /health/ready answers 503 until it is done
+    container = get_container()
+    warm = asyncio.create_task(container.start())
+    yield
+    await warm
+    await stop_container()
+
+app = FastAPI(title="SpokoRoute API", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], allow_credentials=True,
     allow_methods=["*"], allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Profile"],
 )
+app.add_middleware(ProfilingMiddleware, header_enabled=settings.profile_header)
 
 @app.get("/health")
 def health():
-    return {"status":"ok"}
+    """Liveness + readiness details (timetable loaded, version, warm-up)."""
+    return get_container().health()
+
+@app.get("/health/ready")
+def ready():
+    """Readiness probe: 503 until the timetable is loaded and warmed up."""
+    body = get_container().health()
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint (this worker's metrics)."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
-app.include_router(api_router, prefix="/api/v1")
\ No newline at end of file
+app.include_router(api_router, prefix="/api/v1")
@@ -0,0 +1,209 @@
+"""
+Process-wide metrics in the Prometheus text format (GET /metrics) and opt-in
+per-request profiles.
+
+Counters, gauges and histograms live in REGISTRY; each keeps one value (or
+bucket row) per label tuple behind a lock, so planner threads can record
+without coordination. stage() times a block into a histogram and, when the
+request asked for it (X-Profile header, see api.profiling), into the request's
+Profile as well: the profile travels in a context variable, which
+asyncio.to_thread and child tasks copy, so no signature carries it.
+"""
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# seconds; planner stages are sub-millisecond on small feeds, seconds on a cold load
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _num(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, n: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + n
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in items]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, v: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = v
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label tuple -> [count per bucket..., +Inf count, sum]
+        self._rows: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, v: float, **labels: str):
+        key = self._key(labels)
+        i = bisect_left(self.buckets, v)
+        with self._lock:
+            row = self._rows.get(key)
+            if row is None:
+                row = self._rows[key] = [0] * (len(self.buckets) + 2)
+            row[i] += 1
+            row[-1] += v
+
+    def count(self, **labels: str) -> int:
+        row = self._rows.get(self._key(labels))
+        return int(sum(row[:-1])) if row else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(r)) for k, r in self._rows.items())
+        out = self.header()
+        for key, row in items:
+            acc = 0
+            for le, n in zip(self.buckets + (float("inf"),), row):
+                acc += n
+                le_label = 'le="%s"' % ("+Inf" if le == float("inf") else _num(le))
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, key, le_label)} {_num(acc)}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_num(row[-1])}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, key)} {_num(acc)}")
+        return out
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            m = self._metrics.get(name)
+            if m is None:
+                m = self._metrics[name] = cls(name, *args, **kwargs)
+            elif type(m) is not cls:
+                raise ValueError(f"metric {name} already registered as a {m.kind}")
+            return m
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._get(Gauge, name, help, labels)
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, labels, buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        return "\n".join(line for _, m in metrics for line in m.render()) + "\n"
+
+REGISTRY = Registry()
+
+class Profile:
+    """Stage durations (seconds, summed per stage) and counters of one request."""
+    __slots__ = ("stages", "counters", "_lock")
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, sec: float):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + sec
+
+    def count(self, name: str, n: int):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def server_timing(self) -> str:
+        """Server-Timing header value (durations in ms)."""
+        return ", ".join(f"{s.replace(' ', '_')};dur={sec * 1000:.3f}" for s, sec in self.stages.items())
+
+    def to_json(self) -> str:
+        return json.dumps({"stages_ms": {s: round(sec * 1000, 3) for s, sec in self.stages.items()},
+                           "counters": self.counters}, separators=(",", ":"))
+
+_PROFILE: ContextVar[Optional[Profile]] = ContextVar("spooroute_profile", default=None)
+
+def current_profile() -> Optional[Profile]:
+    return _PROFILE.get()
+
+@contextmanager
+def profiled() -> Iterator[Profile]:
+    """Profile everything run in this context (a request) until the block exits; see api.profiling."""
+    p = Profile()
+    token = _PROFILE.set(p)
+    try:
+        yield p
+    finally:
+        _PROFILE.reset(token)
+
+@contextmanager
+def timer(hist: Histogram, profile_name: str, **labels: str) -> Iterator[None]:
+    """Time the block into hist{**labels} and the current profile (as profile_name)."""
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t
+        hist.observe(dt, **labels)
+        p = _PROFILE.get()
+        if p is not None:
+            p.add(profile_name, dt)
+
+def stage(hist: Histogram, name: str, prefix: str = "", **labels: str):
+    """timer() for one stage of a larger operation: hist{stage=name, **labels}, profile prefix + name."""
+    return timer(hist, prefix + name, stage=name, **labels)
+
+def record(counters: Dict[str, Counter], labels: Dict[str, str], prefix: str = "", **counts: int):
+    """Add counts to counters[name]{**labels} and to the current profile (as prefix + name)."""
+    p = _PROFILE.get()
+    for name, n in counts.items():
+        counters[name].inc(n, **labels)
+        if p is not None:
+            p.count(prefix + name, n)
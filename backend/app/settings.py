@@ -6,5 +6,43 @@ class Settings(BaseModel):
     api_port: int = int(os.getenv("API_PORT", "8000"))
     demo_mode: bool = os.getenv("DEMO_MODE", "true").lower() == "true"
     gtfs_sqlite_path: str = os.getenv("GTFS_SQLITE_PATH", "/data/gtfs.sqlite")
+    # timezone of the feed's times (default: agency_timezone from the GTFS SQLite, else server local time)
+    feed_timezone: str = os.getenv("FEED_TIMEZONE", "")
+    # prebuilt binary timetable (python -m app.tools.build_timetable); used instead of the SQLite if present
+    timetable_path: str = os.getenv("TIMETABLE_PATH", "/data/timetable.bin")
+    # routing engine: "csa" (connection scan) or "raptor" (rounds over route patterns)
+    planner_engine: str = os.getenv("PLANNER_ENGINE", "csa")
+    # batch planning: worker processes (0 = one per core) and max requests per call
+    plan_workers: int = int(os.getenv("PLAN_WORKERS", "0"))
+    plan_batch_max: int = int(os.getenv("PLAN_BATCH_MAX", "1000"))
+    # /departures: max stops per call (map viewport)
+    departures_max_stops: int = int(os.getenv("DEPARTURES_MAX_STOPS", "500"))
+    # /plan result cache: entries, lifetime, departure bucket (one entry serves every departure in it)
+    plan_cache_size: int = int(os.getenv("PLAN_CACHE_SIZE", "10000"))
+    plan_cache_ttl_sec: int = int(os.getenv("PLAN_CACHE_TTL_SEC", "300"))
+    plan_cache_bucket_sec: int = int(os.getenv("PLAN_CACHE_BUCKET_SEC", "60"))
+    # read-only GTFS SQLite connections shared by request handlers
+    sqlite_pool_size: int = int(os.getenv("SQLITE_POOL_SIZE", "4"))
+    # GTFS-RT feeds polled in the background (empty = realtime off)
+    gtfs_rt_trip_updates_url: str = os.getenv("GTFS_RT_TRIP_UPDATES_URL", "")
+    gtfs_rt_alerts_url: str = os.getenv("GTFS_RT_ALERTS_URL", "")
+    realtime_poll_sec: float = float(os.getenv("REALTIME_POLL_SEC", "15"))
+    # /stream: queued updates per client before a slow one is reset to a snapshot; heartbeat interval
+    stream_queue_max: int = int(os.getenv("STREAM_QUEUE_MAX", "64"))
+    stream_heartbeat_sec: float = float(os.getenv("STREAM_HEARTBEAT_SEC", "15"))
+    # delay history (per-day columnar files; in memory when the parent directory is missing):
+    # service days kept, time-of-day bucket, quantiles tracked (/plan reliability picks one), samples needed
+    delay_history_path: str = os.getenv("DELAY_HISTORY_PATH", "/data/delay_history")
+    delay_history_days: int = int(os.getenv("DELAY_HISTORY_DAYS", "28"))
+    delay_bucket_min: int = int(os.getenv("DELAY_BUCKET_MIN", "60"))
+    delay_quantiles: str = os.getenv("DELAY_QUANTILES", "0.5,0.9")
+    delay_min_samples: int = int(os.getenv("DELAY_MIN_SAMPLES", "10"))
+    # rider reports (SQLite WAL; in memory when the directory is missing), counter windows, write batching
+    reports_sqlite_path: str = os.getenv("REPORTS_SQLITE_PATH", "/data/reports.sqlite")
+    reports_windows_min: str = os.getenv("REPORTS_WINDOWS_MIN", "15,60,1440")
+    reports_flush_sec: float = float(os.getenv("REPORTS_FLUSH_SEC", "0.5"))
+    reports_batch_max: int = int(os.getenv("REPORTS_BATCH_MAX", "500"))
+    # X-Profile request header -> Server-Timing / X-Profile stage breakdown (false: header ignored)
+    profile_header: bool = os.getenv("PROFILE_HEADER", "true").lower() == "true"
 
 settings = Settings()
\ No newline at end of file
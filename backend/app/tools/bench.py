@@ -0,0 +1,199 @@
+"""
+Planner benchmark suite:
+    python -m app.tools.bench /data/gtfs.sqlite --queries 200 --out bench.json
+    python -m app.tools.bench --synth stops=2000,routes=150,trips_per_hour=6 --out bench.json
+    python -m app.tools.bench /data/gtfs.sqlite --compare baseline.json --tolerance 0.2
+Every engine (PLANNER_ENGINES, or --engines) runs in a fresh process on the
+same fixed query set (seeded): timetable load time, first query (index
+builds), per-query latency p50/p95/p99, connections scanned per query
+(connection-scan engines) and the process's peak RSS. The report is JSON.
+--compare flags metrics that got worse than the baseline by more than
+--tolerance (and a small absolute slack) and exits 1 if any did.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from multiprocessing import get_context
+from typing import Any, Dict, List, Optional
+from app.adapters.router.timetable import load_timetable
+from app.application.services import PLANNER_ENGINES, planner_class
+from app.domain.entities import JourneyRequest
+from app.tools.synth_gtfs import generate_network
+
+# metric -> absolute slack below which a change is noise (same unit as the metric)
+METRICS = {
+    "load_sec": 0.05,
+    "first_query_ms": 2.0,
+    "p50_ms": 0.5,
+    "p95_ms": 1.0,
+    "p99_ms": 2.0,
+    "connections_scanned_mean": 100.0,
+    "peak_rss_mb": 8.0,
+}
+
+def _percentile(xs: List[float], q: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(q * len(xs)))] if xs else 0.0
+
+def make_queries(tt, n: int, seed: int, max_transfers: int = 3,
+                 service_date: Optional[date] = None) -> List[JourneyRequest]:
+    """n (origin, destination, departure) requests between stops with departures, 06:00-20:00."""
+    r = random.Random(seed)
+    served = sorted(set(tt.c_from)) or list(range(tt.n_stops))
+    reqs = []
+    for _ in range(n):
+        a, b = r.sample(served, 2) if len(served) > 1 else (served[0], served[0])
+        reqs.append(JourneyRequest(tt.stop_ids[a], tt.stop_ids[b], r.randint(6 * 3600, 20 * 3600),
+                                   max_transfers=max_transfers, service_date=service_date))
+    return reqs
+
+def run_engine(engine: str, source: str, n_queries: int, seed: int, max_transfers: int,
+               service_date: Optional[date]) -> Dict[str, Any]:
+    """One engine, measured in the current process (run it in a fresh one)."""
+    t = time.perf_counter()
+    tt = load_timetable(source, reload=True)
+    load_sec = time.perf_counter() - t
+    planner = planner_class(engine)(timetable=tt)
+    reqs = make_queries(tt, n_queries, seed, max_transfers, service_date)
+
+    t = time.perf_counter()
+    planner.plan(reqs[0])   # per-timetable indexes are built on first use
+    first_ms = (time.perf_counter() - t) * 1000
+    times, answers = [], []
+    for req in reqs:
+        t = time.perf_counter()
+        its = planner.plan(req)
+        times.append((time.perf_counter() - t) * 1000)
+        answers.append([(it.legs[-1].arr_time, it.transfers) for it in its])
+
+    # second pass with a counting scan (kept out of the timed pass)
+    counts: List[int] = []
+    scan = tt.scan
+    def counting_scan(*args, **kwargs):
+        for item in scan(*args, **kwargs):
+            counts[-1] += 1
+            yield item
+    tt.scan = counting_scan
+    try:
+        for req in reqs:
+            counts.append(0)
+            planner.plan(req)
+    finally:
+        del tt.scan
+    scanned = sum(counts)
+
+    return {
+        "load_sec": round(load_sec, 3),
+        "first_query_ms": round(first_ms, 2),
+        "mean_ms": round(sum(times) / len(times), 3),
+        "p50_ms": round(_percentile(times, 0.50), 3),
+        "p95_ms": round(_percentile(times, 0.95), 3),
+        "p99_ms": round(_percentile(times, 0.99), 3),
+        # None: the engine does not scan connections (e.g. RAPTOR outside profile queries)
+        "connections_scanned_mean": round(scanned / len(counts), 1) if scanned else None,
+        "connections_scanned_p95": _percentile(counts, 0.95) if scanned else None,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "answers_sha1": hashlib.sha1(json.dumps(answers).encode()).hexdigest(),
+        "feed": {"connections": len(tt), "stops": tt.n_stops, "trips": tt.n_trips},
+    }
+
+def run_suite(source: str, engines: List[str], n_queries: int = 200, seed: int = 1, max_transfers: int = 3,
+              service_date: Optional[date] = None) -> Dict[str, Any]:
+    report: Dict[str, Any] = {"source": source, "queries": n_queries, "seed": seed,
+                              "max_transfers": max_transfers,
+                              "date": service_date.isoformat() if service_date else None, "engines": {}}
+    for engine in engines:
+        # fresh interpreter per engine: clean peak RSS, no warm caches from the previous one
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as ex:
+            res = ex.submit(run_engine, engine, source, n_queries, seed, max_transfers, service_date).result()
+        report["feed"] = res.pop("feed")
+        report["engines"][engine] = res
+    return report
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Human-readable regressions of report against baseline (empty = none)."""
+    out: List[str] = []
+    for key in ("queries", "seed", "max_transfers", "date"):
+        if report.get(key) != baseline.get(key):
+            out.append(f"query set differs: {key} {baseline.get(key)!r} -> {report.get(key)!r}")
+    if report.get("feed") != baseline.get("feed"):
+        out.append(f"feed differs: {baseline.get('feed')} -> {report.get('feed')}")
+    same_input = not out
+    for engine, cur in report["engines"].items():
+        base = baseline.get("engines", {}).get(engine)
+        if base is None:
+            continue
+        for metric, slack in METRICS.items():
+            a, b = base.get(metric), cur.get(metric)
+            if a is None or b is None:
+                continue
+            if b > a * (1 + tolerance) and b - a > slack:
+                out.append(f"{engine}.{metric}: {a} -> {b} (+{(b / a - 1) * 100 if a else float('inf'):.0f}%)")
+        if same_input and base.get("answers_sha1") != cur.get("answers_sha1"):
+            out.append(f"{engine}: answers changed")
+    return out
+
+def _synth_args(spec: str) -> Dict[str, int]:
+    """'stops=2000,routes=150' -> generate_network kwargs."""
+    kwargs: Dict[str, int] = {}
+    for part in filter(None, spec.split(",")):
+        k, _, v = part.partition("=")
+        kwargs[k.strip()] = int(v)
+    return kwargs
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="bench", description="Planner benchmark suite (JSON report).")
+    ap.add_argument("source", nargs="?", help="GTFS SQLite or timetable file")
+    ap.add_argument("--synth", help="generate a synthetic feed instead, e.g. stops=2000,routes=150,trips_per_hour=6,"
+                                    "walk_m=300,seed=1 (see app.tools.synth_gtfs)")
+    ap.add_argument("--engines", default=",".join(PLANNER_ENGINES), help="comma-separated engines")
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--max-transfers", type=int, default=3)
+    ap.add_argument("--date", type=date.fromisoformat, default=None, help="service date YYYY-MM-DD")
+    ap.add_argument("--out", help="write the JSON report here (e.g. to keep as a baseline)")
+    ap.add_argument("--compare", help="baseline report to check against")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown (0.2 = 20%%)")
+    args = ap.parse_args(argv)
+    if not args.source and not args.synth:
+        ap.error("give a feed or --synth")
+    engines = [e.strip() for e in args.engines.split(",") if e.strip()]
+    unknown = [e for e in engines if e not in PLANNER_ENGINES]
+    if unknown:
+        ap.error(f"unknown engines {unknown}, expected {sorted(PLANNER_ENGINES)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = args.source
+        synth = None
+        if args.synth:
+            synth = _synth_args(args.synth)
+            source = os.path.join(tmp, "synth.sqlite")
+            generate_network(source, **synth)
+        report = run_suite(source, engines, args.queries, args.seed, args.max_transfers, args.date)
+    if synth is not None:
+        report["source"] = "synth:" + args.synth
+        report["synth"] = synth
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
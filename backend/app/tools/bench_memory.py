@@ -0,0 +1,110 @@
+"""
+Memory per connection, object-per-hop vs compiled arrays:
+    python -m app.tools.bench_memory /data/gtfs.sqlite [--timetable /data/timetable.bin] [--json]
+Representations measured on the same feed (tracemalloc, Python heap only):
+  dict-objects   one @dataclass Connection per stop-time hop with per-row strings
+                 (what the planner used to build for every query)
+  slot-objects   slots=True Connection (domain entity) with interned ids
+  arrays         compiled Timetable: int arrays, ids interned once
+  mmap           binary timetable file: columns are views over shared pages
+Also reports the time of a full gc.collect() while each representation is alive.
+"""
+import argparse
+import gc
+import json
+import os
+import sqlite3
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List
+from app.adapters.router.timetable import load_timetable, to_seconds
+from app.domain.entities import Connection
+
+@dataclass
+class DictConnection:
+    """Connection as it was before slots: one __dict__ per instance."""
+    dep_time: int
+    arr_time: int
+    from_stop: str
+    to_stop: str
+    trip_id: str
+    route_id: str
+
+HOPS_SQL = """
+    SELECT h.trip_id, t.route_id, h.stop_id, h.departure_time, h.next_stop, h.next_arr FROM (
+        SELECT trip_id, stop_id, departure_time,
+               LEAD(stop_id) OVER w AS next_stop, LEAD(arrival_time) OVER w AS next_arr
+        FROM stop_times WINDOW w AS (PARTITION BY trip_id ORDER BY stop_sequence)
+    ) h JOIN trips t ON t.trip_id = h.trip_id
+    WHERE h.next_stop IS NOT NULL
+"""
+
+def _hops(db_path: str, limit: int):
+    db = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        sql = HOPS_SQL + (f" LIMIT {int(limit)}" if limit else "")
+        yield from db.execute(sql)
+    finally:
+        db.close()
+
+def dict_objects(db_path: str, limit: int) -> List[DictConnection]:
+    return [DictConnection(to_seconds(d), to_seconds(a), f, t, trip, route)
+            for trip, route, f, d, t, a in _hops(db_path, limit)]
+
+def slot_objects(db_path: str, limit: int) -> List[Connection]:
+    ids: Dict[str, str] = {}
+    intern = lambda s: ids.setdefault(s, s)   # noqa: E731
+    return [Connection(to_seconds(d), to_seconds(a), intern(f), intern(t), intern(trip), intern(route))
+            for trip, route, f, d, t, a in _hops(db_path, limit)]
+
+def _measure(build: Callable[[], Any]) -> Dict[str, float]:
+    gc.collect()
+    tracemalloc.start()
+    t = time.perf_counter()
+    obj = build()
+    build_sec = time.perf_counter() - t
+    heap, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    t = time.perf_counter()
+    gc.collect()
+    gc_ms = (time.perf_counter() - t) * 1000
+    n = len(obj)
+    out = {"connections": n, "heap_bytes": heap, "peak_bytes": peak,
+           "bytes_per_connection": round(heap / n, 1) if n else 0.0,
+           "build_sec": round(build_sec, 3), "gc_collect_ms": round(gc_ms, 2)}
+    del obj
+    return out
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="bench_memory", description="Bytes per connection by representation.")
+    ap.add_argument("gtfs", help="GTFS SQLite (planner schema)")
+    ap.add_argument("--timetable", default="", help="binary timetable file (build_timetable) to measure too")
+    ap.add_argument("--limit", type=int, default=0, help="object representations: first N hops only (0 = all)")
+    ap.add_argument("--json", action="store_true", help="print one JSON object instead of a table")
+    args = ap.parse_args(argv)
+
+    report: Dict[str, Dict[str, float]] = {
+        "dict-objects": _measure(lambda: dict_objects(args.gtfs, args.limit)),
+        "slot-objects": _measure(lambda: slot_objects(args.gtfs, args.limit)),
+        "arrays": _measure(lambda: load_timetable(args.gtfs, reload=True)),
+    }
+    if args.timetable:
+        r = _measure(lambda: load_timetable(args.timetable, reload=True))
+        r["mapped_bytes_per_connection"] = round(os.path.getsize(args.timetable) / max(1, r["connections"]), 1)
+        report["mmap"] = r
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    print(f"{'representation':15s} {'connections':>12s} {'bytes/conn':>11s} {'heap MiB':>9s} {'gc ms':>8s}")
+    for name, r in report.items():
+        print(f"{name:15s} {r['connections']:12d} {r['bytes_per_connection']:11.1f} "
+              f"{r['heap_bytes'] / 2**20:9.1f} {r['gc_collect_ms']:8.2f}")
+    if "mmap" in report:
+        print(f"mmap file: {report['mmap']['mapped_bytes_per_connection']:.1f} bytes/conn, shared page cache")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""
+Compare routing engines on the same random queries:
+    python -m app.tools.bench_planners /data/timetable.bin --queries 200 --max-transfers 3
+Prints per-engine latency (mean / p50 / p95, ms) and how many answers differ.
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from datetime import date
+from typing import Dict, List
+from app.adapters.router.timetable import load_timetable
+from app.application.services import PLANNER_ENGINES
+from app.domain.entities import JourneyRequest
+
+def _percentile(xs: List[float], q: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="bench_planners", description="Benchmark CSA vs RAPTOR on one feed.")
+    ap.add_argument("timetable", help="timetable file or GTFS SQLite")
+    ap.add_argument("--queries", type=int, default=100)
+    ap.add_argument("--max-transfers", type=int, default=3)
+    ap.add_argument("--from-time", type=int, default=6 * 3600, help="earliest departure (s)")
+    ap.add_argument("--to-time", type=int, default=20 * 3600, help="latest departure (s)")
+    ap.add_argument("--date", type=date.fromisoformat, default=None, help="service date YYYY-MM-DD")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args(argv)
+
+    t = time.perf_counter()
+    tt = load_timetable(args.timetable)
+    print(f"{args.timetable}: {len(tt)} connections, {tt.n_stops} stops, loaded in {time.perf_counter() - t:.2f}s")
+
+    r = random.Random(args.seed)
+    reqs = []
+    for _ in range(args.queries):
+        a, b = r.sample(range(tt.n_stops), 2)
+        reqs.append(JourneyRequest(tt.stop_ids[a], tt.stop_ids[b], r.randint(args.from_time, args.to_time),
+                                   max_transfers=args.max_transfers, service_date=args.date))
+
+    answers: Dict[str, List[list]] = {}
+    for name, cls in PLANNER_ENGINES.items():
+        planner = cls(timetable=tt)
+        t = time.perf_counter()
+        planner.plan(reqs[0])   # per-timetable indexes are built on first use
+        warm = time.perf_counter() - t
+        times, out = [], []
+        for req in reqs:
+            t = time.perf_counter()
+            its = planner.plan(req)
+            times.append((time.perf_counter() - t) * 1000)
+            out.append([(it.legs[-1].arr_time, it.transfers) for it in its])
+        answers[name] = out
+        print(f"{name:7s} first query {warm * 1000:8.1f} ms | mean {statistics.mean(times):7.2f} "
+              f"p50 {_percentile(times, 0.5):7.2f} p95 {_percentile(times, 0.95):7.2f} ms")
+
+    names = list(answers)
+    diff = sum(1 for i in range(len(reqs)) if any(answers[n][i] != answers[names[0]][i] for n in names[1:]))
+    print(f"differing answers: {diff}/{len(reqs)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
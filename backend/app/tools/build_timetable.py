@@ -0,0 +1,34 @@
+"""
+Offline timetable build:
+    python -m app.tools.build_timetable /data/gtfs.sqlite /data/timetable.bin
+    python -m app.tools.build_timetable --check /data/timetable.bin
+"""
+import argparse
+import sys
+import time
+from app.adapters.router.timetable import Timetable
+from app.adapters.router.timetable_file import write_timetable, verify_timetable, read_header
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="build_timetable", description="Compile a GTFS SQLite into a binary timetable.")
+    ap.add_argument("src", help="GTFS SQLite path (or timetable file with --check)")
+    ap.add_argument("out", nargs="?", help="output timetable file")
+    ap.add_argument("--check", action="store_true", help="verify checksum of an existing timetable file")
+    args = ap.parse_args(argv)
+
+    if args.check:
+        ok = verify_timetable(args.src)
+        print(f"{args.src}: {read_header(args.src)} {'OK' if ok else 'CORRUPT'}")
+        return 0 if ok else 1
+    if not args.out:
+        ap.error("out is required")
+
+    t = time.perf_counter()
+    tt = Timetable.from_sqlite(args.src)
+    crc = write_timetable(tt, args.out)
+    print(f"{args.out}: {len(tt)} connections, {tt.n_stops} stops, {tt.n_trips} trips, "
+          f"crc32={crc:08x} in {time.perf_counter() - t:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,32 @@
+"""
+GTFS static import:
+    python -m app.tools.import_gtfs krakow_gtfs.zip /data/gtfs.sqlite [--timetable /data/timetable.bin]
+"""
+import argparse
+import sys
+import time
+from app.adapters.gtfs_import import import_gtfs, MAX_WALK_M
+from app.adapters.router.timetable import Timetable
+from app.adapters.router.timetable_file import write_timetable
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="import_gtfs", description="Import a GTFS zip into the planner SQLite.")
+    ap.add_argument("zip", help="GTFS static zip")
+    ap.add_argument("db", help="output SQLite path (replaced atomically)")
+    ap.add_argument("--max-walk-m", type=int, default=MAX_WALK_M, help="footpath radius in metres")
+    ap.add_argument("--timetable", help="also build the binary timetable at this path")
+    args = ap.parse_args(argv)
+
+    t = time.perf_counter()
+    counts = import_gtfs(args.zip, args.db, args.max_walk_m)
+    print(f"{args.db}: " + ", ".join(f"{k}={v}" for k, v in counts.items()) +
+          f" in {time.perf_counter() - t:.1f}s")
+    if args.timetable:
+        t = time.perf_counter()
+        tt = Timetable.from_sqlite(args.db)
+        write_timetable(tt, args.timetable)
+        print(f"{args.timetable}: {len(tt)} connections in {time.perf_counter() - t:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""
+Synthetic GTFS SQLite (planner schema) for benchmarks:
+    python -m app.tools.synth_gtfs /tmp/synth.sqlite --stops 2000 --routes 150 --trips-per-hour 6 --walk-m 300
+Stops are jittered on a square grid (`--spacing-m` apart); each route follows a
+straight corridor across the area, serving the stops close to it in order, and
+runs both ways every 60 / trips_per_hour minutes over the service hours.
+Footpaths come from the importer's grid generator, so `--walk-m` sets their
+density. One all-week service (calendar) so dated queries work.
+Same arguments + seed = same file.
+"""
+import argparse
+import math
+import os
+import random
+import sqlite3
+import sys
+import time
+from typing import Dict, List, Tuple
+from app.adapters.gtfs_import import EARTH_M_PER_DEG, INDEXES, SCHEMA, generate_footpaths
+
+LAT0, LON0 = 50.06, 19.94
+SPEED_MPS = 8.0       # average running speed between stops
+DWELL_SEC = 20
+CORRIDOR_M = 250      # stops within this distance of a route's line are served
+
+def generate_network(path: str, stops: int = 500, routes: int = 40, trips_per_hour: int = 6,
+                     walk_m: int = 300, spacing_m: int = 400, first_hour: int = 5, last_hour: int = 24,
+                     seed: int = 1) -> Dict[str, int]:
+    """Write a fresh network to `path`; returns row counts per table."""
+    r = random.Random(seed)
+    if os.path.exists(path):
+        os.remove(path)
+    side = max(1, math.ceil(math.sqrt(stops)))
+    mx = EARTH_M_PER_DEG * math.cos(math.radians(LAT0))
+    pts: List[Tuple[str, float, float]] = []   # stop_id, x, y (metres)
+    for i in range(stops):
+        x = (i % side + r.uniform(-0.35, 0.35)) * spacing_m
+        y = (i // side + r.uniform(-0.35, 0.35)) * spacing_m
+        pts.append((f"S{i}", x, y))
+    extent = side * spacing_m
+
+    trips: List[Tuple] = []
+    stop_times: List[Tuple] = []
+    route_rows: List[Tuple] = []
+    headway = max(60, 3600 // max(1, trips_per_hour))
+    for ri in range(routes):
+        # corridor through a random point at a random angle; stops ordered along it
+        cx, cy, ang = r.uniform(0, extent), r.uniform(0, extent), r.uniform(0, math.pi)
+        dx, dy = math.cos(ang), math.sin(ang)
+        served = sorted(((x - cx) * dx + (y - cy) * dy, sid, x, y) for sid, x, y in pts
+                        if abs(-(x - cx) * dy + (y - cy) * dx) <= CORRIDOR_M)
+        if len(served) < 2:
+            served = sorted((r.random(), sid, x, y) for sid, x, y in r.sample(pts, min(len(pts), 2)))
+        route_id = f"R{ri}"
+        route_rows.append((route_id, str(ri + 1), f"Line {ri + 1}", 3))
+        runs = [0]
+        for (_, _, x0, y0), (_, _, x1, y1) in zip(served, served[1:]):
+            runs.append(runs[-1] + max(30, int(math.hypot(x1 - x0, y1 - y0) / SPEED_MPS)) + DWELL_SEC)
+        offset = r.randrange(headway)
+        for direction, seq in ((0, served), (1, served[::-1])):
+            times = runs if direction == 0 else [runs[-1] - t for t in runs[::-1]]
+            headsign = seq[-1][1]
+            k = 0
+            for start in range(first_hour * 3600 + offset, last_hour * 3600, headway):
+                trip_id = f"{route_id}_{direction}_{k}"
+                k += 1
+                trips.append((trip_id, route_id, "ALL", headsign, direction))
+                for n, ((_, sid, _, _), t) in enumerate(zip(seq, times)):
+                    arr = start + t
+                    dep = arr + (DWELL_SEC if 0 < n < len(seq) - 1 else 0)
+                    stop_times.append((trip_id, sid, arr, dep, n + 1))
+
+    latlon = [(sid, LAT0 + y / EARTH_M_PER_DEG, LON0 + x / mx) for sid, x, y in pts]
+    db = sqlite3.connect(path)
+    try:
+        db.executescript(SCHEMA)
+        db.executemany("INSERT INTO stops VALUES(?,?,?,?,0,NULL)", [(s, f"Stop {s}", la, lo) for s, la, lo in latlon])
+        db.executemany("INSERT INTO routes VALUES(?,?,?,?)", route_rows)
+        db.executemany("INSERT INTO trips VALUES(?,?,?,?,?)", trips)
+        db.executemany("INSERT INTO stop_times VALUES(?,?,?,?,?)", stop_times)
+        db.execute("INSERT INTO calendar VALUES('ALL',1,1,1,1,1,1,1,20000101,20991231)")
+        foot = list(generate_footpaths(latlon, walk_m))
+        db.executemany("INSERT INTO footpaths VALUES(?,?,?,?)", foot)
+        db.executescript(INDEXES)
+        db.commit()
+    finally:
+        db.close()
+    return {"stops": stops, "routes": routes, "trips": len(trips), "stop_times": len(stop_times),
+            "footpaths": len(foot)}
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="synth_gtfs", description="Generate a synthetic planner SQLite.")
+    ap.add_argument("out", help="output SQLite path (replaced)")
+    ap.add_argument("--stops", type=int, default=500)
+    ap.add_argument("--routes", type=int, default=40)
+    ap.add_argument("--trips-per-hour", type=int, default=6, help="departures per hour and direction")
+    ap.add_argument("--walk-m", type=int, default=300, help="footpath radius (footpath density)")
+    ap.add_argument("--spacing-m", type=int, default=400, help="average distance between neighbouring stops")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args(argv)
+
+    t = time.perf_counter()
+    counts = generate_network(args.out, args.stops, args.routes, args.trips_per_hour, args.walk_m,
+                              args.spacing_m, seed=args.seed)
+    print(f"{args.out}: " + ", ".join(f"{k}={v}" for k, v in counts.items()) +
+          f" in {time.perf_counter() - t:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
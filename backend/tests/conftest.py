@@ -0,0 +1,69 @@
+import math
+import sqlite3
+import pytest
+from app.application import container as container_mod
+from app.settings import settings
+
+def _t(s: int) -> str:
+    return "%02d:%02d:%02d" % (s // 3600, s // 60 % 60, s % 60)
+
+# Tiny network: line 1 A-B-C-D, line 2 B-E, line 3 D-E; walk C<->F
+TRIPS = [
+    # trip_id, route_id, [(stop, arr, dep), ...]
+    ("1a", "1", [("A", 28800, 28800), ("B", 29100, 29160), ("C", 29400, 29460), ("D", 29700, 29700)]),
+    ("1b", "1", [("A", 30600, 30600), ("B", 30900, 30960), ("C", 31200, 31260), ("D", 31500, 31500)]),
+    ("2a", "2", [("B", 29400, 29400), ("E", 30000, 30000)]),
+    ("3a", "3", [("D", 29760, 29760), ("E", 29900, 29900)]),
+]
+FOOTPATHS = [("C", "F", 240, 300), ("F", "C", 240, 300)]
+# stop positions in metres (east, north) of a point in Krakow; B is 350 m from A
+STOPS = {"A": (0, 0), "B": (0, 350), "C": (0, 2350), "D": (0, 4350), "E": (1500, 3350), "F": (300, 2350)}
+LAT0, LON0 = 50.06, 19.94
+
+def _latlon(east: float, north: float):
+    mean = LAT0 + sum(n for _, n in STOPS.values()) / len(STOPS) / 111_320.0
+    return LAT0 + north / 111_320.0, LON0 + east / (111_320.0 * math.cos(math.radians(mean)))
+
+@pytest.fixture
+def gtfs_db(tmp_path):
+    path = str(tmp_path / "gtfs.sqlite")
+    db = sqlite3.connect(path)
+    db.executescript("""
+        CREATE TABLE trips(trip_id TEXT, route_id TEXT);
+        CREATE TABLE stop_times(trip_id TEXT, stop_id TEXT, arrival_time TEXT, departure_time TEXT, stop_sequence INTEGER);
+        CREATE TABLE footpaths(from_stop TEXT, to_stop TEXT, walk_sec INTEGER, distance_m INTEGER);
+        CREATE TABLE stops(stop_id TEXT PRIMARY KEY, stop_name TEXT, stop_lat REAL, stop_lon REAL,
+                           location_type INTEGER, parent_station TEXT);
+    """)
+    for stop, (east, north) in STOPS.items():
+        db.execute("INSERT INTO stops VALUES(?,?,?,?,0,NULL)", (stop, f"Stop {stop}", *_latlon(east, north)))
+    for trip_id, route_id, calls in TRIPS:
+        db.execute("INSERT INTO trips VALUES(?,?)", (trip_id, route_id))
+        for seq, (stop, arr, dep) in enumerate(calls):
+            db.execute("INSERT INTO stop_times VALUES(?,?,?,?,?)", (trip_id, stop, _t(arr), _t(dep), seq * 10))
+    db.executemany("INSERT INTO footpaths VALUES(?,?,?,?)", FOOTPATHS)
+    db.commit()
+    db.close()
+    return path
+
+@pytest.fixture
+def fresh_container(gtfs_db, monkeypatch):
+    """A container (get_container / the app lifespan) on the test network, closed afterwards."""
+    monkeypatch.setattr(settings, "gtfs_sqlite_path", gtfs_db)
+    monkeypatch.setattr(settings, "timetable_path", "")
+    container_mod.close_container()
+    yield
+    container_mod.close_container()
+
+class ManualClock:
+    """A time source that only moves when a test sets or advances `t`."""
+    def __init__(self, t: float = 1_000_000.0):
+        self.t = t
+
+    def __call__(self) -> float:
+        return self.t
+
+@pytest.fixture
+def clock():
+    """ManualClock for components taking clock= (caches, report counters, delay history)."""
+    return ManualClock()
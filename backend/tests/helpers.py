@@ -0,0 +1,91 @@
+"""Test data builders shared by several test modules (fixtures live in conftest.py)."""
+import asyncio
+import random
+import sqlite3
+import threading
+from app.adapters.router.csa_planner import INF
+from app.adapters.router.timetable import Timetable
+
+def reference_earliest(tt: Timetable, src: int, t0: int, t1: int):
+    """The pre-optimization scan: whole window, dict labels, stop test only."""
+    earliest = {src: t0}
+    def relax(stop, t):
+        for k in range(tt.fp_off[stop], tt.fp_off[stop + 1]):
+            to_s = tt.fp_to[k]
+            if earliest.get(to_s, INF) > t + tt.fp_walk[k]:
+                earliest[to_s] = t + tt.fp_walk[k]
+    relax(src, t0)
+    lo, hi = tt.window(t0, t1)
+    for i in range(lo, hi):
+        if earliest.get(tt.c_from[i], INF) <= tt.c_dep[i]:
+            if earliest.get(tt.c_to[i], INF) > tt.c_arr[i]:
+                earliest[tt.c_to[i]] = tt.c_arr[i]
+                relax(tt.c_to[i], tt.c_arr[i])
+    return earliest
+
+def random_network(path: str, seed: int, n_stops: int = 50, n_routes: int = 10):
+    r = random.Random(seed)
+    db = sqlite3.connect(path)
+    db.executescript("""
+        CREATE TABLE trips(trip_id TEXT, route_id TEXT);
+        CREATE TABLE stop_times(trip_id TEXT, stop_id TEXT, arrival_time INTEGER, departure_time INTEGER, stop_sequence INTEGER);
+        CREATE TABLE footpaths(from_stop TEXT, to_stop TEXT, walk_sec INTEGER, distance_m INTEGER);
+    """)
+    stops = [f"S{i}" for i in range(n_stops)]
+    for ri in range(n_routes):
+        line = r.sample(stops, r.randint(3, 10))
+        for k in range(r.randint(5, 25)):
+            trip = f"R{ri}_{k}"
+            t = r.randint(6 * 3600, 10 * 3600)
+            db.execute("INSERT INTO trips VALUES(?,?)", (trip, f"R{ri}"))
+            for seq, stop in enumerate(line):
+                dwell = r.choice((0, 0, 30))
+                db.execute("INSERT INTO stop_times VALUES(?,?,?,?,?)", (trip, stop, t, t + dwell, seq))
+                t += dwell + r.randint(60, 400)
+    # walkable clusters with metric walk times: footpaths are transitively closed,
+    # so one footpath hop per arrival (what the scans do) is exact
+    pos = {s: (r.random() * 1000, r.random() * 1000) for s in stops}
+    shuffled = r.sample(stops, len(stops))
+    while shuffled:
+        group, shuffled = shuffled[:r.randint(1, 3)], shuffled[3:]
+        for a in group:
+            for b in group:
+                if a != b:
+                    w = 60 + int(((pos[a][0] - pos[b][0]) ** 2 + (pos[a][1] - pos[b][1]) ** 2) ** 0.5 // 2)
+                    db.execute("INSERT INTO footpaths VALUES(?,?,?,?)", (a, b, w, w))
+    db.commit()
+    db.close()
+
+def calendar_db(path: str):
+    db = sqlite3.connect(path)
+    db.executescript("""
+        CREATE TABLE trips(trip_id TEXT, route_id TEXT, service_id TEXT);
+        CREATE TABLE stop_times(trip_id TEXT, stop_id TEXT, arrival_time INTEGER, departure_time INTEGER, stop_sequence INTEGER);
+        CREATE TABLE calendar(service_id TEXT, monday INTEGER, tuesday INTEGER, wednesday INTEGER, thursday INTEGER,
+                              friday INTEGER, saturday INTEGER, sunday INTEGER, start_date INTEGER, end_date INTEGER);
+        CREATE TABLE calendar_dates(service_id TEXT, date INTEGER, exception_type INTEGER);
+        INSERT INTO calendar VALUES('WD',1,1,1,1,1,0,0,20250101,20251231), ('WE',0,0,0,0,0,1,1,20250101,20251231);
+        -- 2025-06-09 (Monday) is a holiday: weekend service instead
+        INSERT INTO calendar_dates VALUES('WD',20250609,2), ('WE',20250609,1);
+        INSERT INTO trips VALUES('wd','1','WD'), ('we','1','WE'), ('night','N','WD');
+        INSERT INTO stop_times VALUES('wd','A',28800,28800,1), ('wd','B',29400,29400,2),
+                                     ('we','A',29000,29000,1), ('we','B',29700,29700,2),
+                                     -- leaves 24:30 on the weekday service = 00:30 the next morning
+                                     ('night','A',88200,88200,1), ('night','B',88800,88800,2);
+    """)
+    db.commit()
+    db.close()
+
+def runs_off_the_loop(obj, method: str, call) -> bool:
+    """Await call() (a coroutine factory) and tell whether obj.method ran outside the event loop's thread."""
+    inner, seen = getattr(obj, method), []
+    setattr(obj, method, lambda *a, **kw: seen.append(threading.get_ident()) or inner(*a, **kw))
+
+    async def main():
+        await call()
+        return threading.get_ident()
+    try:
+        loop_thread = asyncio.run(main())
+    finally:
+        setattr(obj, method, inner)
+    return bool(seen) and loop_thread not in seen
@@ -0,0 +1,58 @@
+"""Stop grid radius queries and nearby alternatives on the tiny network (see conftest)."""
+import math
+import random
+from datetime import datetime
+from app.adapters.alternatives import SimpleAlternativeSuggester
+from app.adapters.repositories import FixtureRepository
+from app.adapters.router.csa_planner import CsaRoutePlanner
+from app.adapters.sqlite_pool import ReadOnlySQLitePool
+from app.adapters.stops import SQLiteStopRepository, StopGrid
+from app.application.services import JourneyRadarService
+from app.settings import settings
+from helpers import runs_off_the_loop
+
+def test_grid_matches_brute_force():
+    r = random.Random(7)
+    stops = [(f"S{i}", None, 50.0 + r.random() * 0.05, 19.9 + r.random() * 0.08) for i in range(2000)]
+    grid = StopGrid(stops)
+    for _ in range(50):
+        q = r.randrange(len(stops))
+        radius = r.choice((50, 200, 400, 1000))
+        expect = sorted(i for i in range(len(stops))
+                        if math.hypot(grid.x[i] - grid.x[q], grid.y[i] - grid.y[q]) <= radius)
+        assert sorted(i for _, i in grid.near_stop(f"S{q}", radius)) == expect
+    assert grid.near_stop("nope", 400) == []
+
+def test_stops_nearby(gtfs_db):
+    repo = SQLiteStopRepository(ReadOnlySQLitePool(gtfs_db, size=1))
+    out = repo.stops_nearby("C", 400)
+    assert [(s["stop_id"], s["distance_m"]) for s in out["stops"]] == [("C", 0), ("F", 300)]
+    assert out["stops"][1]["stop_name"] == "Stop F"
+    assert repo.stops_nearby("A", 100)["stops"][0]["stop_id"] == "A"
+
+def test_alternatives_walk_and_window(gtfs_db):
+    stops = SQLiteStopRepository(ReadOnlySQLitePool(gtfs_db, size=1))
+    planner = CsaRoutePlanner(gtfs_db, timetable_path="")
+    sug = SimpleAlternativeSuggester(stops, planner)
+
+    alts = sug.alternatives("A", 400, 28700, 28700 + 1200)
+    assert [(a.route_id, a.stop_id, a.depart_in_min, a.distance_m) for a in alts] == \
+           [("1", "A", 1, 0), ("2", "B", 11, 350)]
+    assert [a.route_id for a in sug.alternatives("A", 300, 28700, 28700 + 1200)] == ["1"]
+    # line 1 at B leaves 29160, before we could walk there (~292 s); next line 1 is out of the window
+    alts = sug.alternatives("A", 400, 28900, 28900 + 1200)
+    assert [(a.route_id, a.stop_id, a.depart_in_min) for a in alts] == [("2", "B", 8)]
+
+    sug.clock = lambda: datetime(2025, 6, 10, 7, 58, 20)   # 28700 s
+    body = sug.suggest("A", 400, 20)
+    assert body["alternatives"][1] == {"route_id": "2", "stop_id": "B", "stop_name": "Stop B",
+                                       "depart_in_min": 11, "distance_m": 350, "changes": 0}
+    assert SimpleAlternativeSuggester().suggest("A", 400, 20) == {"from_stop": "A", "alternatives": []}
+
+def test_suggest_runs_off_the_event_loop(gtfs_db, monkeypatch):
+    monkeypatch.setattr(settings, "demo_mode", False)
+    stops = SQLiteStopRepository(ReadOnlySQLitePool(gtfs_db, size=1))
+    sug = SimpleAlternativeSuggester(stops, CsaRoutePlanner(gtfs_db, timetable_path=""),
+                                     clock=lambda: datetime(2025, 6, 10, 7, 58, 20))
+    svc = JourneyRadarService(FixtureRepository(), sug, sug.planner)
+    assert runs_off_the_loop(sug, "suggest", lambda: svc.get_alternatives("A", 400, 20))
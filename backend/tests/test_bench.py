@@ -0,0 +1,48 @@
+"""Benchmark suite: synthetic feeds, the JSON report and regression gating."""
+import json
+from app.adapters.router.timetable import load_timetable
+from app.tools import bench
+from app.tools.synth_gtfs import generate_network
+
+def test_synthetic_feed_is_deterministic(tmp_path):
+    a, b = str(tmp_path / "a.sqlite"), str(tmp_path / "b.sqlite")
+    counts = generate_network(a, stops=120, routes=8, trips_per_hour=4, seed=3)
+    assert generate_network(b, stops=120, routes=8, trips_per_hour=4, seed=3) == counts
+    tt = load_timetable(a)
+    assert len(tt) > 0 and tt.has_calendar and len(tt.fp_to) > 0
+    assert [q.depart_at for q in bench.make_queries(tt, 5, 1)] == \
+           [q.depart_at for q in bench.make_queries(load_timetable(b), 5, 1)]
+
+def test_run_engine_reports_metrics(tmp_path):
+    path = str(tmp_path / "s.sqlite")
+    generate_network(path, stops=150, routes=10, seed=2)
+    csa = bench.run_engine("csa", path, 20, 1, 3, None)
+    raptor = bench.run_engine("raptor", path, 20, 1, 3, None)
+    assert csa["p50_ms"] <= csa["p95_ms"] <= csa["p99_ms"]
+    assert csa["connections_scanned_mean"] > 0 and raptor["connections_scanned_mean"] is None
+    assert csa["peak_rss_mb"] > 0
+    assert csa["answers_sha1"] == raptor["answers_sha1"]
+
+def test_compare_flags_regressions():
+    base = {"queries": 10, "seed": 1, "max_transfers": 3, "date": None, "feed": {"connections": 5},
+            "engines": {"csa": {"p50_ms": 10.0, "p95_ms": 20.0, "peak_rss_mb": 100.0, "answers_sha1": "x"}}}
+    cur = json.loads(json.dumps(base))
+    assert bench.compare(cur, base, 0.2) == []
+    cur["engines"]["csa"]["p95_ms"] = 23.0     # +15%: within tolerance
+    cur["engines"]["csa"]["p50_ms"] = 10.3     # +3%, under the absolute slack
+    assert bench.compare(cur, base, 0.2) == []
+    cur["engines"]["csa"]["p95_ms"] = 30.0
+    cur["engines"]["csa"]["answers_sha1"] = "y"
+    assert bench.compare(cur, base, 0.2) == ["csa.p95_ms: 20.0 -> 30.0 (+50%)", "csa: answers changed"]
+
+def test_cli_compare_exit_code(tmp_path, capsys):
+    out = str(tmp_path / "base.json")
+    args = ["--synth", "stops=100,routes=6,seed=4", "--queries", "10", "--engines", "csa"]
+    assert bench.main(args + ["--out", out]) == 0
+    report = json.load(open(out))
+    assert report["source"] == "synth:stops=100,routes=6,seed=4" and "csa" in report["engines"]
+    report["engines"]["csa"]["answers_sha1"] = "stale"
+    json.dump(report, open(out, "w"))
+    capsys.readouterr()
+    assert bench.main(args + ["--compare", out]) == 1
+    assert "REGRESSION csa: answers changed" in capsys.readouterr().err
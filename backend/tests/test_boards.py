@@ -0,0 +1,84 @@
+"""Departure boards: bisect lookups must list what a timetable scan would, realtime included."""
+import random
+import sqlite3
+from datetime import date
+import pytest
+from fastapi.testclient import TestClient
+from app.adapters.alternatives import SimpleAlternativeSuggester
+from app.adapters.repositories import FixtureRepository
+from app.adapters.router.csa_planner import CsaRoutePlanner
+from app.adapters.router.overlay import RealtimeOverlay
+from app.application.services import JourneyRadarService
+from app.main import app
+from helpers import calendar_db, random_network, runs_off_the_loop
+
+def _scanned(tt, s, t0, t1, day=None):
+    return sorted((tt.c_dep[i] + sh, i) for i, sh in tt.scan(t0, t1, day) if tt.c_from[i] == s)
+
+@pytest.mark.parametrize("seed", range(3))
+def test_boards_match_scan(tmp_path, seed):
+    path = str(tmp_path / "net.sqlite")
+    random_network(path, seed)
+    planner = CsaRoutePlanner(path, timetable_path="")
+    tt = planner.timetable
+    boards = planner.boards()
+    r = random.Random(seed)
+
+    def check():
+        for _ in range(50):
+            s = r.randrange(tt.n_stops)
+            t0 = r.randint(5 * 3600, 11 * 3600)
+            t1 = t0 + r.randint(0, 7200)
+            assert [(d, c) for d, c, _ in boards.lookup(s, t0, t1)] == _scanned(tt, s, t0, t1)
+
+    check()
+    tt.overlay = ov = RealtimeOverlay(tt)
+    state = {tt.trip_ids[t]: ((0, True) if r.random() < 0.3 else (r.randint(-120, 1800), False))
+             for t in r.sample(range(tt.n_trips), tt.n_trips // 3)}
+    ov.update(list(state), state.get)
+    check()
+
+def test_boards_service_days(tmp_path):
+    path = str(tmp_path / "cal.sqlite")
+    calendar_db(path)
+    planner = CsaRoutePlanner(path, timetable_path="")
+    boards = planner.boards()
+    assert [d.trip_id for d in boards.departures("A", 28000, 30000, date(2025, 6, 10))] == ["wd"]
+    assert [d.trip_id for d in boards.departures("A", 28000, 30000, date(2025, 6, 9))] == ["we"]
+    # Wednesday 00:10: the Tuesday 24:30 trip
+    night = boards.departures("A", 600, 3600, date(2025, 6, 11))
+    assert [(d.trip_id, d.dep_time) for d in night] == [("night", 1800)]
+    assert boards.departures("B", 0, 90000) == []       # last stop: nothing departs
+    assert boards.departures("nope", 0, 90000) == []
+
+def test_boards_realtime_and_headsigns(gtfs_db):
+    db = sqlite3.connect(gtfs_db)
+    db.execute("ALTER TABLE trips ADD COLUMN trip_headsign TEXT")
+    db.execute("UPDATE trips SET trip_headsign = 'Dworzec' WHERE route_id = '1'")
+    db.commit()
+    db.close()
+    planner = CsaRoutePlanner(gtfs_db, timetable_path="")
+    tt = planner.timetable
+    boards = planner.boards()
+    b = boards.departures_many(["B", "C", "B"], 29000, 30000, limit=1)
+    assert list(b) == ["B", "C"]
+    assert (b["B"][0].trip_id, b["B"][0].dep_time, b["B"][0].headsign) == ("1a", 29160, "Dworzec")
+
+    tt.overlay = ov = RealtimeOverlay(tt)
+    state = {"1a": (300, False), "2a": (0, True)}
+    ov.update(list(state), state.get)
+    deps = boards.departures("B", 29000, 30000)
+    assert [(d.trip_id, d.dep_time, d.delay_sec) for d in deps] == [("1a", 29460, 300)]
+    assert deps[0].headsign == "Dworzec" and boards.departures("D", 29700, 29800)[0].headsign is None
+
+def test_departures_endpoint(fresh_container):
+    with TestClient(app) as c:
+        r = c.get("/api/v1/departures", params={"stop_id": ["B", "E"], "depart_at": 29000, "window_min": 30})
+        body = r.json()["boards"]
+        assert [(d["trip_id"], d["dep_time"]) for d in body["B"]] == [("1a", 29160), ("2a", 29400)]
+        assert body["E"] == []
+
+def test_departures_run_off_the_event_loop(gtfs_db):
+    planner = CsaRoutePlanner(gtfs_db, timetable_path="")
+    svc = JourneyRadarService(FixtureRepository(), SimpleAlternativeSuggester(), planner)
+    assert runs_off_the_loop(planner, "boards", lambda: svc.departures(["B"], 29000, 30, 10))
@@ -0,0 +1,11 @@
+from fastapi.testclient import TestClient
+from app.main import app
+
+def test_conditional_get_revalidates_with_etag():
+    c = TestClient(app)
+    r = c.get("/api/v1/bulletins")
+    etag = r.headers["etag"]
+    assert r.status_code == 200 and r.json()["bulletins"] is not None
+    again = c.get("/api/v1/bulletins", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b"" and again.headers["etag"] == etag
+    assert c.get("/api/v1/bulletins", headers={"If-None-Match": '"stale"'}).status_code == 200
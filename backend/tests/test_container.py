@@ -0,0 +1,42 @@
+import sqlite3
+import pytest
+from fastapi.testclient import TestClient
+from app.adapters.sqlite_pool import ReadOnlySQLitePool
+from app.application import container as container_mod
+from app.main import app
+
+def test_lifespan_builds_once_and_warms_up(fresh_container):
+    with TestClient(app) as c:
+        svc = container_mod.get_container().service
+        r = c.get("/api/v1/plan", params={"from_stop": "A", "to_stop": "E", "depart_at": 28000})
+        assert r.json()["itineraries"][0]["legs"][-1]["arr_time"] == 29900
+        c.get("/api/v1/plan", params={"from_stop": "A", "to_stop": "D", "depart_at": 28000})
+        assert container_mod.get_container().service is svc
+        assert c.get("/health/ready").status_code == 200
+        h = c.get("/health").json()
+        assert h["status"] == "ok" and h["ready"] and h["gtfs_db"] is True
+        assert h["timetable"]["stops"] == 6 and h["timetable"]["version"]
+
+def test_not_ready_before_warm_up(fresh_container):
+    # no lifespan: nothing has loaded the timetable yet
+    r = TestClient(app).get("/health/ready")
+    assert r.status_code == 503 and r.json()["timetable"] is None
+
+def test_corrupt_feed_is_not_ready(fresh_container, tmp_path, monkeypatch):
+    bad = tmp_path / "gtfs.sqlite"
+    bad.write_bytes(b"not a sqlite file" * 100)
+    monkeypatch.setattr(container_mod.settings, "gtfs_sqlite_path", str(bad))
+    container_mod.get_container().warm_up()
+    r = TestClient(app).get("/health/ready")
+    assert r.status_code == 503
+    assert r.json()["warmup_error"] and r.json()["timetable"] is None
+
+def test_sqlite_pool_is_read_only(gtfs_db):
+    pool = ReadOnlySQLitePool(gtfs_db, size=2)
+    with pool.connection() as a, pool.connection() as b:
+        assert a is not b
+        assert a.execute("SELECT COUNT(*) FROM trips").fetchone()[0] == 4
+        with pytest.raises(sqlite3.OperationalError):
+            b.execute("DELETE FROM trips")
+    assert pool.ping()
+    pool.close()
@@ -0,0 +1,117 @@
+"""
+Regression suite for the CSA scan: the optimized planner (integer labels,
+trip-reached flags, target pruning) must give the same earliest arrivals as
+the straightforward scan it replaced, on random networks.
+"""
+import random
+import pytest
+from app.adapters.router.csa_planner import CsaRoutePlanner, INF, TRANSIT
+from app.adapters.router.timetable import Timetable
+from app.domain.entities import JourneyRequest
+from helpers import random_network, reference_earliest
+
+@pytest.mark.parametrize("seed", range(6))
+def test_optimized_scan_matches_reference(tmp_path, seed):
+    path = str(tmp_path / f"net{seed}.sqlite")
+    random_network(path, seed)
+    planner = CsaRoutePlanner(path, timetable_path="")
+    tt = planner.timetable
+    r = random.Random(seed)
+    for _ in range(60):
+        src, dst = r.sample(range(tt.n_stops), 2)
+        t0 = r.randint(6 * 3600, 9 * 3600)
+        # unbounded transfers: plan()'s fastest option is the plain earliest arrival
+        req = JourneyRequest(tt.stop_ids[src], tt.stop_ids[dst], t0, max_transfers=50)
+        ref = reference_earliest(tt, src, t0, t0 + req.window_sec).get(dst, INF)
+        earliest, prev = planner._scan(tt, src, dst, t0, t0 + req.window_sec, req)
+        assert earliest[dst] == ref
+
+        its = planner.plan(req)
+        if ref == INF:
+            assert its == []
+            continue
+        legs = its[0].legs
+        assert legs[0].from_stop == req.from_stop and legs[-1].to_stop == req.to_stop
+        for a, b in zip(legs, legs[1:]):
+            assert a.to_stop == b.from_stop
+        transit = [lg for lg in legs if lg.mode == "transit"]
+        for a, b in zip(transit, transit[1:]):
+            assert a.arr_time <= b.dep_time and a.trip_id != b.trip_id
+        if prev[dst][0] == TRANSIT:
+            assert legs[-1].arr_time == ref
+
+def reference_rounds(tt: Timetable, src: int, t0: int, t1: int, max_trips: int):
+    """Round-based reference: L[k][s] = earliest arrival with at most k trips."""
+    def walk(labels, improved):
+        # one footpath hop, only after a ride (or from the origin), like the scan
+        out = dict(labels)
+        for s in improved:
+            t = labels[s]
+            for k in range(tt.fp_off[s], tt.fp_off[s + 1]):
+                if out.get(tt.fp_to[k], INF) > t + tt.fp_walk[k]:
+                    out[tt.fp_to[k]] = t + tt.fp_walk[k]
+        return out
+    lo, hi = tt.window(t0, t1)
+    by_trip = {}
+    for i in range(lo, hi):
+        by_trip.setdefault(tt.c_trip[i], []).append(i)
+    L = [walk({src: t0}, [src])]
+    for _ in range(max_trips):
+        cur = dict(L[-1])
+        improved = set()
+        for conns in by_trip.values():
+            on = False
+            for i in sorted(conns, key=lambda i: tt.c_dep[i]):
+                on = on or L[-1].get(tt.c_from[i], INF) <= tt.c_dep[i]
+                if on and cur.get(tt.c_to[i], INF) > tt.c_arr[i]:
+                    cur[tt.c_to[i]] = tt.c_arr[i]
+                    improved.add(tt.c_to[i])
+        L.append(walk(cur, improved))
+    return L
+
+@pytest.mark.parametrize("seed", range(4))
+def test_pareto_matches_round_reference(tmp_path, seed):
+    path = str(tmp_path / f"net{seed}.sqlite")
+    random_network(path, seed)
+    planner = CsaRoutePlanner(path, timetable_path="")
+    tt = planner.timetable
+    r = random.Random(100 + seed)
+    for _ in range(40):
+        src, dst = r.sample(range(tt.n_stops), 2)
+        t0 = r.randint(6 * 3600, 9 * 3600)
+        req = JourneyRequest(tt.stop_ids[src], tt.stop_ids[dst], t0, max_transfers=2)
+        ref = reference_rounds(tt, src, t0, t0 + req.window_sec, 3)
+        E, _ = planner._scan_pareto(tt, src, dst, t0, t0 + req.window_sec, 3, req)
+        assert [E[k][dst] for k in range(4)] == [ref[k].get(dst, INF) for k in range(4)]
+
+        its = planner.plan(req)
+        want = sorted({(ref[k].get(dst, INF), k) for k in range(4)
+                       if ref[k].get(dst, INF) < min([INF] + [ref[j].get(dst, INF) for j in range(k)])})
+        got = sorted((E[it.transfers + 1 if any(lg.mode == "transit" for lg in it.legs) else 0][dst],
+                      it.transfers + 1 if any(lg.mode == "transit" for lg in it.legs) else 0) for it in its)
+        assert got == want
+
+@pytest.mark.parametrize("seed", range(4))
+def test_profile_agrees_with_forward_scans(tmp_path, seed):
+    path = str(tmp_path / f"net{seed}.sqlite")
+    random_network(path, seed)
+    planner = CsaRoutePlanner(path, timetable_path="")
+    tt = planner.timetable
+    r = random.Random(200 + seed)
+    for _ in range(15):
+        src, dst = r.sample(range(tt.n_stops), 2)
+        t0 = r.randint(6 * 3600, 8 * 3600)
+        req = JourneyRequest(tt.stop_ids[src], tt.stop_ids[dst], t0, max_transfers=2, depart_until=t0 + 1800)
+        its = [it for it in planner.plan(req) if any(lg.mode == "transit" for lg in it.legs)]
+        for it in its:
+            dep, arr, trips = it.legs[0].dep_time, it.legs[-1].arr_time, it.transfers + 1
+            assert t0 <= dep <= t0 + 1800
+            for a, b in zip(it.legs, it.legs[1:]):
+                assert a.to_stop == b.from_stop and a.arr_time <= b.dep_time
+            # leaving at `dep`, the forward scan finds the same best arrival with that many trips
+            fwd = reference_rounds(tt, src, dep, req.depart_until + req.window_sec, trips)
+            assert fwd[trips].get(dst, INF) == arr
+        # no two options where one is at least as good in every criterion
+        keys = [(it.legs[0].dep_time, it.legs[-1].arr_time, it.transfers) for it in its]
+        for a in keys:
+            assert not any(b != a and b[0] >= a[0] and b[1] <= a[1] and b[2] <= a[2] for b in keys)
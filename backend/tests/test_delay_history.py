@@ -0,0 +1,140 @@
+import os
+import threading
+from datetime import date, datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from app.adapters.realtime.history import DelayHistory
+from app.adapters.realtime.store import TripDelta
+from app.adapters.router.overlay import RealtimeOverlay
+from app.adapters.router.csa_planner import CsaRoutePlanner
+from app.adapters.router.raptor_planner import RaptorRoutePlanner
+from app.application import container as container_mod
+from app.domain.entities import JourneyRequest
+from app.main import app
+from app.settings import settings
+
+DAY = date(2026, 10, 12)
+
+def _at(tod=8 * 3600 + 300, day=DAY) -> float:
+    """Server-local timestamp of tod on day (the clock fixture's t)."""
+    return datetime(day.year, day.month, day.day).timestamp() + tod
+
+def _history(clock, path=None, **kw):
+    kw.setdefault("min_samples", 4)
+    return DelayHistory(str(path) if path else None, clock=clock, **kw)
+
+def _fill(h, route, stop, tod, delays, day=DAY):
+    for d in delays:
+        h.observe(route, stop, tod, d, day)
+    h.flush()
+
+def test_quantiles_per_stop_with_route_fallback(clock):
+    clock.t = _at()
+    h = _history(clock)
+    _fill(h, "1", "D", 29700, [0, 30, 60, 90, 120, 600, 90, 60, 30, 0])
+    assert h.lookup("1", "D", 29000) == {"p50": 60, "p90": 120}
+    assert h.lookup("1", "D", 29000 + 3600) is None    # another hour: no samples
+    _fill(h, "1", "B", 29100, [-120, -60])            # too few for B alone: route-wide answer (12 rows)
+    assert h.lookup("1", "B", 29100) == {"p50": 30, "p90": 120}
+    assert h.lookup("1", None, 29100)["p90"] == 120
+    assert h.lookup("9", "D", 29100) is None
+    with pytest.raises(ValueError):
+        h.quantile_index(0.75)   # not tracked
+
+def test_days_roll_out_and_files_reload(tmp_path, clock):
+    clock.t = _at()
+    h = _history(clock, tmp_path, days=3)
+    _fill(h, "1", "D", 29700, [600] * 5, day=DAY - timedelta(days=2))
+    _fill(h, "1", "D", 29700, [0] * 6)
+    assert h.lookup("1", "D", 29700)["p50"] == 0 and h.lookup("1", "D", 29700)["p90"] == 600
+    again = _history(clock, tmp_path, days=3)
+    assert again.quantiles == h.quantiles and again.observations == 11
+    clock.t += 86400   # the oldest day leaves the 3-day window
+    h.flush()
+    assert h.lookup("1", "D", 29700)["p90"] == 0
+    assert sorted(os.listdir(tmp_path)) == [DAY.isoformat(), "names.txt"]
+    # a crash mid-append: the longer columns are cut to the shortest
+    with open(tmp_path / DAY.isoformat() / "delay.i32", "ab") as f:
+        f.write(b"\x00" * 4)
+    assert _history(clock, tmp_path, days=3).observations == 6
+
+def test_observe_feed_records_each_stop_once(gtfs_db, clock):
+    tt = CsaRoutePlanner(gtfs_db, timetable_path="").timetable
+    clock.t = _at(29000)   # 1a (A 08:00 - D 08:15) delayed 2 min: heading to B
+    h = _history(clock)
+    assert h.observe_feed(tt, [("1a", 120, False), ("2a", 0, False), ("3a", 0, True), ("zz", 9, False)]) == 2
+    assert h.observe_feed(tt, [("1a", 120, False), ("2a", 0, False)]) == 0   # same stops, same delays
+    clock.t += 300     # 1a now heading to C
+    assert h.observe_feed(tt, [("1a", 120, False)]) == 1
+    h.flush()
+    rows = list(zip(*h._mem[DAY]))
+    named = [(h.names[r], h.names[s], tod, d) for r, s, tod, d in rows]
+    assert named == [("1", "B", 29100, 120), ("2", "B", 29400, 0), ("1", "C", 29400, 120)]
+
+def test_transfer_slack_from_history(gtfs_db, clock):
+    clock.t = _at()
+    h = _history(clock)
+    # line 1 usually arrives at D 2 min late (p90): the 60 s change to line 3 is not reliable
+    _fill(h, "1", "D", 29700, [120] * 10)
+    for cls in (CsaRoutePlanner, RaptorRoutePlanner):
+        planner = cls(gtfs_db, timetable_path="")
+        planner.delay_history = h
+        plain = planner.plan(JourneyRequest("A", "E", 28000))
+        assert plain[0].legs[-1].arr_time == 29900
+        safe = planner.plan(JourneyRequest("A", "E", 28000, reliability=0.9))
+        assert [lg.trip_id for lg in safe[0].legs if lg.mode == "transit"] == ["1a", "2a"]
+        assert safe[0].legs[-1].arr_time == 30000 and safe[0].legs[0].dep_time == 28800
+        # arriving late at the destination itself costs no slack
+        direct = planner.plan(JourneyRequest("A", "D", 28000, reliability=0.9))
+        assert direct[0].legs[-1].arr_time == 29700
+
+def test_no_slack_on_a_live_delay(gtfs_db, clock):
+    clock.t = _at()
+    h = _history(clock)
+    _fill(h, "1", "D", 29700, [120] * 10)
+    for cls in (CsaRoutePlanner, RaptorRoutePlanner):
+        planner = cls(gtfs_db, timetable_path="")
+        planner.delay_history = h
+        tt = planner.timetable
+        tt.overlay = RealtimeOverlay(tt)
+        # 1a reports 30 s late: the predicted D arrival 08:15:30 still makes 3a, history is not added on top
+        tt.overlay.update(["1a"], lambda _: (30, False))
+        safe = planner.plan(JourneyRequest("A", "E", 28000, reliability=0.9))
+        assert [lg.trip_id for lg in safe[0].legs if lg.mode == "transit"] == ["1a", "3a"]
+        assert safe[0].legs[-1].arr_time == 29900
+
+def test_container_records_delays_off_the_loop(fresh_container, monkeypatch, clock):
+    monkeypatch.setattr(settings, "gtfs_rt_trip_updates_url", "http://127.0.0.1:9/tu")
+    monkeypatch.setattr(settings, "delay_history_path", "/nonexistent/delay_history")
+    c = container_mod.get_container()
+    c.warm_up()
+    clock.t = _at(29000)
+    c.history.clock = clock
+    c.realtime.delays.apply([TripDelta("1a", None, 120)])
+    flush, threads = c.history.flush, []
+    c.history.flush = lambda: threads.append(threading.current_thread().name) or flush()
+    c.record_delays().result(timeout=5)
+    assert threads[0].startswith("delay-history") and c.history.observations == 1
+
+def test_plan_reliability_api(fresh_container, monkeypatch):
+    monkeypatch.setattr(settings, "delay_history_path", "/nonexistent/delay_history")
+    with TestClient(app) as c:
+        h = container_mod.get_container().history
+        for _ in range(10):
+            h.observe("1", "D", 29700, 120, date.today())
+        h.flush()
+        q = {"from_stop": "A", "to_stop": "E", "depart_at": 28000}
+        assert c.get("/api/v1/plan", params=q).json()["itineraries"][0]["legs"][-1]["arr_time"] == 29900
+        r = c.get("/api/v1/plan", params=dict(q, reliability=0.9)).json()
+        assert r["itineraries"][0]["legs"][-1]["arr_time"] == 30000
+        cache = container_mod.get_container().cache
+        misses = cache.misses
+        c.get("/api/v1/plan", params=dict(q, reliability=0.9))
+        h.observe("1", "D", 29700, 120, date.today())
+        h.flush()                                   # new history: reliability plans are not served stale
+        c.get("/api/v1/plan", params=dict(q, reliability=0.9))
+        assert cache.misses == misses + 1 and cache.hits >= 1
+        assert c.get("/api/v1/plan", params=dict(q, reliability=0.75)).status_code == 400
+        d = c.get("/api/v1/delays", params={"route_id": "1", "stop_id": "D", "at": 29700}).json()
+        assert d["delay_sec"] == {"p50": 120, "p90": 120}
+        assert c.get("/health").json()["delay_history"]["observations"] == 11
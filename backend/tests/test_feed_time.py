@@ -0,0 +1,58 @@
+import asyncio
+from datetime import date, datetime, timezone
+from app.adapters.alternatives import SimpleAlternativeSuggester
+from app.adapters.feed_time import FeedClock, feed_timezone, zone
+from app.adapters.realtime.history import DelayHistory
+from app.adapters.repositories import FixtureRepository
+from app.adapters.router.csa_planner import CsaRoutePlanner
+from app.application.container import Container
+from app.application.services import JourneyRadarService
+from app.settings import settings
+
+# 2025-06-09 23:30 UTC = 2025-06-10 01:30 in Krakow
+UTC_2330 = datetime(2025, 6, 9, 23, 30, tzinfo=timezone.utc).timestamp()
+
+def test_feed_clock_uses_the_feed_timezone():
+    krk = FeedClock(zone("Europe/Warsaw"), clock=lambda: UTC_2330)
+    assert krk.today() == date(2025, 6, 10)
+    assert krk.resolve(None, None) == (5400, date(2025, 6, 10))
+    assert krk.resolve(28000, None) == (28000, date(2025, 6, 10))
+    assert FeedClock(zone("UTC"), clock=lambda: UTC_2330).resolve(None, None) == (84600, date(2025, 6, 9))
+    assert zone("Not/AZone") is None and zone("") is None
+
+def test_feed_timezone_without_agency_table(gtfs_db, tmp_path):
+    assert feed_timezone(gtfs_db) is None
+    assert feed_timezone(str(tmp_path / "missing.sqlite")) is None
+
+def test_service_defaults_to_the_feed_day(gtfs_db):
+    planner = CsaRoutePlanner(gtfs_db, timetable_path="")
+    seen = []
+    planner.plan = lambda req: seen.append(req) or []
+    svc = JourneyRadarService(FixtureRepository(), SimpleAlternativeSuggester(), planner,
+                              clock=FeedClock(zone("Europe/Warsaw"), clock=lambda: UTC_2330))
+    asyncio.run(svc.plan("A", "E"))
+    assert (seen[0].depart_at, seen[0].service_date) == (5400, date(2025, 6, 10))
+
+def test_alternatives_use_the_feed_clock(gtfs_db, monkeypatch):
+    monkeypatch.setattr(settings, "gtfs_sqlite_path", gtfs_db)
+    monkeypatch.setattr(settings, "feed_timezone", "Europe/Warsaw")
+    c = Container()
+    c.clock.clock = lambda: UTC_2330
+    now = c.service.suggester.clock()
+    assert (now.date(), now.hour) == (date(2025, 6, 10), 1)
+    c.close()
+
+def test_delay_history_uses_the_feed_day(gtfs_db, monkeypatch):
+    krk = zone("Europe/Warsaw")
+    tt = CsaRoutePlanner(gtfs_db, timetable_path="").timetable
+    # 08:03:20 in Krakow is 06:03:20 UTC: 1a is heading to B on the feed's day
+    h = DelayHistory(tz=krk, clock=lambda: datetime(2025, 6, 10, 8, 3, 20, tzinfo=krk).timestamp())
+    assert h.observe_feed(tt, [("1a", 0, False)]) == 1
+    h.flush()
+    assert list(h._mem) == [date(2025, 6, 10)] and list(h._mem[date(2025, 6, 10)][2]) == [29100]
+    monkeypatch.setattr(settings, "gtfs_sqlite_path", gtfs_db)
+    monkeypatch.setattr(settings, "feed_timezone", "Europe/Warsaw")
+    c = Container()
+    c.history.clock = lambda: UTC_2330
+    assert c.history._today() == date(2025, 6, 10)
+    c.close()
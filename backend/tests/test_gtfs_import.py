@@ -0,0 +1,61 @@
+import sqlite3
+import zipfile
+from app.adapters.feed_time import feed_timezone
+from app.adapters.gtfs_import import generate_footpaths, import_gtfs
+from app.adapters.router.csa_planner import CsaRoutePlanner
+from app.domain.entities import JourneyRequest
+
+FEED = {
+    "agency.txt": "agency_id,agency_name,agency_url,agency_timezone\nZTP,ZTP,https://ztp.krakow.pl,Europe/Warsaw\n",
+    # BOM on purpose: many agencies export with it
+    "stops.txt": "\ufeffstop_id,stop_name,stop_lat,stop_lon\n"
+                 "A,Alpha,50.0600,19.9400\nB,Beta,50.0650,19.9450\n"
+                 "C,Gamma,50.0700,19.9500\nC2,Gamma bis,50.0702,19.9503\n",
+    "routes.txt": "route_id,route_short_name,route_long_name,route_type\n1,1,One,0\n",
+    "trips.txt": "trip_id,route_id,service_id,trip_headsign\nt1,1,WD,Gamma\n",
+    "calendar.txt": "service_id,monday,tuesday,wednesday,thursday,friday,saturday,sunday,start_date,end_date\n"
+                    "WD,1,1,1,1,1,0,0,20250101,20251231\n",
+    "stop_times.txt": "trip_id,arrival_time,departure_time,stop_id,stop_sequence\n"
+                      "t1,08:00:00,08:00:00,A,1\nt1,,,B,2\nt1,08:10:00,08:10:00,C,3\n",
+}
+
+def _zip(tmp_path):
+    path = str(tmp_path / "feed.zip")
+    with zipfile.ZipFile(path, "w") as z:
+        for name, body in FEED.items():
+            z.writestr(name, body.encode("utf-8"))
+    return path
+
+def test_import_stores_integer_times_and_interpolates(tmp_path):
+    db_path = str(tmp_path / "gtfs.sqlite")
+    counts = import_gtfs(_zip(tmp_path), db_path)
+    assert counts["stop_times"] == 3 and counts["stops"] == 4
+    with sqlite3.connect(db_path) as db:
+        rows = db.execute("SELECT stop_id, arrival_time FROM stop_times ORDER BY stop_sequence").fetchall()
+        idx = {r[0] for r in db.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+    assert rows == [("A", 28800), ("B", 29100), ("C", 29400)]
+    assert "ix_stop_times_trip_seq" in idx
+    assert feed_timezone(db_path) == "Europe/Warsaw"
+
+def test_import_generates_footpaths_and_plans(tmp_path):
+    db_path = str(tmp_path / "gtfs.sqlite")
+    import_gtfs(_zip(tmp_path), db_path)
+    with sqlite3.connect(db_path) as db:
+        fps = db.execute("SELECT from_stop, to_stop FROM footpaths").fetchall()
+    assert sorted(fps) == [("C", "C2"), ("C2", "C")]
+    its = CsaRoutePlanner(db_path, timetable_path="").plan(JourneyRequest("A", "C", 28000))
+    assert its and its[0].legs[-1].arr_time == 29400
+
+def test_grid_footpaths_match_pairwise():
+    import math, random
+    r = random.Random(7)
+    pts = [(f"S{i}", 50 + r.random() * 0.02, 19.9 + r.random() * 0.03) for i in range(300)]
+    got = {(a, b) for a, b, _, _ in generate_footpaths(pts, 300)}
+    lat0 = math.radians(sum(p[1] for p in pts) / len(pts))
+    want = set()
+    for a, la, lo in pts:
+        for b, lb, lob in pts:
+            d = math.hypot((lob - lo) * 111_320 * math.cos(lat0), (lb - la) * 111_320)
+            if a != b and d <= 300:
+                want.add((a, b))
+    assert got == want
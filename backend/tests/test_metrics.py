@@ -0,0 +1,52 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+from app.adapters.router.csa_planner import CsaRoutePlanner
+from app.domain.entities import JourneyRequest
+from app.main import app
+from app.metrics import Registry, profiled
+
+def test_prometheus_text_format():
+    reg = Registry()
+    h = reg.histogram("x_seconds", "X time.", ("op",), buckets=(0.1, 1.0))
+    h.observe(0.05, op="a")
+    h.observe(5, op="a")
+    reg.counter("y_total", "Y.").inc(3)
+    text = reg.render()
+    assert '# TYPE x_seconds histogram' in text
+    assert 'x_seconds_bucket{op="a",le="0.1"} 1' in text and 'x_seconds_bucket{op="a",le="1"} 1' in text
+    assert 'x_seconds_bucket{op="a",le="+Inf"} 2' in text and 'x_seconds_count{op="a"} 2' in text
+    assert "y_total 3" in text
+    with pytest.raises(ValueError):
+        reg.counter("x_seconds", "clash")
+
+def test_planner_stages_and_counters(gtfs_db):
+    planner = CsaRoutePlanner(gtfs_db, timetable_path="")
+    with profiled() as p:
+        its = planner.plan(JourneyRequest("A", "E", 28000))
+    assert its and {"planner.load", "planner.scan", "planner.reconstruct"} <= set(p.stages)
+    assert p.counters["planner.connections_scanned"] > 0
+    assert p.counters["planner.labels_improved"] > 0
+
+def test_plan_profile_header_and_metrics(fresh_container):
+    with TestClient(app) as c:
+        params = {"from_stop": "A", "to_stop": "E", "depart_at": 28000}
+        assert "x-profile" not in c.get("/api/v1/plan", params=params).headers
+        r = c.get("/api/v1/plan", params={**params, "depart_at": 27000}, headers={"X-Profile": "1"})
+        assert r.status_code == 200
+        prof = json.loads(r.headers["x-profile"])
+        assert {"service.plan", "service.plan.planner", "planner.scan", "total"} <= set(prof["stages_ms"])
+        assert prof["counters"]["planner.connections_scanned"] > 0
+        assert "planner.scan;dur=" in r.headers["server-timing"]
+
+        text = c.get("/metrics").text
+        assert 'spooroute_planner_stage_seconds_bucket{engine="csa",stage="scan",le="+Inf"}' in text
+        assert 'spooroute_service_seconds_count{op="plan"}' in text
+        assert 'spooroute_http_request_seconds_count{method="GET",handler="plan",status="200"}' in text
+        assert 'spooroute_plan_cache_lookups_total{result="miss"}' in text
+
+def test_broken_feed_is_an_error_not_a_demo_answer(tmp_path):
+    bad = tmp_path / "gtfs.sqlite"
+    bad.write_bytes(b"not a database" * 100)
+    with pytest.raises(Exception):
+        CsaRoutePlanner(str(bad), timetable_path="").plan(JourneyRequest("A", "E", 28000))
@@ -0,0 +1,99 @@
+"""Realtime overlay: planning on predicted times must equal planning on a recompiled feed."""
+import random
+import shutil
+import sqlite3
+import pytest
+from app.adapters.realtime.store import TripDelta
+from app.adapters.router.csa_planner import CsaRoutePlanner
+from app.adapters.router.overlay import RealtimeOverlay
+from app.application.container import Container
+from app.domain.entities import JourneyRequest
+from app.settings import settings
+from helpers import random_network
+
+def _arrivals(planner, req):
+    return [(it.legs[-1].arr_time, it.transfers) for it in planner.plan(req)]
+
+def test_delay_and_cancel(gtfs_db):
+    planner = CsaRoutePlanner(gtfs_db, timetable_path="")
+    tt = planner.timetable
+    tt.overlay = ov = RealtimeOverlay(tt)
+    state = {}
+    req = JourneyRequest("A", "E", 28000)
+    assert _arrivals(planner, req)[0] == (29900, 1)
+
+    state["1a"] = (120, False)   # misses 3a at D (29760): falls back to 2a via B
+    assert ov.update(["1a", "nope"], state.get) == 1
+    its = planner.plan(req)
+    assert its[0].legs[-1].arr_time == 30000
+    assert its[0].legs[0].dep_time == 28920
+    assert [lg.trip_id for lg in its[0].legs if lg.mode == "transit"] == ["1a", "2a"]
+    assert ov.update(["1a"], state.get) == 0       # unchanged state: no work
+
+    state["1a"] = (0, False)
+    state["2a"] = (0, True)
+    assert ov.update(["1a", "2a"], state.get) == 2
+    assert _arrivals(planner, req)[0] == (29900, 1)
+    state["3a"] = (0, True)
+    ov.update(["3a"], state.get)
+    assert planner.plan(req) == []
+
+    state.clear()
+    ov.update(["2a", "3a"], state.get)
+    assert not ov.active and len(ov) == 0
+    assert _arrivals(planner, req)[0] == (29900, 1)
+
+@pytest.mark.parametrize("seed", range(4))
+def test_overlay_matches_recompiled(tmp_path, seed):
+    path = str(tmp_path / "net.sqlite")
+    random_network(path, seed)
+    live = str(tmp_path / "live.sqlite")
+    shutil.copy(path, live)
+    planner = CsaRoutePlanner(path, timetable_path="")
+    tt = planner.timetable
+    tt.overlay = ov = RealtimeOverlay(tt)
+
+    r = random.Random(seed)
+    state = {}
+    db = sqlite3.connect(live)
+    for trip_id, in db.execute("SELECT trip_id FROM trips").fetchall():
+        x = r.random()
+        if x < 0.1:
+            state[trip_id] = (0, True)
+            db.execute("DELETE FROM stop_times WHERE trip_id = ?", (trip_id,))
+        elif x < 0.4:
+            delay = r.randint(-120, 1200)
+            state[trip_id] = (delay, False)
+            db.execute("UPDATE stop_times SET arrival_time = arrival_time + ?, departure_time = departure_time + ?"
+                       " WHERE trip_id = ?", (delay, delay, trip_id))
+    db.commit()
+    db.close()
+    ov.update(list(state), state.get)
+    recompiled = CsaRoutePlanner(live, timetable_path="")
+
+    for _ in range(40):
+        a, b = r.sample(tt.stop_ids, 2)
+        req = JourneyRequest(a, b, r.randint(6 * 3600, 9 * 3600), max_transfers=3)
+        assert _arrivals(planner, req) == _arrivals(recompiled, req)
+
+    # back to schedule: same answers as the static timetable
+    trips = list(state)
+    state.clear()
+    ov.update(trips, state.get)
+    static = CsaRoutePlanner(path, timetable_path="")
+    for _ in range(10):
+        a, b = r.sample(tt.stop_ids, 2)
+        req = JourneyRequest(a, b, r.randint(6 * 3600, 9 * 3600), max_transfers=3)
+        assert _arrivals(planner, req) == _arrivals(static, req)
+
+def test_container_applies_store_changes(fresh_container, monkeypatch):
+    monkeypatch.setattr(settings, "gtfs_rt_trip_updates_url", "http://127.0.0.1:9/tu")
+    c = Container()
+    c.warm_up()
+    req = JourneyRequest("A", "E", 28000)
+    c.realtime.delays.apply([TripDelta("3a", None, 0, cancelled=True)])   # before the overlay exists
+    c.apply_delays(c.realtime.delays.apply([TripDelta("1a", None, 120)], full=False))
+    assert _arrivals(c.planner, req)[0] == (30000, 1)
+    c.apply_delays(c.realtime.delays.apply([]))
+    assert _arrivals(c.planner, req)[0] == (29900, 1)
+    c.close()
@@ -0,0 +1,58 @@
+import json
+import random
+from fastapi.testclient import TestClient
+from app.adapters.alternatives import SimpleAlternativeSuggester
+from app.adapters.repositories import FixtureRepository
+from app.adapters.router.csa_planner import CsaRoutePlanner
+from app.adapters.router.pool import PlannerPool
+from app.application.services import JourneyRadarService, get_service
+from app.domain.entities import JourneyRequest
+from app.main import app
+from helpers import random_network
+
+def _key(its):
+    return [(it.legs[0].dep_time, it.legs[-1].arr_time, it.transfers) for it in its]
+
+def test_plan_many_shares_scans(tmp_path):
+    path = str(tmp_path / "net.sqlite")
+    random_network(path, 7)
+    planner = CsaRoutePlanner(path, timetable_path="")
+    tt = planner.timetable
+    r = random.Random(7)
+    reqs = []
+    for _ in range(5):
+        src, t0 = r.choice(tt.stop_ids), r.randint(6 * 3600, 9 * 3600)
+        reqs += [JourneyRequest(src, dst, t0) for dst in r.sample(tt.stop_ids, 8) if dst != src]
+    many = planner.plan_many(reqs)
+    assert [_key(x) for x in many] == [_key(planner.plan(q)) for q in reqs]
+
+def test_pool_groups_by_origin():
+    pool = PlannerPool(CsaRoutePlanner, "unused", task_size=3)
+    reqs = [JourneyRequest("A", d, 100) for d in "BCDE"] + [JourneyRequest("B", "C", 100), JourneyRequest("A", "C", 200)]
+    tasks = pool.tasks(reqs)
+    assert sorted(i for t in tasks for i in t) == list(range(6))
+    assert [0, 1, 2, 3] in tasks   # one origin group is never split
+
+def test_batch_endpoint_streams_all_results(gtfs_db):
+    pool = PlannerPool(CsaRoutePlanner, gtfs_db, timetable_path="", workers=2, task_size=2)
+    svc = JourneyRadarService(FixtureRepository(), SimpleAlternativeSuggester(),
+                              CsaRoutePlanner(gtfs_db, timetable_path=""), pool=pool)
+    app.dependency_overrides[get_service] = lambda: svc
+    body = {"requests": [
+        {"from_stop": "A", "to_stop": "E", "depart_at": 28000},
+        {"from_stop": "A", "to_stop": "D", "depart_at": 28000},
+        {"from_stop": "B", "to_stop": "E", "depart_at": 28000, "max_transfers": 0},
+        {"from_stop": "A", "to_stop": "NOPE", "depart_at": 28000},
+    ]}
+    try:
+        r = TestClient(app).post("/api/v1/plan/batch", json=body)
+    finally:
+        app.dependency_overrides.clear()
+        pool.shutdown()
+    assert r.status_code == 200
+    rows = {row["index"]: row for row in map(json.loads, r.text.splitlines())}
+    assert sorted(rows) == [0, 1, 2, 3]
+    assert rows[0]["itineraries"][0]["legs"][-1]["arr_time"] == 29900
+    assert rows[1]["itineraries"][0]["legs"][-1]["arr_time"] == 29700
+    assert rows[2]["itineraries"][0]["transfers"] == 0
+    assert rows[3]["itineraries"] == []
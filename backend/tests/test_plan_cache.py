@@ -0,0 +1,80 @@
+import asyncio
+import random
+import pytest
+from app.adapters.alternatives import SimpleAlternativeSuggester
+from app.adapters.repositories import FixtureRepository
+from app.adapters.router.csa_planner import CsaRoutePlanner
+from app.application.cache import PlanCache
+from app.application.services import JourneyRadarService, itinerary_to_dict
+from app.domain.entities import JourneyRequest
+from helpers import random_network
+
+def test_lru_ttl_and_counters(clock):
+    c = PlanCache(max_entries=2, ttl_sec=10, clock=clock)
+    c.put("a", 1, ["t1"])
+    c.put("b", 2, ["t2"])
+    assert c.get("a") == 1          # a is now most recent
+    c.put("c", 3, ["t1", "t3"])     # evicts b
+    assert c.get("b") is None
+    clock.t += 11
+    assert c.get("a") is None       # expired
+    assert c.stats() == {"size": 1, "max_entries": 2, "hits": 1, "misses": 2,
+                         "evictions": 1, "expirations": 1, "invalidations": 0}
+
+def test_invalidate_by_trip():
+    c = PlanCache()
+    c.put("x", 1, ["t1", "t2"])
+    c.put("y", 2, ["t2"])
+    c.put("z", 3, ["t3"])
+    assert c.invalidate_trips(["t2", "nope"]) == 2
+    assert c.get("x") is None and c.get("y") is None and c.get("z") == 3
+    c.put("z", 4, [])               # replacing drops the old trip index
+    assert c.invalidate_trips(["t3"]) == 0
+
+def test_service_caches_per_bucket_and_version(gtfs_db):
+    planner = CsaRoutePlanner(gtfs_db, timetable_path="")
+    svc = JourneyRadarService(FixtureRepository(), SimpleAlternativeSuggester(), planner, cache=PlanCache())
+    a = asyncio.run(svc.plan("A", "E", 28000))
+    b = asyncio.run(svc.plan("A", "E", 27990))     # same 60 s bucket: one miss, then a hit
+    assert (svc.cache.misses, svc.cache.hits) == (1, 1)
+    assert a["itineraries"][0]["legs"][-1]["arr_time"] == 29900
+    assert [it["legs"][1:] for it in a["itineraries"]] == [it["legs"][1:] for it in b["itineraries"]]
+    assert svc.invalidate_trips(["3a"]) == 1
+    asyncio.run(svc.plan("A", "E", 28000))
+    assert svc.cache.misses == 2
+    planner._timetable.version = "other-feed"      # a new feed never serves old entries
+    asyncio.run(svc.plan("A", "E", 28000))
+    assert svc.cache.misses == 3
+
+def test_service_copies_hits(gtfs_db):
+    planner = CsaRoutePlanner(gtfs_db, timetable_path="")
+    svc = JourneyRadarService(FixtureRepository(), SimpleAlternativeSuggester(), planner, cache=PlanCache())
+    a = asyncio.run(svc.plan("A", "E", 27990, depart_until=28800))
+    a["itineraries"].clear()                       # callers may mutate what they get
+    b = asyncio.run(svc.plan("A", "E", 27990, depart_until=28800))
+    assert svc.cache.hits == 1 and b["itineraries"]
+    b["itineraries"][0]["legs"].clear()
+    assert asyncio.run(svc.plan("A", "E", 27990, depart_until=28800))["itineraries"][0]["legs"]
+
+def _options(itins, profile=False):
+    return [((it["legs"][0]["dep_time"],) if profile else ()) + (it["legs"][-1]["arr_time"], it["transfers"])
+            for it in itins]
+
+@pytest.mark.parametrize("seed", range(3))
+def test_bucketed_answers_match_the_planner(tmp_path, seed):
+    path = str(tmp_path / f"net{seed}.sqlite")
+    random_network(path, seed)
+    planner = CsaRoutePlanner(path, timetable_path="")
+    tt = planner.timetable
+    svc = JourneyRadarService(FixtureRepository(), SimpleAlternativeSuggester(), planner, cache=PlanCache())
+    r = random.Random(700 + seed)
+    for _ in range(30):
+        a, b = r.sample(tt.stop_ids, 2)
+        start = r.randint(6 * 3600, 9 * 3600) // 60 * 60
+        for t in sorted(r.sample(range(start, start + 60), 3)):   # three departures in one bucket
+            until = t + 1200 if r.random() < 0.3 else None
+            want = planner.plan(JourneyRequest(a, b, t, depart_until=until))
+            got = asyncio.run(svc.plan(a, b, t, depart_until=until))["itineraries"]
+            want = [itinerary_to_dict(it) for it in want]
+            assert _options(got, until is not None) == _options(want, until is not None), (a, b, t, until)
+    assert svc.cache.hits > 0
@@ -0,0 +1,88 @@
+"""RAPTOR must give the same arrival x transfers labels as the connection scan."""
+import random
+import sqlite3
+from datetime import date
+import pytest
+from app.adapters.router.csa_planner import CsaRoutePlanner
+from app.adapters.router.raptor_planner import RaptorRoutePlanner
+from app.domain.entities import JourneyRequest
+from app.application.services import make_planner
+from helpers import calendar_db, random_network
+
+@pytest.mark.parametrize("seed", range(6))
+def test_raptor_matches_csa(tmp_path, seed):
+    path = str(tmp_path / f"net{seed}.sqlite")
+    random_network(path, seed)
+    csa = CsaRoutePlanner(path, timetable_path="")
+    raptor = RaptorRoutePlanner(path, timetable_path="")
+    tt = csa.timetable
+    r = random.Random(300 + seed)
+    for _ in range(60):
+        src, dst = r.sample(range(tt.n_stops), 2)
+        t0 = r.randint(6 * 3600, 9 * 3600)
+        req = JourneyRequest(tt.stop_ids[src], tt.stop_ids[dst], t0, max_transfers=3)
+        t1 = t0 + req.window_sec
+        E1, _ = csa._scan_pareto(tt, src, dst, t0, t1, 4, req)
+        E2, _ = raptor._scan_pareto(tt, src, dst, t0, t1, 4, req)
+        assert [E2[k][dst] for k in range(5)] == [E1[k][dst] for k in range(5)]
+        a, b = csa.plan(req), raptor.plan(req)
+        assert [(it.legs[-1].arr_time, it.transfers) for it in b] == \
+               [(it.legs[-1].arr_time, it.transfers) for it in a]
+        for it in b:
+            for x, y in zip(it.legs, it.legs[1:]):
+                assert x.to_stop == y.from_stop
+
+@pytest.mark.parametrize("seed", range(4))
+def test_raptor_matches_csa_capped_closure(tmp_path, seed):
+    # extra footpaths chaining beyond the longest one: the compiled closure is capped,
+    # both engines must still walk one closure hop from every ride arrival
+    path = str(tmp_path / f"chain{seed}.sqlite")
+    random_network(path, seed)
+    r = random.Random(900 + seed)
+    db = sqlite3.connect(path)
+    for _ in range(40):
+        a, b = r.sample(range(50), 2)
+        db.execute("INSERT INTO footpaths VALUES(?,?,?,?)", (f"S{a}", f"S{b}", r.randint(60, 300), None))
+    db.commit()
+    db.close()
+    csa = CsaRoutePlanner(path, timetable_path="")
+    raptor = RaptorRoutePlanner(path, timetable_path="")
+    tt = csa.timetable
+    for _ in range(60):
+        src, dst = r.sample(range(tt.n_stops), 2)
+        t0 = r.randint(6 * 3600, 9 * 3600)
+        req = JourneyRequest(tt.stop_ids[src], tt.stop_ids[dst], t0, max_transfers=3)
+        E1, _ = csa._scan_pareto(tt, src, dst, t0, t0 + req.window_sec, 4, req)
+        E2, _ = raptor._scan_pareto(tt, src, dst, t0, t0 + req.window_sec, 4, req)
+        assert [E2[k][dst] for k in range(5)] == [E1[k][dst] for k in range(5)]
+        for it in csa.plan(req):
+            for x, y in zip(it.legs, it.legs[1:]):
+                assert x.to_stop == y.from_stop and x.arr_time <= y.dep_time
+
+def test_raptor_patterns_and_transfer(gtfs_db):
+    planner = RaptorRoutePlanner(gtfs_db, timetable_path="")
+    ix = planner.index(planner.timetable)
+    assert ix.n_patterns == 3   # trips 1a/1b share A-B-C-D
+    its = planner.plan(JourneyRequest("A", "E", 28000))
+    assert its[0].legs[-1].arr_time == 29900
+    assert [lg.trip_id for lg in its[0].legs if lg.mode == "transit"] == ["1a", "3a"]
+
+def test_raptor_service_days(tmp_path):
+    path = str(tmp_path / "cal.sqlite")
+    calendar_db(path)
+    planner = RaptorRoutePlanner(path, timetable_path="")
+
+    def arrival(depart_at, day):
+        its = planner.plan(JourneyRequest("A", "B", depart_at, service_date=day))
+        return its[0].legs[-1].arr_time if its else None
+
+    assert arrival(28000, date(2025, 6, 10)) == 29400
+    assert arrival(28000, date(2025, 6, 9)) == 29700
+    assert arrival(600, date(2025, 6, 11)) == 2400
+    assert arrival(600, date(2025, 6, 15)) is None
+
+def test_engine_selection():
+    assert isinstance(make_planner("raptor"), RaptorRoutePlanner)
+    assert type(make_planner("csa")) is CsaRoutePlanner
+    with pytest.raises(ValueError):
+        make_planner("dijkstra")
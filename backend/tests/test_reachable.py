@@ -0,0 +1,50 @@
+import random
+import pytest
+from fastapi.testclient import TestClient
+from app.adapters.router.csa_planner import CsaRoutePlanner
+from app.adapters.repositories import FixtureRepository
+from app.adapters.alternatives import SimpleAlternativeSuggester
+from app.application.services import JourneyRadarService, get_service
+from app.main import app
+from helpers import random_network, reference_earliest, runs_off_the_loop
+
+def test_reachable_within_budget(gtfs_db):
+    planner = CsaRoutePlanner(gtfs_db, timetable_path="")
+    got = {r.stop_id: (r.arr_time, r.transfers) for r in planner.reachable("A", 28000, 30 * 60)}
+    assert got == {"B": (29100, 0), "C": (29400, 0), "F": (29640, 0), "D": (29700, 0)}
+    got = {r.stop_id: (r.arr_time, r.transfers) for r in planner.reachable("A", 28000, 35 * 60)}
+    assert got["E"] == (29900, 1)
+    assert planner.reachable("NOPE", 28000, 600) == []
+
+@pytest.mark.parametrize("seed", range(3))
+def test_reachable_matches_point_to_point(tmp_path, seed):
+    path = str(tmp_path / f"net{seed}.sqlite")
+    random_network(path, seed)
+    planner = CsaRoutePlanner(path, timetable_path="")
+    tt = planner.timetable
+    r = random.Random(400 + seed)
+    for _ in range(20):
+        src = r.randrange(tt.n_stops)
+        t0 = r.randint(6 * 3600, 9 * 3600)
+        ref = reference_earliest(tt, src, t0, t0 + 3600)
+        got = {x.stop_id: x.arr_time for x in planner.reachable(tt.stop_ids[src], t0, 3600)}
+        want = {tt.stop_ids[s]: a for s, a in ref.items() if s != src and a <= t0 + 3600}
+        assert got == want
+
+def test_reachable_endpoint(gtfs_db):
+    svc = JourneyRadarService(FixtureRepository(), SimpleAlternativeSuggester(),
+                              CsaRoutePlanner(gtfs_db, timetable_path=""))
+    app.dependency_overrides[get_service] = lambda: svc
+    try:
+        r = TestClient(app).get("/api/v1/reachable", params={"from_stop": "A", "depart_at": 28000, "budget_min": 30})
+    finally:
+        app.dependency_overrides.clear()
+    assert r.status_code == 200
+    body = r.json()
+    assert [s["stop_id"] for s in body["stops"]] == ["B", "C", "F", "D"]
+    assert body["stops"][0]["travel_sec"] == 1100
+
+def test_reachable_runs_off_the_event_loop(gtfs_db):
+    planner = CsaRoutePlanner(gtfs_db, timetable_path="")
+    svc = JourneyRadarService(FixtureRepository(), SimpleAlternativeSuggester(), planner)
+    assert runs_off_the_loop(planner, "reachable", lambda: svc.reachable("A", 28000, 30))
@@ -0,0 +1,137 @@
+"""GTFS-RT poller against a local HTTP stand-in serving recorded feed files."""
+import asyncio
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import httpx
+import pytest
+from google.transit import gtfs_realtime_pb2 as rt
+from app.adapters.realtime.poller import GtfsRtPoller
+from app.adapters.realtime.store import DelayStore, TripDelta
+from app.adapters.repositories import FixtureRepository
+from app.adapters.alternatives import SimpleAlternativeSuggester
+from app.application.services import JourneyRadarService
+from app.settings import settings
+
+def trip_updates(ts, trips):
+    """trips: [(trip_id, route_id, delay_sec or None = cancelled)]"""
+    m = rt.FeedMessage()
+    m.header.gtfs_realtime_version = "2.0"
+    m.header.timestamp = ts
+    for trip_id, route_id, delay in trips:
+        e = m.entity.add(id=trip_id)
+        e.trip_update.trip.trip_id = trip_id
+        if route_id:
+            e.trip_update.trip.route_id = route_id
+        if delay is None:
+            e.trip_update.trip.schedule_relationship = rt.TripDescriptor.CANCELED
+        else:
+            stu = e.trip_update.stop_time_update.add(stop_sequence=3)
+            stu.arrival.delay = delay
+    return m.SerializeToString()
+
+def alert_feed(ts):
+    m = rt.FeedMessage()
+    m.header.gtfs_realtime_version = "2.0"
+    m.header.timestamp = ts
+    e = m.entity.add(id="AL1")
+    e.alert.severity_level = rt.Alert.WARNING
+    e.alert.informed_entity.add(route_id="52")
+    e.alert.header_text.translation.add(text="Works on line 52")
+    return m.SerializeToString()
+
+class FeedServer:
+    """Serves files from a directory with ETag / If-None-Match, counting requests."""
+    def __init__(self, root):
+        self.root = root
+        self.requests = []
+        outer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                outer.requests.append((self.path, self.headers.get("If-None-Match")))
+                path = os.path.join(outer.root, self.path.lstrip("/"))
+                with open(path, "rb") as f:
+                    body = f.read()
+                etag = '"%s"' % hashlib.sha1(body).hexdigest()
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Type", "application/x-protobuf")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = "http://127.0.0.1:%d" % self.httpd.server_address[1]
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+@pytest.fixture
+def feeds(tmp_path):
+    srv = FeedServer(str(tmp_path))
+    yield tmp_path, srv
+    srv.close()
+
+def test_poller_applies_deltas_with_conditional_requests(feeds):
+    root, srv = feeds
+    (root / "tu.pb").write_bytes(trip_updates(100, [("t1", "52", 720), ("t2", "3", 30), ("t3", "22", None)]))
+    (root / "al.pb").write_bytes(alert_feed(100))
+    poller = GtfsRtPoller(srv.url + "/tu.pb", srv.url + "/al.pb")
+    seen = []
+    poller.listeners.append(seen.append)
+
+    async def scenario():
+        async with httpx.AsyncClient() as client:
+            first = await poller.poll_once(client)
+            lines = {ln["route_id"]: ln for ln in (await poller.fetch_status())["lines"]}
+            assert first == {"t1", "t2", "t3"}
+            assert lines["52"]["status"] == "delayed" and lines["52"]["delay_min"] == 12
+            assert lines["3"]["status"] == "on_time"
+            assert lines["22"]["status"] == "alert" and lines["22"]["cancelled"] == 1
+            alerts = (await poller.fetch_alerts())["alerts"]
+            assert alerts == [{"id": "AL1", "severity": "warning", "text": "Works on line 52", "route_ids": ["52"]}]
+
+            assert await poller.poll_once(client) == set()          # 304 both times
+            assert poller.trip_updates.not_modified == 1
+
+            # next recording: t1 recovers, t3 disappears, t2 unchanged
+            (root / "tu.pb").write_bytes(trip_updates(130, [("t1", "52", 60), ("t2", "3", 30)]))
+            assert await poller.poll_once(client) == {"t1", "t3"}
+            return {ln["route_id"]: ln for ln in (await poller.fetch_status())["lines"]}
+
+    lines = asyncio.run(scenario())
+    assert lines["52"]["status"] == "on_time" and "22" not in lines
+    assert seen == [{"t1", "t2", "t3"}, {"t1", "t3"}]
+    tu_requests = [h for p, h in srv.requests if p == "/tu.pb"]
+    assert tu_requests[0] is None and tu_requests[1] is not None   # validator sent back
+
+def test_delay_store_reuses_slots_and_differential_updates():
+    routes = {"a": "R1", "b": "R1", "c": "R2"}
+    store = DelayStore(route_of=routes.get)
+    store.apply([TripDelta("a", None, 300), TripDelta("b", None, 0)])
+    assert store.apply([TripDelta("a", None, 300), TripDelta("b", None, 0)]) == set()   # no delta
+    assert store.apply([TripDelta("c", None, 600)], full=True) == {"a", "b", "c"}
+    assert store.apply([TripDelta("a", None, 120)], full=False) == {"a"}
+    assert len(store._trip) == 3                                   # a reused a freed slot
+    assert store.get("c") == (600, False) and store.get("a") == (120, False)
+    assert {ln["route_id"] for ln in store.snapshot["lines"]} == {"R1", "R2"}
+
+def test_status_reads_snapshot_without_io(monkeypatch):
+    monkeypatch.setattr(settings, "demo_mode", False)
+    poller = GtfsRtPoller("http://127.0.0.1:9/unreachable")
+    poller.delays.apply([TripDelta("t", "7", 900)])
+    svc = JourneyRadarService(FixtureRepository(), SimpleAlternativeSuggester(), realtime=poller)
+    status = asyncio.run(svc.get_status())
+    assert status["lines"][0]["route_id"] == "7" and status["lines"][0]["delay_min"] == 15
+    assert asyncio.run(svc.get_alerts())["alerts"] == []
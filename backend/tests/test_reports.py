@@ -0,0 +1,87 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.adapters.reports import SQLiteReportStore
+from app.application import container as container_mod
+from app.domain.entities import CrowdReport
+from app.main import app
+from app.settings import settings
+
+def _store(path, clock, **kw):
+    # long flush interval: the tests sync() explicitly
+    return SQLiteReportStore(str(path), windows_min=(15, 60), flush_sec=60, clock=clock, **kw)
+
+def test_window_counts_expire(tmp_path, clock):
+    s = _store(tmp_path / "r.sqlite", clock)
+    s.add(CrowdReport("delay", "late", line="52", stop_id="A"))
+    clock.t += 10 * 60
+    s.add(CrowdReport("other", "full", stop_id="A"))
+    assert s.count("stop", "A") == 0   # queued, not written yet
+    s.sync()
+    assert s.count("stop", "A") == 2 and s.count("stop", "A", 15) == 2
+    assert s.counts("type", 60) == {"delay": 1, "other": 1}
+    clock.t += 10 * 60
+    assert s.count("stop", "A", 15) == 1 and s.count("line", "52", 15) == 0
+    assert s.count("line", "52", 60) == 1
+    clock.t += 60 * 60
+    assert s.counts("stop", 60) == {} and s.counts("stop") == {"A": 2}
+    s.close()
+
+def test_bad_dimension_or_window(tmp_path, clock):
+    s = _store(tmp_path / "r.sqlite", clock)
+    for args in (("route", "1"), ("stop", "A", 5)):
+        with pytest.raises(ValueError):
+            s.count(*args)
+    s.close()
+
+def test_batch_full_wakes_the_writer(tmp_path, clock):
+    s = _store(tmp_path / "r.sqlite", clock, batch_max=10)
+    for i in range(10):
+        s.add(CrowdReport("other", f"r{i}", stop_id="A"))
+    s._thread.join(0.5)   # writer runs without waiting for flush_sec
+    assert s.count("stop", "A") == 10
+    s.close()
+
+def test_page_is_keyset_paginated_and_filtered(tmp_path, clock):
+    s = _store(tmp_path / "r.sqlite", clock)
+    for i in range(5):
+        s.add(CrowdReport("delay" if i % 2 else "other", f"r{i}", stop_id="A" if i < 3 else "B"))
+    first = s.page(limit=2)   # syncs: what was just queued is listed
+    assert [r["text"] for r in first["reports"]] == ["r4", "r3"]
+    second = s.page(limit=2, before=first["next_before"])
+    assert [r["text"] for r in second["reports"]] == ["r2", "r1"]
+    last = s.page(limit=2, before=second["next_before"])
+    assert [r["text"] for r in last["reports"]] == ["r0"] and last["next_before"] is None
+    assert [r["text"] for r in s.page(stop="A", type="delay")["reports"]] == ["r1"]
+    s.close()
+
+def test_counts_survive_restart_and_follow_other_writers(tmp_path, clock):
+    path = tmp_path / "r.sqlite"
+    a = _store(path, clock)
+    a.add(CrowdReport("delay", "x", stop_id="A"))
+    a.sync()
+    b = _store(path, clock)   # another worker on the same file
+    assert b.count("stop", "A") == 1 and b.count("stop", "A", 15) == 1
+    b.add(CrowdReport("delay", "y", stop_id="A"))
+    b.sync()
+    a.sync()
+    assert a.count("stop", "A") == 2 == b.count("stop", "A")
+    a.close()
+    b.close()
+
+def test_report_api(fresh_container, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "reports_sqlite_path", str(tmp_path / "reports.sqlite"))
+    with TestClient(app) as c:
+        r = c.post("/api/v1/reports", json={"type": "delay", "text": "  late  ", "line": "52", "stop_id": "A"})
+        assert r.status_code == 202 and r.json()["accepted"]
+        assert c.post("/api/v1/reports", json={"type": "delay", "text": "   "}).status_code == 422
+        assert c.post("/api/v1/reports", json={"type": "crowded", "text": "x"}).status_code == 422
+        page = c.get("/api/v1/admin/reports", params={"limit": 10}).json()
+        assert [r["text"] for r in page["reports"]] == ["late"] and page["next_before"] is None
+        assert c.get("/api/v1/reports/counts", params={"by": "stop"}).json()["counts"] == {"A": 1}
+        one = c.get("/api/v1/reports/counts", params={"by": "line", "key": "52", "window_min": 60}).json()
+        assert one["count"] == 1
+        assert c.get("/api/v1/reports/counts", params={"window_min": 7}).status_code == 400
+    container_mod.close_container()
+    reopened = SQLiteReportStore(str(tmp_path / "reports.sqlite"))
+    assert reopened.count("stop", "A") == 1
+    reopened.close()
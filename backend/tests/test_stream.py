@@ -0,0 +1,83 @@
+import asyncio
+import json
+from fastapi.testclient import TestClient
+from app.api.routes import sse_events
+from app.application import container as container_mod, services
+from app.application.broadcast import LiveBroadcaster
+from app.main import app
+
+LINES = [{"route_id": "1", "status": "on_time", "delay_min": 0},
+         {"route_id": "2", "status": "delayed", "delay_min": 5}]
+ALERT = {"id": "X", "severity": "info", "text": "works", "route_ids": ["1"]}
+
+def _drain(live, sub):
+    out = []
+    while sub.queue or sub.resync:
+        out.append(asyncio.run(live.next(sub, 0)))
+    return out
+
+def test_deltas_are_diffs_serialized_once():
+    live = LiveBroadcaster()
+    live.publish(lines=LINES, alerts=[ALERT])
+    a, b = live.subscribe(), live.subscribe()
+    assert json.loads(_drain(live, a)[0].json)["lines"] == LINES
+    assert live.publish(lines=LINES) is None   # nothing changed: nothing sent
+    msg = live.publish(lines=[LINES[0], dict(LINES[1], delay_min=9)], alerts=[])
+    body = json.loads(msg.json)
+    assert body["type"] == "delta" and body["lines"] == [dict(LINES[1], delay_min=9)]
+    assert body["alerts_expired"] == ["X"] and body["lines_removed"] == []
+    assert live.publish(lines=[LINES[0]]).json.count("lines_removed\":[\"2\"]") == 1
+    # one message object shared by every client queue
+    assert b.queue[-1] is a.queue[-1]
+    assert [m.seq for m in _drain(live, b)] == [1, 2, 3]
+
+def test_slow_client_is_reset_to_a_snapshot():
+    live = LiveBroadcaster(queue_max=2)
+    fast, slow = live.subscribe(), live.subscribe()
+    seen = []
+    for d in range(5):
+        live.publish(lines=[{"route_id": "1", "status": "delayed", "delay_min": d}])
+        seen += _drain(live, fast)
+    assert [json.loads(m.json)["type"] for m in seen] == ["snapshot"] + ["delta"] * 5
+    backlog = _drain(live, slow)
+    assert len(backlog) == 1 and json.loads(backlog[0].json)["type"] == "snapshot"
+    assert json.loads(backlog[0].json)["lines"][0]["delay_min"] == 4
+
+def test_reconnect_replays_missed_deltas_only():
+    live = LiveBroadcaster()
+    live.publish(lines=LINES)
+    first = _drain(live, live.subscribe())[0]
+    live.publish(alerts=[ALERT])
+    again = _drain(live, live.subscribe(json.loads(first.json)["id"]))
+    assert [json.loads(m.json)["type"] for m in again] == ["delta"]
+    assert json.loads(_drain(live, live.subscribe("other.1"))[0].json)["type"] == "snapshot"
+
+def test_sse_frames_and_heartbeat():
+    live = LiveBroadcaster()
+    live.publish(lines=LINES)
+
+    async def frames():
+        gen = sse_events(live)
+        out = [await gen.__anext__() for _ in range(2)]
+        await gen.aclose()
+        return out
+    retry, snap = asyncio.run(frames())
+    assert retry.startswith(b"retry:") and snap.startswith(b"id: ") and b"event: snapshot" in snap
+    assert len(live) == 0
+    assert asyncio.run(live.next(live.subscribe(), 0.01)) is not None
+    sub = live.subscribe()
+    _drain(live, sub)
+    assert asyncio.run(live.next(sub, 0.01)) is None   # heartbeat
+
+def test_websocket_pushes_demo_scenario_change(monkeypatch):
+    monkeypatch.setattr(services, "DEMO_SCENARIO", "normal")
+    container_mod.close_container()
+    try:
+        with TestClient(app) as c, c.websocket_connect("/api/v1/stream/ws") as ws:
+            snap = json.loads(ws.receive_text())
+            assert snap["type"] == "snapshot" and snap["lines"] and snap["alerts"]
+            c.post("/api/v1/_demo/scenario", params={"s": "heavy"})
+            delta = json.loads(ws.receive_text())
+            assert delta["type"] == "delta" and delta["seq"] == snap["seq"] + 1 and delta["lines"]
+    finally:
+        container_mod.close_container()
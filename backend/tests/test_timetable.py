@@ -0,0 +1,134 @@
+import pytest
+from app.adapters.router.csa_planner import CsaRoutePlanner
+from app.adapters.router.timetable import Timetable
+from app.adapters.router.timetable_file import (
+    TimetableFormatError, open_timetable, verify_timetable, write_timetable,
+)
+from app.domain.entities import JourneyRequest
+from helpers import calendar_db
+
+COLUMNS = ("trip_route", "c_dep", "c_arr", "c_from", "c_to", "c_trip", "fp_off", "fp_to", "fp_walk", "fp_dist")
+
+def test_compile_sorted_and_windowed(gtfs_db):
+    tt = Timetable.from_sqlite(gtfs_db)
+    assert len(tt) == 8
+    assert list(tt.c_dep) == sorted(tt.c_dep)
+    lo, hi = tt.window(29000, 29500)
+    assert all(29000 <= tt.c_dep[i] <= 29500 for i in range(lo, hi))
+    assert hi - lo == 3
+
+def _legs(its):
+    return [[(lg.mode, lg.from_stop, lg.to_stop, lg.dep_time, lg.arr_time, lg.trip_id) for lg in it.legs]
+            for it in its]
+
+def test_compiled_scan_itineraries(gtfs_db):
+    planner = CsaRoutePlanner(gtfs_db, timetable_path="")
+    assert _legs(planner.plan(JourneyRequest("A", "E", 28000))) == [
+        [("transit", "A", "D", 28800, 29700, "1a"), ("transit", "D", "E", 29760, 29900, "3a")]]
+    assert _legs(planner.plan(JourneyRequest("A", "F", 28000))) == [
+        [("transit", "A", "C", 28800, 29400, "1a"), ("walk", "C", "F", 29400, 29640, None)]]
+    # fastest (one change) first, then the direct ride
+    assert _legs(planner.plan(JourneyRequest("B", "E", 29000))) == [
+        [("transit", "B", "D", 29160, 29700, "1a"), ("transit", "D", "E", 29760, 29900, "3a")],
+        [("transit", "B", "E", 29400, 30000, "2a")]]
+    # 1b leaves A after 30000 but nothing connects to E later: no itinerary
+    assert planner.plan(JourneyRequest("A", "E", 30000)) == []
+    assert planner.plan(JourneyRequest("A", "nope", 28000)) == []
+
+def test_binary_roundtrip(gtfs_db, tmp_path):
+    tt = Timetable.from_sqlite(gtfs_db)
+    out = str(tmp_path / "tt.bin")
+    write_timetable(tt, out)
+    assert verify_timetable(out)
+    mm = open_timetable(out, verify=True)
+    for name in COLUMNS:
+        assert list(getattr(mm, name)) == list(getattr(tt, name)), name
+    assert list(mm.stop_ids) == list(tt.stop_ids)
+    assert mm.footpaths(mm.stop_index["C"]) == [(mm.stop_index["F"], 240, 300)]
+
+def test_binary_checksum_detects_corruption(gtfs_db, tmp_path):
+    out = str(tmp_path / "tt.bin")
+    write_timetable(Timetable.from_sqlite(gtfs_db), out)
+    with open(out, "r+b") as f:
+        f.seek(-1, 2)
+        b = f.read(1)
+        f.seek(-1, 2)
+        f.write(bytes([b[0] ^ 0xFF]))
+    with pytest.raises(TimetableFormatError):
+        open_timetable(out, verify=True)
+
+def test_planner_same_answer_from_sqlite_and_mmap(gtfs_db, tmp_path):
+    out = str(tmp_path / "tt.bin")
+    write_timetable(Timetable.from_sqlite(gtfs_db), out)
+    req = JourneyRequest(from_stop="A", to_stop="E", depart_at=28000)
+    a = CsaRoutePlanner(gtfs_db, timetable_path="").plan(req)
+    b = CsaRoutePlanner(gtfs_db, timetable_path=out).plan(req)
+    assert a and b
+    assert a[0].legs[-1].arr_time == b[0].legs[-1].arr_time == 29900
+
+def test_calendar_service_days(tmp_path):
+    from datetime import date
+    path = str(tmp_path / "cal.sqlite")
+    calendar_db(path)
+    planner = CsaRoutePlanner(path, timetable_path="")
+
+    def arrival(depart_at, day):
+        its = planner.plan(JourneyRequest("A", "B", depart_at, service_date=day))
+        return its[0].legs[-1].arr_time if its else None
+
+    assert arrival(28000, date(2025, 6, 10)) == 29400      # Tuesday: weekday trip
+    assert arrival(28000, date(2025, 6, 14)) == 29700      # Saturday: weekend trip only
+    assert arrival(28000, date(2025, 6, 9)) == 29700       # holiday exception
+    assert arrival(28000, None) == 29400                   # no date: calendar ignored
+    # Wednesday 00:10: the Tuesday service's 24:30 trip runs at 00:30
+    assert arrival(600, date(2025, 6, 11)) == 2400
+    assert arrival(600, date(2025, 6, 15)) is None         # Sunday 00:10: Saturday has no night trip
+
+def test_calendar_survives_binary_roundtrip(tmp_path):
+    from datetime import date
+    path = str(tmp_path / "cal.sqlite")
+    calendar_db(path)
+    out = str(tmp_path / "cal.bin")
+    tt = Timetable.from_sqlite(path)
+    write_timetable(tt, out)
+    mm = open_timetable(out, verify=True)
+    for day in (date(2025, 6, 9), date(2025, 6, 10), date(2025, 6, 14)):
+        assert mm.active_trips(day) == tt.active_trips(day)
+
+def test_memory_bench(gtfs_db, capsys):
+    import json
+    from app.domain.entities import Leg
+    from app.tools import bench_memory
+    assert not hasattr(Leg("walk", "A", "B", 0, 60), "__dict__")
+    assert bench_memory.main([gtfs_db, "--json"]) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report["dict-objects"]["connections"] == report["arrays"]["connections"] == 8
+    assert report["slot-objects"]["bytes_per_connection"] < report["dict-objects"]["bytes_per_connection"]
+
+def test_footpath_closure():
+    from app.adapters.router.timetable import close_footpaths
+    foot = [(0, 1, 100, 120), (1, 2, 100, 130), (0, 2, 300, 200), (2, 3, 150, -1), (3, 3, 10, 10)]
+    closed = {(a, b): (w, d) for a, b, w, d in close_footpaths(foot)}
+    assert closed[(0, 2)] == (200, 250)        # chain beats the direct footpath
+    assert closed[(1, 3)] == (250, -1)         # unknown distance stays unknown
+    assert (0, 3) not in closed                # 350 s > longest given footpath (300 s)
+    assert (3, 3) not in closed
+    assert (0, 3, 350, -1) in close_footpaths(foot, max_walk_sec=400)
+
+def test_walk_legs_carry_real_times(gtfs_db):
+    import sqlite3
+    from app.adapters.router.raptor_planner import RaptorRoutePlanner
+    db = sqlite3.connect(gtfs_db)
+    # C -> F -> G -> H only as a chain of footpaths: reachable once the closure is built
+    # (X -> Y raises the longest footpath, i.e. the closure's walk limit, to 10 min)
+    db.executemany("INSERT INTO footpaths VALUES(?,?,?,?)",
+                   [("F", "G", 100, 120), ("G", "H", 120, 150), ("X", "Y", 600, 700)])
+    db.commit()
+    db.close()
+    for cls in (CsaRoutePlanner, RaptorRoutePlanner):
+        planner = cls(gtfs_db, timetable_path="")
+        its = planner.plan(JourneyRequest("A", "H", 28000))
+        legs = its[0].legs
+        assert [(lg.mode, lg.to_stop) for lg in legs] == [("transit", "C"), ("walk", "H")]
+        assert (legs[1].dep_time, legs[1].arr_time, legs[1].distance_m) == (29400, 29400 + 460, 570)
+        assert its[0].total_time == 29860 - 28800
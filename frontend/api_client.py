@@ -0,0 +1,102 @@
+"""
+Backend API client shared by the Flask views.
+
+- one requests.Session per process: keep-alive connections pooled per host
+  (API_POOL_SIZE), instead of a new TCP connection per call
+- fetch_many(): several backend calls of one page in parallel on a small
+  thread pool, so a page waits for the slowest call, not for their sum
+- get(..., ttl=N): responses kept N seconds; once stale they are revalidated
+  with If-None-Match and a 304 reuses the cached body
+- post(): JSON body in, JSON body out (rider reports); a 4xx answer comes back
+  as Rejected (the request itself was refused: retrying cannot help)
+Calls never raise: on any other error a cached GET serves its last body, anything
+else the caller's default (pages still render when the backend is down).
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+
+log = logging.getLogger(__name__)
+
+class Rejected(NamedTuple):
+    """A 4xx answer to post(): status and the backend's error detail."""
+    status: int
+    detail: Any
+
+class ApiClient:
+    def __init__(self, base: str, pool_size: int = 16, fan_out_workers: int = 8, cache_size: int = 256):
+        self.base = base.rstrip("/")
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._pool = ThreadPoolExecutor(max_workers=fan_out_workers, thread_name_prefix="api")
+        # (path, params) -> (fresh until, etag, body)
+        self._cache: Dict[Tuple, Tuple[float, Optional[str], Any]] = {}
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    def get(self, path: str, params: Optional[Dict[str, Any]] = None, default: Any = None,
+            timeout: float = 2, ttl: float = 0) -> Any:
+        """JSON body of GET base+path; on any error the stale cached body (ttl > 0) or default."""
+        key = (path, tuple(sorted((params or {}).items())))
+        entry = self._cache.get(key) if ttl > 0 else None
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[2]
+        headers = {"If-None-Match": entry[1]} if entry is not None and entry[1] else {}
+        try:
+            r = self.session.get(self.base + path, params=params, headers=headers, timeout=timeout)
+            if r.status_code == 304 and entry is not None:
+                body = entry[2]
+            else:
+                r.raise_for_status()
+                body = r.json()
+        except (requests.RequestException, ValueError) as e:
+            log.warning("GET %s failed: %s", path, e)
+            return entry[2] if entry is not None else default
+        if ttl > 0:
+            self._store(key, (time.monotonic() + ttl, r.headers.get("ETag"), body))
+        return body
+
+    def post(self, path: str, body: Dict[str, Any], default: Any = None, timeout: float = 2) -> Any:
+        """JSON response of POST base+path with a JSON body, Rejected on a 4xx, or default on any other error."""
+        try:
+            r = self.session.post(self.base + path, json=body, timeout=timeout)
+            if 400 <= r.status_code < 500:
+                try:
+                    detail = r.json().get("detail")
+                except ValueError:
+                    detail = r.text
+                log.info("POST %s rejected (%s): %s", path, r.status_code, detail)
+                return Rejected(r.status_code, detail)
+            r.raise_for_status()
+            return r.json()
+        except (requests.RequestException, ValueError) as e:
+            log.warning("POST %s failed: %s", path, e)
+            return default
+
+    def _store(self, key: Tuple, entry: Tuple[float, Optional[str], Any]):
+        with self._lock:
+            self._cache.pop(key, None)
+            self._cache[key] = entry
+            while len(self._cache) > self._cache_size:
+                del self._cache[next(iter(self._cache))]   # oldest insert first
+
+    def fetch_many(self, **calls: Dict[str, Any]) -> Dict[str, Any]:
+        """name=dict(path=..., default=..., params=?, ttl=?, timeout=?) -> {name: body}, fetched in parallel."""
+        futures = {name: self._pool.submit(self.get, **kw) for name, kw in calls.items()}
+        return {name: f.result() for name, f in futures.items()}
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+        self.session.close()
+
+def from_env() -> ApiClient:
+    return ApiClient(os.getenv("API_BASE", "http://localhost:8000"),
+                     pool_size=int(os.getenv("API_POOL_SIZE", "16")),
+                     fan_out_workers=int(os.getenv("API_FAN_OUT_WORKERS", "8")))
@@ -1,9 +1,13 @@
 import os
 from flask import Flask, render_template, request
-import requests
+import api_client
 
-SUBMISSIONS = []  # in-memory, demo only
-API_BASE = os.getenv("API_BASE", "http://localhost:8000")
+API = api_client.from_env()
+# bulletins and alerts change rarely: cached, revalidated with ETag once stale
+CACHE_TTL = float(os.getenv("API_CACHE_TTL_SEC", "30"))
+# rider report field lengths, as the backend accepts them (ReportIn)
+REPORT_MAX_LEN = {"line": 32, "stop_id": 64, "text": 2000}
+REPORT_LABELS = {"line": "Line", "stop_id": "Stop ID", "text": "Description"}
 
 def create_app():
     app = Flask(__name__)
@@ -11,23 +15,22 @@ def create_app():
 
     @app.route("/")
     def index():
-        status = {"lines":[]}; bulletins = {"bulletins":[]}
-        try: status = requests.get(f"{API_BASE}/api/v1/status", timeout=2).json()
-        except: pass
-        try: bulletins = requests.get(f"{API_BASE}/api/v1/bulletins", timeout=2).json()
-        except: pass
-        return render_template("index.html", status=status, bulletins=bulletins)
+        data = API.fetch_many(
+            status=dict(path="/api/v1/status", default={"lines":[]}),
+            bulletins=dict(path="/api/v1/bulletins", default={"bulletins":[]}, ttl=CACHE_TTL),
+        )
+        return render_template("index.html", status=data["status"], bulletins=data["bulletins"])
 
     @app.route("/alternatives")
     def alternatives():
         from_stop = request.args.get("from_stop","STOP_A")
-        try:
-            r = requests.get(f"{API_BASE}/api/v1/alternatives", params={"from_stop":from_stop}, timeout=2)
-            data = r.json()
-        except Exception:
-            data = {"from_stop":from_stop, "alternatives":[]}
+        data = API.get("/api/v1/alternatives", params={"from_stop":from_stop},
+                       default={"from_stop":from_stop, "alternatives":[]})
         return render_template("alternatives.html", data=data)
     
+    def report_form(error=None, form=None, status=200):
+        return render_template("report.html", error=error, form=form or {}, max_len=REPORT_MAX_LEN), status
+
     @app.route("/report", methods=["GET", "POST"])
     def report():
         if request.method == "POST":
@@ -39,10 +42,18 @@ def create_app():
             }
             if not data["text"]:
                 # Mostra il form con errore
-                return render_template("report.html", error="Please add a short description."), 400
-            SUBMISSIONS.append(data)  # solo demo
+                return report_form("Please add a short description.", data, 400)
+            for field, n in REPORT_MAX_LEN.items():
+                if len(data[field]) > n:
+                    return report_form(f"{REPORT_LABELS[field]} is too long (at most {n} characters).", data, 400)
+            sent = API.post("/api/v1/reports", data)
+            if isinstance(sent, api_client.Rejected):
+                # the backend refused this report: a validation error, retrying will not help
+                return report_form("The report was not accepted, please check the fields.", data, 400)
+            if sent is None:
+                return report_form("Could not send the report, please try again.", data, 502)
             return render_template("report_thanks.html", data=data)
-        return render_template("report.html")
+        return report_form()
 
     @app.route("/admin")
     def admin():
@@ -50,23 +61,30 @@ def create_app():
 
     @app.route("/admin/alerts")
     def admin_alerts():
-        alerts = {}
-        try:
-            r = requests.get(f"{API_BASE}/api/v1/alerts", timeout=2)
-            alerts = r.json()
-        except Exception:
-            alerts = {"alerts":[]}
+        alerts = API.get("/api/v1/alerts", default={"alerts":[]}, ttl=CACHE_TTL)
         return render_template("admin/alerts.html", alerts=alerts)
 
     @app.route("/admin/feedback")
     def admin_feedback():
-        return render_template("admin/feedback.html", feedback=SUBMISSIONS)
+        params = {k: request.args[k] for k in ("before", "stop_id", "line", "type") if request.args.get(k)}
+        page = API.get("/api/v1/admin/reports", params=params, default={"reports": [], "next_before": None})
+        older = dict(params, before=page["next_before"]) if page.get("next_before") else None
+        return render_template("admin/feedback.html", feedback=page["reports"], older=older)
 
     @app.route("/_demo/crowd_count")
     def demo_crowd_count():
-        from collections import Counter
-        c = Counter([ (r.get("stop_id") or "unknown") for r in SUBMISSIONS ])
-        return {"counts": c}
+        window_min = request.args.get("window_min", "0")
+        data = API.fetch_many(
+            stops=dict(path="/api/v1/reports/counts", params={"by": "stop", "window_min": window_min},
+                       default={"counts": {}}),
+            types=dict(path="/api/v1/reports/counts", params={"by": "type", "window_min": window_min},
+                       default={"counts": {}}))
+        counts = dict(data["stops"].get("counts", {}))
+        # every report has a type but not every one a stop: the rest is the "unknown" bucket
+        unknown = sum(data["types"].get("counts", {}).values()) - sum(counts.values())
+        if unknown > 0:
+            counts["unknown"] = unknown
+        return {"counts": counts}
     
     @app.route("/admin/feeds")
     def admin_feeds():
@@ -81,15 +99,11 @@ def create_app():
         from_stop = request.args.get("from_stop","STOP_A")
         to_stop = request.args.get("to_stop","STOP_B")
         depart_at = int(request.args.get("depart_at","32400"))
-        try:
-            r = requests.get(f"{API_BASE}/api/v1/plan", params={
-                "from_stop": from_stop,
-                "to_stop": to_stop,
-                "depart_at": depart_at
-            }, timeout=3)
-            data = r.json()
-        except Exception:
-            data = {"itineraries": []}
+        data = API.get("/api/v1/plan", params={
+            "from_stop": from_stop,
+            "to_stop": to_stop,
+            "depart_at": depart_at
+        }, default={"itineraries": []}, timeout=3)
         return render_template("plan.html", data=data, qs={"from":from_stop, "to":to_stop})
 
 
@@ -0,0 +1,79 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from api_client import ApiClient, Rejected
+
+class Backend(BaseHTTPRequestHandler):
+    """JSON with an ETag; /slow sleeps, /fail is a 500 once `failing` is set."""
+    hits = []
+    failing = False
+    body = {"lines": ["1"]}
+
+    def do_GET(self):
+        Backend.hits.append((self.path, self.headers.get("If-None-Match")))
+        if Backend.failing or self.path.startswith("/fail"):
+            self.send_response(500)
+            self.end_headers()
+            return
+        if self.path.startswith("/slow"):
+            time.sleep(0.3)
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.send_header("ETag", '"v1"')
+            self.end_headers()
+            return
+        data = json.dumps(dict(Backend.body, path=self.path)).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        data = json.dumps({"detail": [{"loc": ["body", "line"]}]}).encode()
+        self.send_response(422)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def api():
+    Backend.hits, Backend.failing = [], False
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Backend)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = ApiClient(f"http://127.0.0.1:{server.server_address[1]}")
+    yield client
+    client.close()
+    server.shutdown()
+    server.server_close()
+
+def test_ttl_then_304_reuses_the_body(api):
+    a = api.get("/status", ttl=0.2)
+    assert api.get("/status", ttl=0.2) is a and len(Backend.hits) == 1   # fresh: no request
+    time.sleep(0.25)
+    assert api.get("/status", ttl=0.2) is a                              # stale: revalidated, 304
+    assert Backend.hits[-1] == ("/status", '"v1"')
+    assert api.get("/status") == a and Backend.hits[-1] == ("/status", None)   # no ttl: no cache
+
+def test_errors_serve_stale_body_or_default(api):
+    a = api.get("/status", ttl=0.05)
+    time.sleep(0.1)
+    Backend.failing = True
+    assert api.get("/status", ttl=0.05, default={}) is a
+    assert api.get("/alerts", default={"alerts": []}) == {"alerts": []}
+    assert api.post("/reports", {"text": "x"}, default=None) == Rejected(422, [{"loc": ["body", "line"]}])
+
+def test_fetch_many_runs_in_parallel(api):
+    t = time.perf_counter()
+    out = api.fetch_many(a=dict(path="/slow/a"), b=dict(path="/slow/b"),
+                         c=dict(path="/fail", default="down"))
+    assert time.perf_counter() - t < 0.55
+    assert out["a"]["path"] == "/slow/a" and out["b"]["path"] == "/slow/b" and out["c"] == "down"
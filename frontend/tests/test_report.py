@@ -0,0 +1,25 @@
+import pytest
+import api_client
+import app as frontend
+
+@pytest.fixture
+def client():
+    return frontend.create_app().test_client()
+
+def test_report_checks_lengths_before_posting(client, monkeypatch):
+    sent = []
+    monkeypatch.setattr(frontend.API, "post", lambda path, body: sent.append(body) or {"accepted": True})
+    r = client.post("/report", data={"type": "delay", "text": "late", "line": "5" * 33})
+    assert r.status_code == 400 and b"Line is too long (at most 32 characters)" in r.data and sent == []
+    assert client.post("/report", data={"text": "x" * 2001}).status_code == 400
+    assert client.post("/report", data={"type": "delay", "text": "late", "line": "52"}).status_code == 200
+    assert sent == [{"line": "52", "stop_id": "", "type": "delay", "text": "late"}]
+    page = client.get("/report").data
+    assert b'maxlength="32"' in page and b'maxlength="64"' in page and b'maxlength="2000"' in page
+
+def test_rejected_report_is_a_validation_error(client, monkeypatch):
+    monkeypatch.setattr(frontend.API, "post", lambda path, body: api_client.Rejected(422, []))
+    r = client.post("/report", data={"type": "delay", "text": "late", "stop_id": "A"})
+    assert r.status_code == 400 and b"not accepted" in r.data and b'value="A"' in r.data
+    monkeypatch.setattr(frontend.API, "post", lambda path, body: None)   # backend down
+    assert client.post("/report", data={"text": "late"}).status_code == 502